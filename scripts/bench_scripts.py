@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Time and memory-profile every script entry point on synthetic data
+
+Usage: bench_scripts.py [scale ...] [--data DIR] [--results PATH]
+                        [--only NAME,...] [--tracemalloc]
+
+Datasets come from generate_synthetic_data (generated into DIR/x<scale>
+the first time, default bench_data/). Each entry point runs in a fresh
+process so its peak RSS is its own. Results are appended to a JSON file
+(default bench_results.json) and compared with the previous run at the same
+scale, flagging anything more than 20% slower.
+"""
+import csv
+import datetime
+import io
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from multiprocessing import get_context
+from pathlib import Path
+
+from generate_synthetic_data import generate_dataset
+from instrument import peak_rss_mb
+
+REGRESSION_RATIO = 1.2
+
+
+def _bench_convert_rtf_to_json(data_dir, out_dir):
+    from convert_911_rtf_to_json import convert_rtf_to_json
+    data = convert_rtf_to_json(os.path.join(data_dir, '911_raw.rtf'), os.path.join(out_dir, '911_clean.json'))
+    return sum(len(trades) for locations in data['table'].values() for trades in locations.values())
+
+
+def _bench_convert_json_to_csv(data_dir, out_dir):
+    from convert_911_json_to_csv import write_json_csv
+    return write_json_csv(os.path.join(data_dir, '911_clean.json'), os.path.join(out_dir, '911_raw.csv'))
+
+
+def _bench_enhance_911_data(data_dir, out_dir):
+    from enhance_911_data import write_enhanced_911_csv
+    return write_enhanced_911_csv(os.path.join(data_dir, 'WhartonSmith_911_raw.csv'),
+                                  os.path.join(out_dir, '911_enhanced.csv'))
+
+
+def _bench_create_uno_synthesized(data_dir, out_dir):
+    from create_uno_synthesized import create_uno_synthesized
+    output = os.path.join(out_dir, 'UNO_synthesized.csv')
+    create_uno_synthesized(os.path.join(data_dir, 'UNO_construction_data_fixed.csv'), output)
+    return _count_csv_rows(output)
+
+
+def _bench_map_tasks_to_trades(data_dir, out_dir):
+    from xer_trade_map import map_tasks_to_trades
+    output = Path(out_dir) / 'xer_trade_map.csv'
+    map_tasks_to_trades(Path(data_dir) / 'UNO3A.xer', output)
+    return _count_csv_rows(output)
+
+
+def _bench_generate_uno_schedule_mapping_csv(data_dir, out_dir):
+    # Reads UNO_construction_data_fixed.csv from the working directory
+    from uno_schedule_mapping_generator import generate_uno_schedule_mapping_csv
+    os.chdir(data_dir)
+    content = generate_uno_schedule_mapping_csv()
+    return max(content.count('\n') - 1, 0)
+
+
+def _bench_stream_uno_schedule_mapping_csv(data_dir, out_dir):
+    from uno_schedule_mapping_generator import stream_uno_schedule_mapping_csv
+    return stream_uno_schedule_mapping_csv(
+        os.path.join(data_dir, 'UNO3A-MO-250814.csv'),
+        os.path.join(out_dir, 'uno_schedule_mapping.csv'),
+        os.path.join(data_dir, 'UNO_construction_data_fixed.csv'),
+    )
+
+
+BENCHMARKS = {
+    'convert_rtf_to_json': _bench_convert_rtf_to_json,
+    'convert_json_to_csv': _bench_convert_json_to_csv,
+    'enhance_911_data': _bench_enhance_911_data,
+    'create_uno_synthesized': _bench_create_uno_synthesized,
+    'map_tasks_to_trades': _bench_map_tasks_to_trades,
+    'generate_uno_schedule_mapping_csv': _bench_generate_uno_schedule_mapping_csv,
+    'stream_uno_schedule_mapping_csv': _bench_stream_uno_schedule_mapping_csv,
+}
+
+
+def _count_csv_rows(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+
+def _run_benchmark(name, data_dir, out_dir, use_tracemalloc):
+    """Run one benchmark in the current (fresh) process and return its measurements"""
+    if use_tracemalloc:
+        import tracemalloc
+        tracemalloc.start()
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        rows = BENCHMARKS[name](data_dir, out_dir)
+    seconds = time.perf_counter() - start
+    peak_rss = peak_rss_mb()
+    result = {
+        'name': name,
+        'seconds': round(seconds, 4),
+        'rows': rows,
+        'rows_per_s': round(rows / seconds, 1) if rows and seconds else None,
+        'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None,
+    }
+    if use_tracemalloc:
+        result['peak_traced_mb'] = round(tracemalloc.get_traced_memory()[1] / (1 << 20), 1)
+    return result
+
+
+def run_benchmarks(data_dir, out_dir, names, use_tracemalloc=False):
+    results = []
+    for name in names:
+        # A new process per entry point keeps peak RSS separate
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+            result = pool.submit(_run_benchmark, name, data_dir, out_dir, use_tracemalloc).result()
+        results.append(result)
+        rate = f"{result['rows_per_s']:,.0f} rows/s" if result['rows_per_s'] else "-"
+        rss = f"{result['peak_rss_mb']:8.1f} MB" if result['peak_rss_mb'] is not None else "       - MB"
+        print(f"  {name:36s} {result['seconds']:9.3f}s  {rate:>16s}  {rss}")
+    return results
+
+
+def _previous_run(history, scale):
+    for run in reversed(history):
+        if run.get('scale') == scale:
+            return run
+    return None
+
+
+def compare_runs(previous, results):
+    """Print entry points that got more than REGRESSION_RATIO slower than the previous run"""
+    before = {r['name']: r for r in previous['results']}
+    for result in results:
+        old = before.get(result['name'])
+        if not old or not old['seconds']:
+            continue
+        ratio = result['seconds'] / old['seconds']
+        if ratio > REGRESSION_RATIO:
+            print(f"  ⚠️  {result['name']}: {old['seconds']:.3f}s -> {result['seconds']:.3f}s ({ratio:.2f}x)")
+
+
+def load_history(results_path):
+    if not os.path.exists(results_path):
+        return []
+    with open(results_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main(argv):
+    args = list(argv)
+    options = {'--data': 'bench_data', '--results': 'bench_results.json', '--only': ','.join(BENCHMARKS)}
+    use_tracemalloc = '--tracemalloc' in args
+    if use_tracemalloc:
+        args.remove('--tracemalloc')
+    for flag in options:
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1]
+            del args[i:i + 2]
+    names = [name for name in options['--only'].split(',') if name]
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks {unknown}; choose from {list(BENCHMARKS)}")
+    scales = [int(s) for s in args] or [10]
+
+    history = load_history(options['--results'])
+    for scale in scales:
+        data_dir = os.path.abspath(os.path.join(options['--data'], 'x{}'.format(scale)))
+        if not os.path.isdir(data_dir):
+            print(f"🏗️ Generating x{scale} dataset in {data_dir}")
+            generate_dataset(data_dir, scale)
+        out_dir = os.path.join(data_dir, 'bench_out')
+        os.makedirs(out_dir, exist_ok=True)
+
+        print(f"\n⏱️ Scale x{scale}")
+        results = run_benchmarks(data_dir, out_dir, names, use_tracemalloc)
+        previous = _previous_run(history, scale)
+        if previous:
+            compare_runs(previous, results)
+        history.append({
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scale': scale,
+            'results': results,
+        })
+
+    with open(options['--results'], 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+    print(f"\n✅ Results written to {options['--results']}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Benchmark the compiled trade classifier against a sequential alias search
+
+Usage: bench_xer_trade_map.py [num_names]
+
+Builds synthetic P6 task names that hit (and miss) the compile_aliases()
+patterns, checks that both classifiers produce identical TradeJudgement and
+Reasoning values, and prints the time taken by each.
+"""
+import sys
+import time
+
+from generate_synthetic_data import build_names
+from xer_trade_map import TradeClassifier, classify_sequential, compile_aliases, judge_task_name
+
+
+class SequentialClassifier:
+    """Adapter so judge_task_name can drive the sequential reference search"""
+
+    def __init__(self, patterns):
+        self.patterns = patterns
+
+    def classify(self, name):
+        return classify_sequential(name, self.patterns)
+
+
+def time_classifier(classifier, names):
+    start = time.perf_counter()
+    results = [judge_task_name(name, classifier) for name in names]
+    return time.perf_counter() - start, results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    names = build_names(count)
+    patterns = compile_aliases()
+
+    seq_time, seq_results = time_classifier(SequentialClassifier(patterns), names)
+    comp_time, comp_results = time_classifier(TradeClassifier(patterns), names)
+
+    if seq_results != comp_results:
+        mismatches = sum(1 for a, b in zip(seq_results, comp_results) if a != b)
+        print('Classifier outputs differ on {} of {} names'.format(mismatches, count), file=sys.stderr)
+        sys.exit(1)
+
+    print('Task names:  {}'.format(count))
+    print('Sequential:  {:.3f}s ({:,.0f} names/s)'.format(seq_time, count / seq_time))
+    print('Compiled:    {:.3f}s ({:,.0f} names/s)'.format(comp_time, count / comp_time))
+    print('Speedup:     {:.1f}x'.format(seq_time / comp_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,41 +1,14 @@
-import json
-import csv
-from datetime import datetime
+from progress_json import iter_table_dates, scan_progress_json
+from instrument import stage
+from progress_store import PROGRESS_COLUMNS, open_progress_writer
 
-def convert_json_to_csv(json_file_path, csv_file_path):
-    """Convert Wharton Smith 911 JSON data to CSV format"""
-    
-    with open(json_file_path, 'r', encoding='utf-8') as file:
-        data = json.load(file)
-    
-    print(f"JSON loaded successfully!")
-    print(f"Available keys: {list(data.keys())}")
-    
-    # Get location mapping
-    location_mapping = data.get('locationKeyToName', {})
-    print(f"Total locations: {len(location_mapping)}")
-    
-    # Get table data (dates -> locations -> trades)
-    table_data = data.get('table', {})
-    dates = sorted(table_data.keys())
-    print(f"Date range: {dates[0]} to {dates[-1]} ({len(dates)} dates)")
-    
-    # Get all trades
-    all_trades = set()
-    for date in dates:
-        for location_id in table_data[date]:
-            if isinstance(table_data[date][location_id], dict):
-                all_trades.update(table_data[date][location_id].keys())
+def iter_capture_rows(location_mapping, dated_tables):
+    """Yield one progress row per (location, trade) from (date, locations) pairs
     
-    all_trades = sorted(list(all_trades))
-    print(f"All trades found: {all_trades}")
-    
-    # Prepare CSV data
-    csv_rows = []
-    csv_headers = ['location', 'section', 'level / floor', 'trade', 'state', 'start_date', 'complete_date', 'capture_date']
-    
-    for date in dates:
-        for location_id, trade_data in table_data[date].items():
+    Rows follow PROGRESS_COLUMNS; start/complete dates are left for enhance_911_data.
+    """
+    for date, locations in dated_tables:
+        for location_id, trade_data in locations.items():
             if isinstance(trade_data, dict):
                 # Get location name
                 location_name = location_mapping.get(location_id, location_id)
@@ -49,7 +22,7 @@ def convert_json_to_csv(json_file_path, csv_file_path):
                 level_floor = ""
                 
                 for trade, state in trade_data.items():
-                    csv_rows.append([
+                    yield [
                         location_name,      # location
                         section,            # section  
                         level_floor,        # level / floor
@@ -58,19 +31,63 @@ def convert_json_to_csv(json_file_path, csv_file_path):
                         "",                 # start_date (will be derived later)
                         "",                 # complete_date (will be derived later)
                         date                # capture_date
-                    ])
+                    ]
+
+def write_json_csv(json_file_path, csv_file_path, rows=None):
+    """Convert Wharton Smith 911 JSON data to CSV format (or a .pgs progress store)
+
+    Returns the number of rows written. Rows are written one capture date at
+    a time, so they are never all held in memory unless rows, a list, is
+    given to collect them.
+    """
+    
+    # Scan once for metadata; the table is read one capture date at a time
+    with stage('scan JSON'):
+        metadata, table_spans = scan_progress_json(json_file_path)
+    
+    print(f"JSON scanned successfully!")
+    print(f"Metadata keys: {list(metadata.keys())}")
+    
+    # Get location mapping
+    location_mapping = metadata.get('locationKeyToName', {})
+    print(f"Total locations: {len(location_mapping)}")
+    
+    # Get table data (dates -> locations -> trades)
+    dates = sorted(table_spans)
+    print(f"Date range: {dates[0]} to {dates[-1]} ({len(dates)} dates)")
+    
+    # Write CSV rows as each date is parsed
+    all_trades = set()
+    total_rows = 0
+    first_row = None
     
-    # Write to CSV
-    with open(csv_file_path, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(csv_headers)
-        writer.writerows(csv_rows)
+    with stage('flatten table + write CSV') as s, open_progress_writer(csv_file_path, PROGRESS_COLUMNS) as writer:
+        for row in iter_capture_rows(location_mapping, iter_table_dates(json_file_path, table_spans, dates)):
+            writer.writerow(row)
+            if rows is not None:
+                rows.append(row)
+            all_trades.add(row[3])
+            total_rows += 1
+            if first_row is None:
+                first_row = row
+        s.rows_out = total_rows
     
+    print(f"All trades found: {sorted(all_trades)}")
     print(f"✅ CSV created: {csv_file_path}")
-    print(f"Total rows: {len(csv_rows)} (plus header)")
-    print(f"Sample row: {csv_rows[0] if csv_rows else 'No data'}")
+    print(f"Total rows: {total_rows} (plus header)")
+    print(f"Sample row: {first_row if first_row else 'No data'}")
     
-    return csv_rows
+    return total_rows
+
+def convert_json_to_csv(json_file_path, csv_file_path):
+    """Convert Wharton Smith 911 JSON data to CSV format, returning the CSV rows
+
+    Like write_json_csv, which does the work, but the rows are also returned
+    as PROGRESS_COLUMNS lists.
+    """
+    rows = []
+    write_json_csv(json_file_path, csv_file_path, rows)
+    return rows
 
 if __name__ == "__main__":
-    convert_json_to_csv("wharton_platform/911_clean_fixed.json", "wharton_platform/WhartonSmith_911_raw.csv")
+    write_json_csv("wharton_platform/911_clean_fixed.json", "wharton_platform/WhartonSmith_911_raw.csv")
@@ -1,87 +1,223 @@
-import re
 import json
+import os
+import re
+from itertools import chain
+
+from instrument import stage
+
+# One RTF token: control word, hex byte, control symbol, group brace, plain text or raw line break
+RTF_TOKEN = re.compile(
+    r"\\([a-zA-Z]+)(-?\d+)? ?"
+    r"|\\'([0-9a-fA-F]{2})"
+    r"|\\(.)"
+    r"|([{}])"
+    r"|([^\\{}\r\n]+)"
+    r"|[\r\n]+",
+    re.DOTALL,
+)
+
+# Longest token that could still be cut off at the end of a chunk
+RTF_TOKEN_LOOKAHEAD = 48
+
+# Groups starting with these control words hold document metadata, not text
+RTF_DESTINATIONS = {
+    'fonttbl', 'colortbl', 'expandedcolortbl', 'stylesheet', 'info', 'pict',
+    'header', 'footer', 'listtable', 'listoverridetable', 'rsidtbl', 'generator',
+}
+
+RTF_SYMBOLS = {'\\': '\\', '{': '{', '}': '}', '\n': '\n', '\r': '\n', '~': '\u00a0', '_': '-', '-': '', '*': ''}
+RTF_TEXT_WORDS = {'par': '\n', 'line': '\n', 'tab': '\t', 'emdash': '\u2014', 'endash': '\u2013'}
+
+
+def read_rtf_chunks(rtf_file_path, chunk_size=1 << 16):
+    """Read an RTF file as a sequence of text chunks"""
+    with open(rtf_file_path, 'r', encoding='utf-8', errors='replace', newline='') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def iter_rtf_text(chunks):
+    """Yield the document text of an RTF stream in a single pass
+
+    Control words are dropped, escaped braces/backslashes and hex bytes are
+    decoded, and metadata groups (font/colour tables, \\* destinations) are
+    skipped. Tokens split across chunk boundaries are carried over.
+    """
+    codepage = 'cp1252'
+    depth = 0
+    skip_depth = None   # depth of the metadata group being skipped
+    group_start = False  # just saw '{', next control word may name a destination
+    unicode_skip = 1
+    pending_skip = 0
+    tail = ''
+
+    # A trailing None marks the end of the stream, where nothing is held back
+    for chunk in chain(chunks, [None]):
+        buffer = tail + (chunk or '')
+        limit = len(buffer) - RTF_TOKEN_LOOKAHEAD if chunk is not None else len(buffer)
+        tail = ''
+        position = 0
+        for match in RTF_TOKEN.finditer(buffer):
+            # A gap before a match is a '\\' that matched nothing: the start of a
+            # control sequence cut off by the chunk boundary
+            if chunk is not None and (match.start() > position or (match.end() > limit and match.lastindex != 6)):
+                tail = buffer[position:]
+                break
+            position = match.end()
+            word, param, hex_byte, symbol, brace, text = match.groups()
+
+            if brace == '{':
+                depth += 1
+                group_start = True
+                continue
+            if brace == '}':
+                if skip_depth is not None and depth == skip_depth:
+                    skip_depth = None
+                depth -= 1
+                group_start = False
+                continue
+
+            if group_start and skip_depth is None and (word in RTF_DESTINATIONS or symbol == '*'):
+                skip_depth = depth
+            group_start = False
+            if skip_depth is not None:
+                continue
+
+            if word is not None:
+                if word == 'ansicpg' and param:
+                    codepage = 'cp' + param
+                elif word == 'uc' and param:
+                    unicode_skip = int(param)
+                elif word == 'u' and param:
+                    yield chr(int(param) % 0x10000)
+                    pending_skip = unicode_skip
+                elif word in RTF_TEXT_WORDS:
+                    yield RTF_TEXT_WORDS[word]
+            elif hex_byte is not None:
+                if pending_skip:
+                    pending_skip -= 1
+                else:
+                    yield bytes([int(hex_byte, 16)]).decode(codepage, errors='replace')
+            elif symbol is not None:
+                yield RTF_SYMBOLS.get(symbol, symbol)
+            elif text is not None:
+                if pending_skip:
+                    dropped = min(pending_skip, len(text))
+                    pending_skip -= dropped
+                    text = text[dropped:]
+                if text:
+                    yield text
+        else:
+            if chunk is not None:
+                tail = buffer[position:]
+
+
+# Characters that change the JSON nesting state, outside and inside strings
+_JSON_STRUCTURE = re.compile(r'["{}\[\]]')
+_JSON_STRING_END = re.compile(r'["\\]')
+
+
+def iter_rtf_json_text(chunks):
+    """Yield the text of the JSON value embedded in an RTF stream, piece by piece
+
+    Text before the first '{' and after the end of the JSON value is
+    dropped. The end is found by tracking brackets outside strings, so only
+    the current piece is held in memory.
+    """
+    started = False
+    depth = 0
+    in_string = False
+    carry = 0  # characters of the next piece still covered by a backslash escape
+    for piece in iter_rtf_text(chunks):
+        if not started:
+            start = piece.find('{')
+            if start == -1:
+                continue
+            piece = piece[start:]
+            started = True
+        position = carry
+        end = None
+        while True:
+            match = (_JSON_STRING_END if in_string else _JSON_STRUCTURE).search(piece, position)
+            if match is None:
+                break
+            c = match.group()
+            position = match.end()
+            if c == '\\':
+                position += 1
+            elif c == '"':
+                in_string = not in_string
+            elif c in '{[':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    end = position
+                    break
+        carry = max(position - len(piece), 0)
+        if end is not None:
+            yield piece[:end]
+            return
+        yield piece
+    if not started:
+        raise ValueError("No JSON object found in RTF content")
+
+
+def write_rtf_json(chunks, output_file_path):
+    """Stream the JSON embedded in an RTF stream to a file; returns characters written"""
+    written = 0
+    with stage('parse RTF') as s, open(output_file_path, 'w', encoding='utf-8') as outfile:
+        for piece in iter_rtf_json_text(chunks):
+            outfile.write(piece)
+            written += len(piece)
+        s.rows_out = written
+    return written
+
 
 def convert_rtf_to_json(rtf_file_path, output_file_path):
     """Convert RTF formatted JSON file to clean JSON"""
-    
-    with open(rtf_file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-    
-    print(f"Original file size: {len(content)} characters")
-    
-    # Remove RTF header and formatting
-    # Find the actual JSON content by looking for the "table" key
-    table_start = content.find('"table":')
-    if table_start == -1:
-        raise ValueError("No 'table' key found in RTF file")
-    
-    # Work backwards to find the opening brace before "table"
-    json_start = content.rfind('\\{', 0, table_start)
-    if json_start == -1:
-        json_start = content.rfind('{', 0, table_start)
-    
-    if json_start == -1:
-        raise ValueError("No opening brace found before 'table' key")
-    
-    # Extract content from that point to end
-    json_content = content[json_start:]
-    
-    # Step 1: Convert RTF escaped braces to actual braces
-    json_content = json_content.replace('\\{', '{')
-    json_content = json_content.replace('\\}', '}')
-    json_content = json_content.replace('\\"', '"')
-    
-    # Step 2: Remove all RTF control sequences aggressively
-    json_content = re.sub(r'\\[a-zA-Z]+\d*\*?\s*', '', json_content)  # Remove RTF commands
-    json_content = re.sub(r'\\[^a-zA-Z\s]', '', json_content)         # Remove escape sequences
-    
-    # Step 3: Remove RTF formatting groups that aren't JSON
-    json_content = re.sub(r'{[^{}"]*;[^}]*}', '', json_content)  # Remove {font;color;} groups
-    json_content = re.sub(r'{\\[^}]*}', '', json_content)        # Remove {\command} groups
-    
-    # Step 4: Clean up remaining artifacts
-    json_content = re.sub(r'\\+', '', json_content)    # Remove backslashes
-    json_content = re.sub(r'\s+', ' ', json_content)   # Normalize whitespace
-    json_content = json_content.strip()
-    
-    # Step 5: Ensure proper JSON structure
-    if not json_content.startswith('{'):
-        json_content = '{' + json_content
-    if not json_content.endswith('}'):
-        json_content = json_content + '}'
-    
-    # Step 5: Final cleanup
-    json_content = re.sub(r'\s+', ' ', json_content)
-    json_content = json_content.strip()
-    
-    print(f"Cleaned content size: {len(json_content)} characters")
-    print(f"First 200 chars: {json_content[:200]}")
-    
+
+    # Tokenize the RTF and stream the embedded JSON text to disk, then decode it from there
+    tmp_path = output_file_path + '.tmp'
     try:
-        # Parse the JSON
-        data = json.loads(json_content)
-        
-        # Write clean JSON to output file
-        with open(output_file_path, 'w', encoding='utf-8') as outfile:
-            json.dump(data, outfile, indent=2)
-        
-        print(f"✅ Successfully converted {rtf_file_path} to {output_file_path}")
-        print(f"JSON contains {len(data)} top-level keys")
-        
-        if 'table' in data:
-            dates = list(data['table'].keys())
-            print(f"Date range: {min(dates)} to {max(dates)}")
-            print(f"Total dates: {len(dates)}")
-            
-        if 'locationKeyToName' in data:
-            print(f"Total locations: {len(data['locationKeyToName'])}")
-        
-        return data
-        
+        size = write_rtf_json(read_rtf_chunks(rtf_file_path), tmp_path)
+        with stage('decode JSON'), open(tmp_path, 'r', encoding='utf-8') as f:
+            json_head = f.read(200)
+            f.seek(0)
+            data = json.load(f)
     except json.JSONDecodeError as e:
         print(f"❌ JSON parsing error: {e}")
-        print(f"Content around error: {json_content[max(0, e.pos-50):e.pos+50]}")
+        print(f"Content around error: {e.doc[max(0, e.pos-50):e.pos+50]}")
         return None
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    print(f"Cleaned content size: {size} characters")
+    print(f"First 200 chars: {json_head}")
+
+    if 'table' not in data:
+        raise ValueError("No 'table' key found in RTF file")
+
+    # Write clean JSON to output file
+    with stage('write JSON'), open(output_file_path, 'w', encoding='utf-8') as outfile:
+        json.dump(data, outfile, indent=2)
+
+    print(f"✅ Successfully converted {rtf_file_path} to {output_file_path}")
+    print(f"JSON contains {len(data)} top-level keys")
+
+    if 'table' in data:
+        dates = list(data['table'].keys())
+        print(f"Date range: {min(dates)} to {max(dates)}")
+        print(f"Total dates: {len(dates)}")
+
+    if 'locationKeyToName' in data:
+        print(f"Total locations: {len(data['locationKeyToName'])}")
+
+    return data
 
 if __name__ == "__main__":
     convert_rtf_to_json("wharton_platform/911_raw.rtf", "wharton_platform/911_clean.json")
@@ -1,67 +1,205 @@
 import csv
+import io
+import mmap
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-def convert_raw_txt_to_csv(txt_file, csv_file):
-    """Convert the raw data TXT file to CSV format"""
-    
-    # Read the text file
-    with open(txt_file, 'r', encoding='utf-8') as file:
-        lines = file.readlines()
-    
-    print(f"Reading {len(lines)} lines from {txt_file}")
-    
+from instrument import stage
+
+RAW_CSV_HEADERS = ['date', 'location', 'trade', 'status']
+# Target bytes per parse chunk; chunks end on a newline
+CHUNK_BYTES = 8 << 20
+SAMPLE_ROWS = 5
+
+def _is_data_line(line):
     # Filter out header lines and empty lines
-    data_lines = []
+    return '|' in line and not line.startswith('Format:') and not line.startswith('=') and not line.startswith('-')
+
+def iter_raw_txt_rows(lines, warnings=None):
+    """Yield [date, location, trade, status] for each data line of a raw TXT export
+
+    Malformed lines are reported with a warning, or appended to warnings if given.
+    """
     for line in lines:
         line = line.strip()
-        if '|' in line and not line.startswith('Format:') and not line.startswith('=') and not line.startswith('-'):
-            data_lines.append(line)
-    
-    print(f"Found {len(data_lines)} data lines")
-    
-    # Parse each line into CSV format
-    csv_rows = []
-    headers = ['date', 'location', 'trade', 'status']
-    
-    for line in data_lines:
+        if not _is_data_line(line):
+            continue
+        
         # Split by ' | ' (pipe with spaces)
         parts = [part.strip() for part in line.split(' | ')]
         
         if len(parts) == 4:
-            date, location, trade, status = parts
-            csv_rows.append([date, location, trade, status])
+            yield parts
+        elif warnings is not None:
+            warnings.append(line)
         else:
             print(f"Warning: Skipping malformed line: {line}")
-    
-    # Write to CSV
-    with open(csv_file, 'w', newline='', encoding='utf-8') as csvfile:
+
+class ChunkResult:
+    """CSV text and summary of one chunk of a raw TXT export"""
+
+    def __init__(self):
+        self.csv_text = ''
+        self.lines = 0
+        self.data_lines = 0
+        self.rows = 0
+        self.samples = []
+        self.warnings = []
+        self.dates = set()
+        self.locations = set()
+        self.trades = set()
+        self.statuses = set()
+
+    def merge(self, other):
+        """Fold a later chunk's counts and sets into this one (csv_text is not kept)"""
+        self.lines += other.lines
+        self.data_lines += other.data_lines
+        self.rows += other.rows
+        self.samples.extend(other.samples[:SAMPLE_ROWS - len(self.samples)])
+        self.warnings.extend(other.warnings)
+        self.dates |= other.dates
+        self.locations |= other.locations
+        self.trades |= other.trades
+        self.statuses |= other.statuses
+
+
+def _chunk_bounds(data, chunk_bytes):
+    """(start, end) byte ranges covering data, each ending just after a newline"""
+    bounds = []
+    start = 0
+    size = len(data)
+    while start < size:
+        end = data.find(b'\n', min(start + chunk_bytes, size) - 1)
+        end = size if end < 0 else end + 1
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def _parse_text(text):
+    """Parse the lines of one chunk into CSV text and its summary"""
+    result = ChunkResult()
+    lines = text.split('\n')
+    if lines and not lines[-1]:
+        lines.pop()
+    result.lines = len(lines)
+    data_lines = [line.strip() for line in lines if _is_data_line(line.strip())]
+    result.data_lines = len(data_lines)
+
+    out = io.StringIO()
+    writer = csv.writer(out)
+    for row in iter_raw_txt_rows(data_lines, result.warnings):
+        writer.writerow(row)
+        result.rows += 1
+        if len(result.samples) < SAMPLE_ROWS:
+            result.samples.append(row)
+        result.dates.add(row[0])
+        result.locations.add(row[1])
+        result.trades.add(row[2])
+        result.statuses.add(row[3])
+    result.csv_text = out.getvalue()
+    return result
+
+
+def _parse_chunk(txt_file, start, end):
+    """Parse one byte range of a raw TXT export, memory-mapping it in this process"""
+    with open(txt_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return _parse_text(data[start:end].decode('utf-8'))
+
+
+def iter_raw_txt_chunks(txt_file, workers=None, chunk_bytes=CHUNK_BYTES):
+    """Yield a ChunkResult per newline-aligned chunk of a raw TXT export, in file order
+
+    The file is memory-mapped and split into chunks of about chunk_bytes;
+    with more than one worker the chunks are parsed in a process pool, each
+    worker mapping the file itself so only byte offsets are sent to it.
+    """
+    if os.path.getsize(txt_file) == 0:
+        return
+    with open(txt_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        bounds = _chunk_bounds(data, chunk_bytes)
+        workers = min(workers or os.cpu_count() or 1, len(bounds))
+        if workers == 1:
+            for start, end in bounds:
+                yield _parse_text(data[start:end].decode('utf-8'))
+            return
+    # Keep only a few chunks in flight so parsed chunks are not all held at once
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for start, end in bounds:
+            pending.append(pool.submit(_parse_chunk, txt_file, start, end))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_raw_txt_csv(txt_file, csv_file, workers=None, chunk_bytes=CHUNK_BYTES, rows=None):
+    """Convert the raw data TXT file to CSV format, returning the number of rows written
+
+    Chunks are parsed in parallel (see iter_raw_txt_chunks) and written in
+    file order; the summary is gathered in the same pass, so the rows are
+    never all held in memory unless rows, a list, is given to collect them.
+    """
+    summary = ChunkResult()
+    headers = RAW_CSV_HEADERS
+    with stage('parse + write CSV') as s, open(csv_file, 'w', newline='', encoding='utf-8') as csvfile:
         writer = csv.writer(csvfile)
         writer.writerow(headers)  # Write header row
-        writer.writerows(csv_rows)
+        for chunk in iter_raw_txt_chunks(txt_file, workers, chunk_bytes):
+            csvfile.write(chunk.csv_text)
+            if rows is not None:
+                rows.extend(csv.reader(io.StringIO(chunk.csv_text)))
+            summary.merge(chunk)
+        s.rows_in = summary.lines
+        s.rows_out = summary.rows
+
+    for line in summary.warnings:
+        print(f"Warning: Skipping malformed line: {line}")
+    print(f"Reading {summary.lines} lines from {txt_file}")
+    print(f"Found {summary.data_lines} data lines")
     
     print(f"✅ CSV created: {csv_file}")
-    print(f"Total rows: {len(csv_rows)} (plus header)")
+    print(f"Total rows: {summary.rows} (plus header)")
     print(f"Columns: {headers}")
     
     # Show sample data
     print(f"\nSample CSV rows:")
-    for i, row in enumerate(csv_rows[:5]):
+    for i, row in enumerate(summary.samples):
         print(f"{i+1}. {row}")
     
     # Summary statistics
-    dates = set(row[0] for row in csv_rows)
-    locations = set(row[1] for row in csv_rows)
-    trades = set(row[2] for row in csv_rows)
-    statuses = set(row[3] for row in csv_rows)
-    
     print(f"\n📊 Summary:")
-    print(f"Unique dates: {len(dates)}")
-    print(f"Unique locations: {len(locations)}")
-    print(f"Unique trades: {len(trades)}")
-    print(f"Unique statuses: {len(statuses)}")
-    print(f"Trades: {sorted(trades)}")
-    print(f"Statuses: {sorted(statuses)}")
+    print(f"Unique dates: {len(summary.dates)}")
+    print(f"Unique locations: {len(summary.locations)}")
+    print(f"Unique trades: {len(summary.trades)}")
+    print(f"Unique statuses: {len(summary.statuses)}")
+    print(f"Trades: {sorted(summary.trades)}")
+    print(f"Statuses: {sorted(summary.statuses)}")
     
-    return csv_rows
+    return summary.rows
+
+def convert_raw_txt_to_csv(txt_file, csv_file, workers=None, chunk_bytes=CHUNK_BYTES):
+    """Convert the raw data TXT file to CSV format, returning the CSV rows
+
+    Like write_raw_txt_csv, which does the work, but the rows are also
+    collected as they are written and returned as [date, location, trade, status] lists.
+    """
+    rows = []
+    write_raw_txt_csv(txt_file, csv_file, workers, chunk_bytes, rows)
+    return rows
 
 if __name__ == "__main__":
-    convert_raw_txt_to_csv("WhartonSmith_911_Raw_Data.txt", "WhartonSmith_911_Raw_Data.csv")
+    args = sys.argv[1:]
+    workers = None
+    if '--workers' in args:
+        i = args.index('--workers')
+        workers = int(args[i + 1])
+        del args[i:i + 2]
+    if len(args) == 2:
+        # convert_raw_txt_to_csv.py <raw.txt> <raw.csv> [--workers N]
+        write_raw_txt_csv(args[0], args[1], workers)
+    else:
+        write_raw_txt_csv("WhartonSmith_911_Raw_Data.txt", "WhartonSmith_911_Raw_Data.csv", workers)
@@ -1,86 +1,149 @@
 #!/usr/bin/env python3
-import csv
 import datetime
-from collections import defaultdict
-
-def create_uno_synthesized():
-    # Read the original UNO data
-    input_file = 'UNO_construction_data_fixed.csv'
-    output_file = 'UNO_synthesized.csv'
-    
-    # Create mapping for generic location names
-    # Group locations by their section/zone
-    section_locations = defaultdict(list)
-    
-    # First pass: collect all unique locations per section
-    with open(input_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            section = row['section']
-            location = row['location']
-            if location not in section_locations[section]:
-                section_locations[section].append(location)
-    
-    # Create generic location mapping
-    location_mapping = {}
-    for section, locations in section_locations.items():
-        for i, location in enumerate(locations, 1):
-            if section.startswith('Zone'):
-                # For zones, use "Zone X, Location Y" format
-                generic_name = f"{section}, Location {i}"
-            else:
-                # For other sections, use "Section X, Location Y" format
-                generic_name = f"{section}, Location {i}"
-            location_mapping[location] = generic_name
-    
-    # Process the data with generic names and shifted dates
-    rows = []
-    with open(input_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # Create new row with generic location name
-            new_row = row.copy()
-            new_row['location'] = location_mapping.get(row['location'], row['location'])
-            
-            # Shift dates by 6 months earlier
-            for date_field in ['start_date', 'complete_date', 'capture_date']:
-                if row[date_field] and row[date_field] != '':
-                    try:
-                        # Parse the date (format: YYYY/MM/DD)
-                        original_date = datetime.datetime.strptime(row[date_field], '%Y/%m/%d')
-                        # Shift 6 months earlier
-                        shifted_date = original_date.replace(year=original_date.year - 1, month=max(1, original_date.month - 6))
-                        # Adjust year if month goes below 1
-                        if original_date.month <= 6:
-                            shifted_date = shifted_date.replace(year=shifted_date.year - 1, month=shifted_date.month + 6)
-                        new_row[date_field] = shifted_date.strftime('%Y/%m/%d')
-                    except ValueError:
-                        # Keep original if date parsing fails
-                        pass
-            
-            rows.append(new_row)
-    
-    # Write the synthesized data
-    with open(output_file, 'w', newline='', encoding='utf-8') as f:
-        if rows:
-            fieldnames = rows[0].keys()
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
-    
-    print(f"✅ Created {output_file} with {len(rows)} rows")
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+from instrument import stage
+from progress_store import iter_progress_rows, open_progress_writer
+
+DATE_FIELDS = ('start_date', 'complete_date', 'capture_date')
+DATE_FORMAT = '%Y/%m/%d'
+
+# About six months earlier; a fixed number of days keeps dates distinct and in order
+DATE_SHIFT = datetime.timedelta(days=182)
+
+class DateShifter:
+    """Shift YYYY/MM/DD strings by DATE_SHIFT, parsing each distinct date once"""
+
+    def __init__(self, shift=DATE_SHIFT):
+        self.shift = shift
+        self.shifted = {}
+
+    def __call__(self, value):
+        shifted = self.shifted.get(value)
+        if shifted is None:
+            try:
+                shifted = (datetime.datetime.strptime(value, DATE_FORMAT) - self.shift).strftime(DATE_FORMAT)
+            except ValueError:
+                # Keep original if date parsing fails
+                shifted = value
+            self.shifted[value] = shifted
+        return shifted
+
+class LocationAnonymizer:
+    """Generic "{section}, Location {n}" names, numbered by first appearance within each section"""
+
+    def __init__(self):
+        self.mapping = {}
+        self.section_counts = {}
+
+    def __call__(self, section, location):
+        generic_name = self.mapping.get(location)
+        if generic_name is None:
+            count = self.section_counts.get(section, 0) + 1
+            self.section_counts[section] = count
+            generic_name = self.mapping[location] = f"{section}, Location {count}"
+        return generic_name
+
+def synthesize_rows(rows, anonymize_location, shift_date):
+    """Yield copies of progress rows with generic locations and shifted dates"""
+    for row in rows:
+        new_row = dict(row)
+        new_row['location'] = anonymize_location(row['section'], row['location'])
+        for date_field in DATE_FIELDS:
+            if row.get(date_field):
+                new_row[date_field] = shift_date(row[date_field])
+        yield new_row
+
+def synthesize_file(input_file, output_file):
+    """Anonymize one progress CSV (or .pgs store) in a single pass
+
+    Returns (row count, location mapping, sorted shifted capture dates).
+    """
+    anonymize_location = LocationAnonymizer()
+    shift_date = DateShifter()
+    capture_dates = set()
+    total = 0
+
+    rows = synthesize_rows(iter_progress_rows(input_file), anonymize_location, shift_date)
+    first = next(rows, None)
+    if first is not None:
+        with open_progress_writer(output_file, list(first.keys())) as writer:
+            for row in chain([first], rows):
+                writer.writerow(row)
+                capture_dates.add(row['capture_date'])
+                total += 1
+
+    capture_dates.discard('')
+    return total, anonymize_location.mapping, sorted(capture_dates)
+
+def create_uno_synthesized(input_file='UNO_construction_data_fixed.csv', output_file='UNO_synthesized.csv'):
+    # Read the original UNO data (CSV or .pgs progress store), map each
+    # location to a generic name per section and shift dates ~6 months earlier
+    with stage('anonymize rows') as s:
+        total, location_mapping, capture_dates = synthesize_file(input_file, output_file)
+        s.rows_out = total
+
+    print(f"✅ Created {output_file} with {total} rows")
     print(f"📊 Original locations mapped to generic names:")
     for original, generic in list(location_mapping.items())[:10]:  # Show first 10
         print(f"   {original} → {generic}")
     if len(location_mapping) > 10:
         print(f"   ... and {len(location_mapping) - 10} more locations")
-    
+
     # Show date range info
-    capture_dates = [row['capture_date'] for row in rows if row['capture_date']]
     if capture_dates:
-        min_date = min(capture_dates)
-        max_date = max(capture_dates)
-        print(f"📅 Date range: {min_date} to {max_date}")
+        print(f"📅 Date range: {capture_dates[0]} to {capture_dates[-1]}")
+
+    return total
+
+def _synthesized_path(input_file, output_dir):
+    stem, suffix = os.path.splitext(os.path.basename(input_file))
+    return os.path.join(output_dir, f"{stem}_synthesized{suffix or '.csv'}")
+
+def _synthesize_job(job):
+    input_file, output_file = job
+    total, location_mapping, _ = synthesize_file(input_file, output_file)
+    return input_file, output_file, total, len(location_mapping)
+
+def create_synthesized_projects(input_files, output_dir, workers=None):
+    """Anonymize many project files in parallel, one output per input
+
+    Each project gets its own mapping, which depends only on that file's
+    row order, so results are identical however the jobs are scheduled.
+    Outputs are named <input stem>_synthesized<suffix> in output_dir.
+    Returns [(input_file, output_file, rows, locations)] in input order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(input_file, _synthesized_path(input_file, output_dir)) for input_file in input_files]
+    outputs = [output_file for _, output_file in jobs]
+    if len(set(outputs)) != len(outputs):
+        raise ValueError("Input files must have distinct names to get distinct outputs")
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs)) or 1
+    with stage('anonymize projects', rows_in=len(jobs)) as s:
+        if workers == 1:
+            results = [_synthesize_job(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_synthesize_job, jobs))
+        s.rows_out = sum(result[2] for result in results)
+
+    for input_file, output_file, total, num_locations in results:
+        print(f"✅ {input_file} → {output_file}: {total} rows, {num_locations} locations")
+    return results
 
 if __name__ == "__main__":
-    create_uno_synthesized()
+    if len(sys.argv) > 2:
+        # create_uno_synthesized.py <output_dir> <project.csv> [project.csv ...] [--workers N]
+        args = sys.argv[1:]
+        workers = None
+        if '--workers' in args:
+            i = args.index('--workers')
+            workers = int(args[i + 1])
+            del args[i:i + 2]
+        create_synthesized_projects(args[1:], args[0], workers)
+    else:
+        create_uno_synthesized()
@@ -1,15 +1,378 @@
 import csv
-from collections import defaultdict
+import json
+import os
+import sys
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+from itertools import groupby
 
-def enhance_911_data(input_csv, output_csv):
-    """Enhance Wharton Smith 911 CSV data with derived dates and sections"""
+from external_sort import DEFAULT_RUN_ITEMS, external_sort
+from instrument import stage
+from progress_store import (PROGRESS_COLUMNS, ProgressStore, is_store_path, is_warehouse_path, iter_progress_rows,
+                            load_progress_store, open_progress_writer, read_progress_table, save_progress_store,
+                            split_warehouse_path)
+
+try:
+    import numpy as np
+except ImportError:  # fall back to the row-by-row implementation
+    np = None
+
+# Per-task result of derive_transition_dates; key_* arrays are indexed by task key
+TransitionDates = namedtuple(
+    'TransitionDates',
+    'order key start complete date_values key_first_row key_last_row key_start key_complete'
+)
+
+def write_enhanced_911_csv(input_csv, output_csv, checkpoint_path=None, out_rows=None):
+    """Enhance Wharton Smith 911 CSV data with derived dates and sections, returning the row count
+
+    When checkpoint_path is given, the per-task state needed by
+    append_capture is saved there as well. The enhanced rows are appended
+    to out_rows as dicts if it is given.
+    """
+    if np is None:
+        with stage('load rows') as s:
+            headers, rows = read_progress_table(input_csv)
+            s.rows_out = len(rows)
+        return _enhance_911_data_rows(headers, rows, output_csv, checkpoint_path, out_rows)
+    
+    # Read CSV (or .pgs progress store) into integer-coded columns
+    with stage('load rows') as s:
+        store = load_progress_store(input_csv)
+        s.rows_out = len(store)
+    return enhance_progress_store(store, output_csv, checkpoint_path, out_rows)
+
+def enhance_911_data(input_csv, output_csv, checkpoint_path=None):
+    """Enhance Wharton Smith 911 CSV data with derived dates and sections
+
+    Like write_enhanced_911_csv, which does the work, but the enhanced rows
+    are also returned as dicts keyed by column.
+    """
+    out_rows = []
+    write_enhanced_911_csv(input_csv, output_csv, checkpoint_path, out_rows)
+    return out_rows
+
+def enhance_progress_store(store, output_csv, checkpoint_path=None, out_rows=None):
+    """Enhance progress rows that are already held in a ProgressStore, returning the row count"""
+    if np is None:
+        return _enhance_911_data_rows(list(store.columns), list(store.iter_rows()), output_csv, checkpoint_path,
+                                      out_rows)
+    
+    headers = store.columns
+    
+    print(f"Loaded {len(store)} rows")
+    print(f"Columns: {headers}")
+    
+    with stage('derive transitions', rows_in=len(store)):
+        derived = derive_transition_dates(store)
+    order, key, start, complete, date_values = derived[:5]
+    
+    # Build the enhanced columns in (location, trade, capture_date) order
+    row_key = key[order]
+    
+    # Rows without a derived date point at the empty string after the last date
+    blank = len(date_values)
+    date_values = date_values + [""]
+    start = np.where(start < 0, blank, start)
+    complete = np.where(complete < 0, blank, complete)
+    columns = []
+    for name in headers:
+        if name == 'section':
+            locations = store.dictionaries['location']
+            sections = [_derive_section(location) for location in locations]
+            codes = store.codes_numpy('location')[order]
+            columns.append((name, sections, codes))
+        elif name == 'start_date':
+            columns.append((name, date_values, start))
+        elif name == 'complete_date':
+            columns.append((name, date_values, complete))
+        else:
+            columns.append((name, store.dictionaries[name], store.codes_numpy(name)[order]))
+    enhanced = ProgressStore.from_codes(columns)
+    
+    # Save enhanced CSV
+    with stage('write output', rows_in=len(enhanced)):
+        save_progress_store(enhanced, output_csv)
+    if out_rows is not None:
+        out_rows.extend(enhanced.iter_rows())
+    
+    print(f"✅ Enhanced CSV saved: {output_csv}")
+    print(f"Sample data:")
+    for i, row in enumerate(enhanced.iter_rows()):
+        if i == 3:
+            break
+        print(f"Row {i+1}: {row}")
+    
+    # Summary stats
+    states = store.dictionaries['state']
+    row_state = store.codes_numpy('state')[order]
+    total_tasks = int(key.max()) + 1 if len(key) else 0
+    completed_count = _count_keys(row_key, row_state, states, "complete")
+    in_progress_count = _count_keys(row_key, row_state, states, "in progress")
+    
+    print(f"\n📊 SUMMARY:")
+    print(f"Total unique tasks: {total_tasks}")
+    print(f"Completed tasks: {completed_count}")
+    print(f"In progress tasks: {in_progress_count}")
+    print(f"Completion rate: {(completed_count/total_tasks*100):.1f}%")
     
-    # Read CSV
-    rows = []
-    with open(input_csv, 'r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        headers = reader.fieldnames
-        rows = list(reader)
+    if checkpoint_path:
+        with stage('save checkpoint'):
+            save_checkpoint(_checkpoint_from_derived(store, derived), checkpoint_path)
+        print(f"💾 Checkpoint saved: {checkpoint_path}")
+    
+    return len(enhanced)
+
+def _sorted_codes(store, name):
+    """Column codes renumbered so that code order matches string order"""
+    values = store.dictionaries[name]
+    ordered = sorted(range(len(values)), key=values.__getitem__)
+    rank = np.empty(len(values), dtype=np.int64)
+    rank[ordered] = np.arange(len(values))
+    return rank[store.codes_numpy(name)], [values[i] for i in ordered]
+
+def _state_code(states, state):
+    return states.index(state) if state in states else -1
+
+def _stable_argsort(values):
+    """Stable argsort of non-negative integers
+
+    Ties are broken by row index, which lets the faster unstable sort be used
+    whenever the combined key still fits in 64 bits.
+    """
+    n = len(values)
+    if n and (int(values.max()) + 1) * n < 2 ** 63:
+        return np.argsort(values * n + np.arange(n))
+    return np.argsort(values, kind='stable')
+
+def _first_date_by_key(hkey, hdate, positions, num_keys):
+    """Date at the first of positions for each key, -1 where a key has none
+
+    positions must be ascending along a history grouped by key.
+    """
+    result = np.full(num_keys, -1, dtype=np.int64)
+    keys = hkey[positions]
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    result[keys[first]] = hdate[positions[first]]
+    return result
+
+def _count_keys(row_key, row_state, states, state):
+    """Number of distinct keys with at least one row in the given state"""
+    return int(np.count_nonzero(np.bincount(row_key[row_state == _state_code(states, state)])))
+
+def derive_transition_dates(store):
+    """Derive start/complete dates for every location-trade series at once
+    
+    Returns a TransitionDates: order is the row permutation sorting by
+    (location, trade, capture_date), key the task code of every row, and
+    start/complete the derived date per row in that order as indexes into
+    date_values (sorted capture dates), -1 for none. Per task key it also
+    gives the first and last row of its history and its derived dates.
+    """
+    location, location_values = _sorted_codes(store, 'location')
+    trade, trade_values = _sorted_codes(store, 'trade')
+    date, date_values = _sorted_codes(store, 'capture_date')
+    states = store.dictionaries['state']
+    state = store.codes_numpy('state').astype(np.int64)
+    not_started = _state_code(states, "not started")
+    in_progress = _state_code(states, "in progress")
+    complete_state = _state_code(states, "complete")
+    
+    # Sort by location, trade, and capture_date (stable, like list.sort)
+    num_trades = max(len(trade_values), 1)
+    num_dates = max(len(date_values), 1)
+    pair = location * num_trades + trade
+    order = _stable_argsort(pair * num_dates + date)
+    
+    # Task key per row: the "{location}_{trade}" string, coded per distinct pair
+    sorted_pair = pair[order]
+    pair_starts = np.ones(len(order), dtype=bool)
+    pair_starts[1:] = sorted_pair[1:] != sorted_pair[:-1]
+    pairs = sorted_pair[pair_starts]
+    pair_index = np.empty(len(order), dtype=np.int64)
+    pair_index[order] = np.cumsum(pair_starts) - 1
+    key_codes = {}
+    key_of_pair = np.array([
+        key_codes.setdefault(f"{location_values[p // num_trades]}_{trade_values[p % num_trades]}", len(key_codes))
+        for p in pairs.tolist()
+    ], dtype=np.int64)
+    key = key_of_pair[pair_index] if len(pairs) else np.zeros(0, dtype=np.int64)
+    
+    # Each key's history: rows in sorted order, then stably by capture date.
+    # Keys follow pair order unless two pairs join to the same string.
+    if len(key_codes) == len(pairs):
+        history = order
+    else:
+        history = order[_stable_argsort(key[order] * num_dates + date[order])]
+    hkey = key[history]
+    hstate = state[history]
+    hdate = date[history]
+    
+    # First and last row of each key's history
+    key_first_row = np.zeros(len(key_codes), dtype=np.int64)
+    key_last_row = np.zeros(len(key_codes), dtype=np.int64)
+    if len(history):
+        boundaries = np.nonzero(hkey[1:] != hkey[:-1])[0]
+        key_first_row[hkey[np.r_[0, boundaries + 1]]] = history[np.r_[0, boundaries + 1]]
+        key_last_row[hkey[np.r_[boundaries, len(history) - 1]]] = history[np.r_[boundaries, len(history) - 1]]
+    
+    # Start date: first transition from "not started" to "in progress"
+    started = (hkey[1:] == hkey[:-1]) & (hstate[:-1] == not_started) & (hstate[1:] == in_progress)
+    start_by_key = _first_date_by_key(hkey, hdate, np.nonzero(started)[0] + 1, len(key_codes))
+    
+    # Complete date: first transition to "complete"
+    complete_by_key = _first_date_by_key(hkey, hdate, np.nonzero(hstate == complete_state)[0], len(key_codes))
+    
+    # Fix data integrity: no dates before work starts, no complete date while in progress
+    row_key = key[order]
+    row_state = state[order]
+    start = start_by_key[row_key]
+    complete = complete_by_key[row_key]
+    start[row_state == not_started] = -1
+    complete[(row_state == not_started) | (row_state == in_progress)] = -1
+    
+    return TransitionDates(order, key, start, complete, date_values,
+                           key_first_row, key_last_row, start_by_key, complete_by_key)
+
+def _checkpoint_from_derived(store, derived):
+    """Checkpoint holding each task's last state and derived dates
+
+    Tasks are keyed like the full run, by "{location}_{trade}", and map to
+    [last_state, start_date, complete_date].
+    """
+    location = store.dictionaries['location']
+    trade = store.dictionaries['trade']
+    state = store.dictionaries['state']
+    location_codes = store.codes('location')
+    trade_codes = store.codes('trade')
+    state_codes = store.codes('state')
+    date_values = derived.date_values
+    tasks = {}
+    for k in range(len(derived.key_first_row)):
+        first = int(derived.key_first_row[k])
+        last = int(derived.key_last_row[k])
+        start = int(derived.key_start[k])
+        complete = int(derived.key_complete[k])
+        tasks[f"{location[location_codes[first]]}_{trade[trade_codes[first]]}"] = [
+            state[state_codes[last]],
+            date_values[start] if start >= 0 else "",
+            date_values[complete] if complete >= 0 else "",
+        ]
+    return {
+        'columns': list(store.columns),
+        'last_capture_date': date_values[-1] if date_values else "",
+        'tasks': tasks,
+    }
+
+def _advance_task(task, state, date):
+    """Update a task's [last_state, start_date, complete_date] with one new observation"""
+    if not task[1] and task[0] == "not started" and state == "in progress":
+        task[1] = date
+    if not task[2] and state == "complete":
+        task[2] = date
+    task[0] = state
+
+def save_checkpoint(checkpoint, checkpoint_path):
+    """Write a checkpoint as JSON, replacing any previous one atomically"""
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, checkpoint_path)
+
+def load_checkpoint(checkpoint_path):
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def append_capture(capture_csv, output_csv, checkpoint_path):
+    """Enhance one new capture and append it to an existing enhanced output
+
+    Only the new rows are read. Each task's start/complete dates continue from
+    the checkpoint written by enhance_911_data (or a previous append), so the
+    cost depends on the size of the capture, not the project history. The new
+    rows carry the dates known as of their capture; earlier rows are not
+    rewritten, so a task completed in this capture shows its complete date
+    on the new rows only until the next full run.
+    """
+    with stage('load capture') as s:
+        checkpoint = load_checkpoint(checkpoint_path)
+        headers, rows = read_progress_table(capture_csv)
+        s.rows_out = len(rows)
+    if list(headers) != checkpoint['columns']:
+        raise ValueError(f"Columns of {capture_csv} do not match the enhanced output: {headers}")
+    
+    last_capture_date = checkpoint['last_capture_date']
+    stale = sorted({row['capture_date'] for row in rows if row['capture_date'] <= last_capture_date})
+    if stale:
+        raise ValueError(f"Capture dates {stale} are not after {last_capture_date}; rerun the full enhancement")
+    
+    print(f"Loaded {len(rows)} new rows")
+    
+    # Apply observations in capture order, then emit rows in output order
+    tasks = checkpoint['tasks']
+    started = set()
+    completed = set()
+    for row in sorted(rows, key=lambda x: x['capture_date']):
+        task_key = f"{row['location']}_{row['trade']}"
+        task = tasks.setdefault(task_key, ["", "", ""])
+        had_start, had_complete = task[1], task[2]
+        _advance_task(task, row['state'], row['capture_date'])
+        if task[1] and not had_start:
+            started.add(task_key)
+        if task[2] and not had_complete:
+            completed.add(task_key)
+    
+    rows.sort(key=lambda x: (x['location'], x['trade'], x['capture_date']))
+    for row in rows:
+        task = tasks[f"{row['location']}_{row['trade']}"]
+        row['start_date'] = task[1]
+        row['complete_date'] = task[2]
+        row['section'] = _derive_section(row['location'])
+        
+        # Fix data integrity
+        state = row['state']
+        if state == "not started":
+            row['start_date'] = ""
+            row['complete_date'] = ""
+        elif state == "in progress":
+            row['complete_date'] = ""
+    
+    with stage('append output', rows_in=len(rows)):
+        if is_warehouse_path(output_csv):
+            from progress_warehouse import write_progress_rows
+            write_progress_rows(*split_warehouse_path(output_csv), rows, replace=False)
+        elif is_store_path(output_csv):
+            store = ProgressStore.load(output_csv)
+            store.extend(rows)
+            store.save(output_csv)
+        else:
+            with open(output_csv, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=headers)
+                writer.writerows(rows)
+        
+        checkpoint['last_capture_date'] = max((row['capture_date'] for row in rows), default=last_capture_date)
+        save_checkpoint(checkpoint, checkpoint_path)
+    
+    print(f"✅ Appended {len(rows)} rows to {output_csv}")
+    print(f"Tasks started in this capture: {len(started)}")
+    print(f"Tasks completed in this capture: {len(completed)}")
+    
+    return len(rows)
+
+def _derive_section(location):
+    """Extract section from location"""
+    section = ""
+    if location and "-" in location:
+        parts = location.upper().split("-")
+        if len(parts) >= 1:
+            first_part = parts[0].strip()
+            # Check if it looks like a zone/section pattern
+            if "ZONE" in first_part or "LEVEL" in first_part or "FLOOR" in first_part:
+                section = first_part
+    return section
+
+def _enhance_911_data_rows(headers, rows, output_csv, checkpoint_path=None, out_rows=None):
+    """Row-by-row enhancement of row dicts, used when NumPy is not installed"""
     
     print(f"Loaded {len(rows)} rows")
     print(f"Columns: {headers}")
@@ -23,7 +386,7 @@ def enhance_911_data(input_csv, output_csv):
     for row in rows:
         key = f"{row['location']}_{row['trade']}"
         transitions[key].append({
-            'date': row['capture_date'], 
+            'date': row['capture_date'],
             'state': row['state']
         })
     
@@ -64,16 +427,7 @@ def enhance_911_data(input_csv, output_csv):
         row['complete_date'] = complete_dates.get(key, "")
         
         # Extract section from location
-        location = row['location']
-        section = ""
-        if location and "-" in location:
-            parts = location.upper().split("-")
-            if len(parts) >= 1:
-                first_part = parts[0].strip()
-                # Check if it looks like a zone/section pattern
-                if "ZONE" in first_part or "LEVEL" in first_part or "FLOOR" in first_part:
-                    section = first_part
-        row['section'] = section
+        row['section'] = _derive_section(row['location'])
         
         # Fix data integrity
         state = row['state']
@@ -86,10 +440,10 @@ def enhance_911_data(input_csv, output_csv):
         enhanced_rows.append(row)
     
     # Save enhanced CSV
-    with open(output_csv, 'w', newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=headers)
-        writer.writeheader()
+    with stage('write output', rows_in=len(enhanced_rows)), open_progress_writer(output_csv, headers) as writer:
         writer.writerows(enhanced_rows)
+    if out_rows is not None:
+        out_rows.extend(enhanced_rows)
     
     print(f"✅ Enhanced CSV saved: {output_csv}")
     print(f"Sample data:")
@@ -120,7 +474,130 @@ def enhance_911_data(input_csv, output_csv):
     print(f"In progress tasks: {in_progress_count}")
     print(f"Completion rate: {(completed_count/total_tasks*100):.1f}%")
     
-    return enhanced_rows
+    if checkpoint_path:
+        checkpoint = {'columns': list(headers), 'last_capture_date': "", 'tasks': {}}
+        for row in sorted(enhanced_rows, key=lambda x: x['capture_date']):
+            task = checkpoint['tasks'].setdefault(f"{row['location']}_{row['trade']}", ["", "", ""])
+            _advance_task(task, row['state'], row['capture_date'])
+            checkpoint['last_capture_date'] = row['capture_date']
+        save_checkpoint(checkpoint, checkpoint_path)
+        print(f"💾 Checkpoint saved: {checkpoint_path}")
+    
+    return len(enhanced_rows)
+
+@contextmanager
+def _open_progress_tuples(path):
+    """(fieldnames, row tuples) streamed from a progress CSV, store or warehouse dataset"""
+    if is_warehouse_path(path):
+        yield list(PROGRESS_COLUMNS), (tuple(row.values()) for row in iter_progress_rows(path))
+        return
+    if is_store_path(path):
+        store = ProgressStore.load(path)
+        yield list(store.columns), (tuple(row.values()) for row in store.iter_rows())
+        return
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        headers = next(reader, [])
+        yield headers, map(tuple, reader)
+
+def _derive_tasks_external(input_csv, run_rows, tmp_dir):
+    """{"{location}_{trade}": [last_state, start_date, complete_date, has_complete, has_in_progress]}
+
+    Rows are externally sorted on the joined key string and capture date
+    (then location and trade), which is the history order enhance_911_data
+    derives each key's dates from, also when two pairs join to one key.
+    """
+    tasks = {}
+    with _open_progress_tuples(input_csv) as (headers, rows):
+        column = {name: i for i, name in enumerate(headers)}
+        location, trade, date, state = (column[name] for name in ('location', 'trade', 'capture_date', 'state'))
+        observations = ((f"{row[location]}_{row[trade]}", row[date], row[location], row[trade], row[state])
+                        for row in rows)
+        ordered = external_sort(observations, key=lambda observation: observation[:4],
+                                run_items=run_rows, tmp_dir=tmp_dir)
+        for joined_key, history in groupby(ordered, key=lambda observation: observation[0]):
+            task = ["", "", "", False, False]
+            for _, capture_date, _, _, task_state in history:
+                _advance_task(task, task_state, capture_date)
+                task[3] = task[3] or task_state == "complete"
+                task[4] = task[4] or task_state == "in progress"
+            tasks[joined_key] = task
+    return tasks
+
+def enhance_911_data_external(input_csv, output_csv, checkpoint_path=None, run_rows=DEFAULT_RUN_ITEMS, tmp_dir=None):
+    """enhance_911_data for inputs larger than memory
+    
+    Two external merge sorts, each holding at most run_rows rows in memory:
+    the first orders rows by their "{location}_{trade}" key and capture date
+    to derive each key's dates, the second by (location, trade,
+    capture_date) to write them. Only one entry per task is kept in memory.
+    The output and checkpoint are byte-identical to enhance_911_data's.
+    """
+    with stage('external sort + derive') as s:
+        tasks = _derive_tasks_external(input_csv, run_rows, tmp_dir)
+        s.rows_out = len(tasks)
+    
+    with _open_progress_tuples(input_csv) as (headers, rows):
+        column = {name: i for i, name in enumerate(headers)}
+        location, trade, date = column['location'], column['trade'], column['capture_date']
+        print(f"Streaming rows from {input_csv} (sort runs of {run_rows} rows)")
+        print(f"Columns: {headers}")
+        
+        # Checkpoint tasks in the order enhance_911_data codes them: first (location, trade) pair of each key
+        checkpoint_tasks = {}
+        last_capture_date = ""
+        total = 0
+        
+        with stage('external sort + enhance') as s, open_progress_writer(output_csv, headers) as writer:
+            ordered = external_sort(rows, key=lambda row: (row[location], row[trade], row[date]),
+                                    run_items=run_rows, tmp_dir=tmp_dir)
+            for (location_name, trade_name), group in groupby(ordered, key=lambda row: (row[location], row[trade])):
+                history = [dict(zip(headers, row)) for row in group]
+                joined_key = f"{location_name}_{trade_name}"
+                task = tasks[joined_key]
+                section = _derive_section(location_name)
+                for row in history:
+                    row['start_date'] = task[1]
+                    row['complete_date'] = task[2]
+                    row['section'] = section
+                    if row['state'] == "not started":
+                        row['start_date'] = ""
+                        row['complete_date'] = ""
+                    elif row['state'] == "in progress":
+                        row['complete_date'] = ""
+                writer.writerows(history)
+                
+                checkpoint_tasks.setdefault(joined_key, task[:3])
+                last_capture_date = max(last_capture_date, history[-1]['capture_date'])
+                total += len(history)
+            s.rows_out = total
+    
+    unique_tasks = len(tasks)
+    completed_count = sum(task[3] for task in tasks.values())
+    in_progress_count = sum(task[4] for task in tasks.values())
+    print(f"✅ Enhanced CSV saved: {output_csv}")
+    
+    print(f"\n📊 SUMMARY:")
+    print(f"Total unique tasks: {unique_tasks}")
+    print(f"Completed tasks: {completed_count}")
+    print(f"In progress tasks: {in_progress_count}")
+    print(f"Completion rate: {(completed_count/unique_tasks*100):.1f}%")
+    
+    if checkpoint_path:
+        save_checkpoint({'columns': list(headers), 'last_capture_date': last_capture_date, 'tasks': checkpoint_tasks},
+                        checkpoint_path)
+        print(f"💾 Checkpoint saved: {checkpoint_path}")
+    
+    return total
 
 if __name__ == "__main__":
-    enhance_911_data("wharton_platform/WhartonSmith_911_raw.csv", "wharton_platform/WhartonSmith_911_enhanced.csv")
+    if len(sys.argv) == 4 and sys.argv[1] == "--append":
+        # enhance_911_data.py --append <capture.csv> <enhanced.csv>
+        append_capture(sys.argv[2], sys.argv[3], sys.argv[3] + ".checkpoint.json")
+    elif len(sys.argv) == 5 and sys.argv[1] == "--external":
+        # enhance_911_data.py --external <run_rows> <raw.csv> <enhanced.csv>
+        enhance_911_data_external(sys.argv[3], sys.argv[4], sys.argv[4] + ".checkpoint.json", int(sys.argv[2]))
+    else:
+        write_enhanced_911_csv("wharton_platform/WhartonSmith_911_raw.csv",
+                               "wharton_platform/WhartonSmith_911_enhanced.csv",
+                               "wharton_platform/WhartonSmith_911_enhanced.csv.checkpoint.json")
@@ -0,0 +1,72 @@
+"""External merge sort for streams that do not fit in memory
+
+external_sort buffers at most run_items items, sorts each full buffer and
+spills it to an anonymous temp file as pickled batches. The sorted runs are
+then k-way merged with heapq.merge, reading one batch per run at a time, so
+memory is bounded by the run size rather than by the length of the stream.
+With more than MAX_FAN_IN runs, consecutive runs are merged into larger ones
+first. The sort is stable, like list.sort: runs keep stream order and
+heapq.merge resolves ties in run order.
+"""
+import heapq
+import pickle
+import tempfile
+from itertools import islice
+
+DEFAULT_RUN_ITEMS = 1_000_000
+MAX_FAN_IN = 64
+BATCH_ITEMS = 4096
+
+
+def _write_run(items, tmp_dir=None):
+    """Spill items to a temp file in pickled batches; returns the file rewound"""
+    f = tempfile.TemporaryFile(dir=tmp_dir)
+    items = iter(items)
+    while True:
+        batch = list(islice(items, BATCH_ITEMS))
+        if not batch:
+            break
+        pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+    f.seek(0)
+    return f
+
+
+def _read_run(f):
+    """Yield the items of a spilled run, closing (and so deleting) it at the end"""
+    with f:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
+
+
+def external_sort(items, key=None, run_items=DEFAULT_RUN_ITEMS, tmp_dir=None):
+    """Yield items in sorted order, holding at most run_items of them in memory"""
+    if run_items < 1:
+        raise ValueError(f"run_items must be at least 1, not {run_items}")
+    runs = []
+    buffer = []
+    for item in items:
+        buffer.append(item)
+        if len(buffer) >= run_items:
+            buffer.sort(key=key)
+            runs.append(_write_run(buffer, tmp_dir))
+            buffer = []
+    buffer.sort(key=key)
+    if not runs:
+        yield from buffer
+        return
+
+    # The last, partial run stays in memory as the final merge input
+    while len(runs) + 1 > MAX_FAN_IN:
+        merged = []
+        for i in range(0, len(runs), MAX_FAN_IN):
+            group = runs[i:i + MAX_FAN_IN]
+            if len(group) == 1:
+                merged.extend(group)
+            else:
+                merged.append(_write_run(heapq.merge(*map(_read_run, group), key=key), tmp_dir))
+        runs = merged
+    yield from heapq.merge(*map(_read_run, runs), buffer, key=key)
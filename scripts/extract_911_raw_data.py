@@ -1,62 +1,99 @@
-import json
+from instrument import stage
+from progress_json import iter_table_dates, scan_progress_json
 
-def extract_raw_data_to_txt(json_file, output_txt):
-    """Extract raw data from 911 JSON and convert to simple text format"""
-    
-    with open(json_file, 'r', encoding='utf-8') as file:
-        data = json.load(file)
-    
-    print("Extracting raw data from JSON...")
-    
-    # Get location mapping
-    location_mapping = data.get('locationKeyToName', {})
-    
-    # Get table data
-    table_data = data.get('table', {})
-    
-    # Extract all raw entries
-    raw_entries = []
+def write_raw_header(file):
+    file.write("WHARTON SMITH 911 PROJECT - RAW DATA EXPORT\n")
+    file.write("=" * 50 + "\n\n")
+    file.write("Format: DATE | LOCATION | TRADE | STATUS\n")
+    file.write("-" * 50 + "\n\n")
+
+def write_raw_entries(file, date, date_entries):
+    for location_name, trade, status in date_entries:
+        file.write(f"{date} | {location_name} | {trade} | {status}\n")
+
+def iter_raw_entries(location_mapping, dated_tables):
+    """Yield (date, [(location, trade, status), ...]) for each non-empty date
     
-    for date, locations in table_data.items():
+    Dates must come in sorted order; sorting each date's entries then gives
+    the same order as sorting by date, location, then trade.
+    """
+    for date, locations in dated_tables:
+        date_entries = []
         for location_id, trades in locations.items():
             if isinstance(trades, dict):
                 # Get actual location name
                 location_name = location_mapping.get(location_id, location_id)
                 
                 for trade, status in trades.items():
-                    raw_entries.append({
-                        'date': date,
-                        'location': location_name,
-                        'trade': trade,
-                        'status': status
-                    })
+                    date_entries.append((location_name, trade, status))
+        
+        if date_entries:
+            date_entries.sort(key=lambda x: (x[0], x[1]))
+            yield date, date_entries
+
+def write_raw_data_txt(json_file, output_txt, entries=None):
+    """Extract raw data from 911 JSON to simple text format, returning the number of entries
+
+    Entries are written one capture date at a time, so they are never all held
+    in memory unless entries, a list, is given to collect them.
+    """
+    
+    # Scan once for metadata; the table is read one capture date at a time
+    with stage('scan JSON'):
+        metadata, table_spans = scan_progress_json(json_file)
+    
+    print("Extracting raw data from JSON...")
     
-    # Sort by date, then location, then trade
-    raw_entries.sort(key=lambda x: (x['date'], x['location'], x['trade']))
+    # Get location mapping
+    location_mapping = metadata.get('locationKeyToName', {})
+    
+    total_entries = 0
+    entry_dates = []
+    unique_locations = set()
+    unique_trades = set()
+    sample_entries = []
     
     # Write to text file
-    with open(output_txt, 'w', encoding='utf-8') as file:
-        file.write("WHARTON SMITH 911 PROJECT - RAW DATA EXPORT\n")
-        file.write("=" * 50 + "\n\n")
-        file.write("Format: DATE | LOCATION | TRADE | STATUS\n")
-        file.write("-" * 50 + "\n\n")
+    with stage('flatten table + write TXT') as s, open(output_txt, 'w', encoding='utf-8') as file:
+        write_raw_header(file)
         
-        for entry in raw_entries:
-            line = f"{entry['date']} | {entry['location']} | {entry['trade']} | {entry['status']}\n"
-            file.write(line)
+        for date, date_entries in iter_raw_entries(location_mapping, iter_table_dates(json_file, table_spans)):
+            write_raw_entries(file, date, date_entries)
+            if entries is not None:
+                entries.extend({'date': date, 'location': location_name, 'trade': trade, 'status': status}
+                               for location_name, trade, status in date_entries)
+            for location_name, trade, status in date_entries:
+                unique_locations.add(location_name)
+                unique_trades.add(trade)
+                if len(sample_entries) < 5:
+                    sample_entries.append((date, location_name, trade, status))
+            
+            total_entries += len(date_entries)
+            entry_dates.append(date)
+        s.rows_out = total_entries
     
     print(f"✅ Raw data exported to: {output_txt}")
-    print(f"Total entries: {len(raw_entries)}")
-    print(f"Date range: {min(e['date'] for e in raw_entries)} to {max(e['date'] for e in raw_entries)}")
-    print(f"Unique locations: {len(set(e['location'] for e in raw_entries))}")
-    print(f"Unique trades: {len(set(e['trade'] for e in raw_entries))}")
+    print(f"Total entries: {total_entries}")
+    print(f"Date range: {min(entry_dates)} to {max(entry_dates)}")
+    print(f"Unique locations: {len(unique_locations)}")
+    print(f"Unique trades: {len(unique_trades)}")
     
     # Show sample data
     print(f"\nSample entries:")
-    for i, entry in enumerate(raw_entries[:5]):
-        print(f"{i+1}. {entry['date']} | {entry['location']} | {entry['trade']} | {entry['status']}")
+    for i, (date, location_name, trade, status) in enumerate(sample_entries):
+        print(f"{i+1}. {date} | {location_name} | {trade} | {status}")
     
-    return raw_entries
+    return total_entries
+
+def extract_raw_data_to_txt(json_file, output_txt):
+    """Extract raw data from 911 JSON and convert to simple text format
+
+    Like write_raw_data_txt, which does the work, but the entries are also
+    returned as {'date', 'location', 'trade', 'status'} dicts.
+    """
+    entries = []
+    write_raw_data_txt(json_file, output_txt, entries)
+    return entries
 
 if __name__ == "__main__":
-    extract_raw_data_to_txt("wharton_platform/911_clean_fixed.json", "WhartonSmith_911_Raw_Data.txt")
+    write_raw_data_txt("wharton_platform/911_clean_fixed.json", "WhartonSmith_911_Raw_Data.txt")
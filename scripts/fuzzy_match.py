@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""Character n-gram TF-IDF matcher between schedule activities and progress names
+
+Usage: fuzzy_match.py <schedule.csv> <progress.csv|.pgs|.json> <output.csv>
+                      [--k N] [--against pairs|trades|locations]
+
+Candidates are the progress side: distinct location-trade pairs (default),
+trades or locations, from a progress CSV/.pgs or a progress JSON's
+locationKeyToName and trades. Every name becomes a TF-IDF weighted,
+L2-normalised vector of character n-grams (IDF from the candidates), so a
+score is the cosine similarity of the two names. Activity names are scored
+against all candidates with one sparse matrix product per batch, and the
+top k per activity are written with their scores.
+
+Without numpy/scipy the same scores come from an inverted n-gram index,
+which only visits candidates sharing an n-gram with the query.
+"""
+import csv
+import heapq
+import math
+import re
+import sys
+from collections import Counter, defaultdict
+
+from instrument import stage
+from progress_json import scan_progress_json
+from progress_store import iter_progress_rows
+from uno_schedule_mapping_generator import read_schedule_csv
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # fall back to the inverted index
+    np = sparse = None
+
+NGRAM_SIZES = (3,)
+TOP_K = 5
+# Scores materialised per batch (queries x candidates); 4M float64 is 32 MB
+BATCH_CELLS = 1 << 22
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+_LEADING_ZEROS = re.compile(r'\b0+(?=\d)')
+
+
+def normalize(text):
+    """Lowercase, collapse punctuation to spaces and drop leading zeros ('USS 01' -> ' uss 1 ')"""
+    text = _NON_ALNUM.sub(' ', text.lower()).strip()
+    return ' ' + _LEADING_ZEROS.sub('', text) + ' '
+
+
+def char_ngrams(text, sizes=NGRAM_SIZES):
+    """Counts of the character n-grams of a normalised name"""
+    text = normalize(text)
+    grams = []
+    for n in sizes:
+        grams.extend([text[i:i + n] for i in range(len(text) - n + 1)])
+    return Counter(grams)
+
+
+class NgramMatcher:
+    """Top-k cosine similarity of n-gram TF-IDF vectors against fixed candidates"""
+
+    def __init__(self, candidates, ngram_sizes=NGRAM_SIZES):
+        self.candidates = list(candidates)
+        self.ngram_sizes = ngram_sizes
+        counts = [char_ngrams(name, ngram_sizes) for name in self.candidates]
+        df = Counter(gram for grams in counts for gram in grams)
+        n = len(self.candidates)
+        self.vocabulary = {gram: i for i, gram in enumerate(df)}
+        # Smoothed IDF; n-grams no candidate has only add to the query's norm
+        self.idf = [math.log((1 + n) / (1 + df[gram])) + 1 for gram in df]
+        self.unknown_idf = math.log(1 + n) + 1
+        self._weights = {gram: (i, self.idf[i]) for gram, i in self.vocabulary.items()}
+        vectors = [self._vector(grams) for grams in counts]
+
+        if sparse is not None:
+            self._idf = np.array(self.idf, dtype=np.float64)
+            self._matrix_t = self._csr(vectors, len(self.vocabulary)).T.tocsr()
+        else:
+            self._postings = defaultdict(list)
+            for row, (columns, weights) in enumerate(vectors):
+                for column, weight in zip(columns, weights):
+                    self._postings[column].append((row, weight))
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def _vector(self, grams):
+        """(columns, weights) of an L2-normalised TF-IDF vector"""
+        columns = []
+        weights = []
+        norm = 0.0
+        unknown = (None, self.unknown_idf)
+        lookup = self._weights.get
+        for gram, count in grams.items():
+            column, idf = lookup(gram, unknown)
+            weight = count * idf
+            norm += weight * weight
+            if column is not None:
+                columns.append(column)
+                weights.append(weight)
+        norm = math.sqrt(norm) or 1.0
+        return columns, [weight / norm for weight in weights]
+
+    @staticmethod
+    def _csr(vectors, width):
+        indptr = [0]
+        indices = []
+        data = []
+        for columns, weights in vectors:
+            indices.extend(columns)
+            data.extend(weights)
+            indptr.append(len(indices))
+        return sparse.csr_matrix((np.array(data, dtype=np.float64), np.array(indices, dtype=np.int64),
+                                  np.array(indptr, dtype=np.int64)), shape=(len(vectors), width))
+
+    def top_k(self, queries, k=TOP_K, min_score=0.0):
+        """For each query, [(candidate index, score)] best first, at most k
+
+        Only scores above min_score are kept; ties keep candidate order.
+        Repeated queries are scored once.
+        """
+        distinct = list(dict.fromkeys(queries))
+        if sparse is not None:
+            results = self._top_k_sparse(distinct, k, min_score)
+        else:
+            results = [self._top_k_postings(self._vector(char_ngrams(query, self.ngram_sizes)), k, min_score)
+                       for query in distinct]
+        by_query = dict(zip(distinct, results))
+        return [by_query[query] for query in queries]
+
+    def _query_matrix(self, queries):
+        """L2-normalised TF-IDF rows for queries, built with numpy
+
+        Each n-gram occurrence is one entry weighted by its IDF; summing the
+        duplicates gives count * IDF. Unknown n-grams get temporary columns
+        past the vocabulary so they count towards the norm, then are dropped.
+        """
+        width = len(self.vocabulary)
+        unknown = {}
+        indptr = [0]
+        indices = []
+        lookup = self.vocabulary.get
+        for query in queries:
+            text = normalize(query)
+            for n in self.ngram_sizes:
+                for gram in [text[i:i + n] for i in range(len(text) - n + 1)]:
+                    column = lookup(gram)
+                    if column is None:
+                        column = unknown.setdefault(gram, width + len(unknown))
+                    indices.append(column)
+            indptr.append(len(indices))
+        indices = np.array(indices, dtype=np.int64)
+        idf = np.concatenate([self._idf, np.full(len(unknown), self.unknown_idf)])
+        matrix = sparse.csr_matrix((idf[indices], indices, np.array(indptr, dtype=np.int64)),
+                                   shape=(len(queries), width + len(unknown)))
+        matrix.sum_duplicates()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        matrix = sparse.diags(1.0 / norms) @ matrix
+        return matrix[:, :width].tocsr()
+
+    def _top_k_sparse(self, queries, k, min_score):
+        m = len(self.candidates)
+        k = min(k, m)
+        if k <= 0:
+            return [[] for _ in queries]
+        batch_size = max(1, BATCH_CELLS // m)
+        results = []
+        for start in range(0, len(queries), batch_size):
+            batch = self._query_matrix(queries[start:start + batch_size])
+            scores = (batch @ self._matrix_t).toarray()
+            if k < m:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(m), scores.shape)
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            if k < m:
+                # argpartition picks arbitrarily among scores tied with the
+                # k-th best; redo those rows with a stable sort
+                kth = top_scores.min(axis=1)
+                tied = np.flatnonzero((scores >= kth[:, None]).sum(axis=1) > k)
+                if len(tied):
+                    top[tied] = np.argsort(-scores[tied], axis=1, kind='stable')[:, :k]
+                    top_scores[tied] = np.take_along_axis(scores[tied], top[tied], axis=1)
+            # Best first, lower candidate index first on ties
+            order = np.lexsort((top, -top_scores), axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            for row, row_scores in zip(top.tolist(), top_scores.tolist()):
+                results.append([(i, s) for i, s in zip(row, row_scores) if s > min_score])
+        return results
+
+    def _top_k_postings(self, vector, k, min_score):
+        scores = defaultdict(float)
+        for column, weight in zip(*vector):
+            for row, candidate_weight in self._postings[column]:
+                scores[row] += weight * candidate_weight
+        best = heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(i, s) for i, s in best if s > min_score]
+
+
+def progress_candidates(path, against='pairs'):
+    """Candidate names from a progress CSV/.pgs or JSON
+
+    Returns [(name, location, trade)]: distinct location-trade pairs (for a
+    JSON, every location with every trade), trades or locations.
+    """
+    if path.lower().endswith('.json'):
+        metadata, _ = scan_progress_json(path, keep_keys=('locationKeyToName', 'trades'))
+        locations = list(dict.fromkeys(metadata.get('locationKeyToName', {}).values()))
+        trades = list(dict.fromkeys(metadata.get('trades', [])))
+        pairs = [(location, trade) for location in locations for trade in trades]
+    else:
+        pairs = list(dict.fromkeys((row['location'], row['trade']) for row in iter_progress_rows(path)))
+        locations = list(dict.fromkeys(location for location, _ in pairs))
+        trades = list(dict.fromkeys(trade for _, trade in pairs))
+
+    if against == 'trades':
+        return [(trade, '', trade) for trade in trades]
+    if against == 'locations':
+        return [(location, location, '') for location in locations]
+    if against == 'pairs':
+        return [('{} {}'.format(location, trade), location, trade) for location, trade in pairs]
+    raise ValueError("against must be 'pairs', 'trades' or 'locations', not {!r}".format(against))
+
+
+def match_schedule(schedule_csv, progress_path, output_csv, k=TOP_K, against='pairs'):
+    """Write the top-k progress candidates for every schedule activity; returns activities matched"""
+    with stage('load candidates') as s:
+        candidates = progress_candidates(progress_path, against)
+        matcher = NgramMatcher(name for name, _, _ in candidates)
+        s.rows_out = len(matcher)
+
+    with stage('read schedule') as s:
+        activities = [(activity_id, name) for activity_id, name, _, _, _, _ in read_schedule_csv(schedule_csv)]
+        s.rows_out = len(activities)
+
+    with stage('score activities', rows_in=len(activities)) as s:
+        matches = matcher.top_k([name for _, name in activities], k)
+        s.rows_out = len(matches)
+
+    with open(output_csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Activity_ID', 'Activity_Name', 'Rank', 'Location', 'Trade', 'Score'])
+        for (activity_id, name), best in zip(activities, matches):
+            for rank, (i, score) in enumerate(best, 1):
+                _, location, trade = candidates[i]
+                writer.writerow([activity_id, name, rank, location, trade, '{:.4f}'.format(score)])
+    return len(activities)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {'--k': str(TOP_K), '--against': 'pairs'}
+    for flag in options:
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1]
+            del args[i:i + 2]
+    if len(args) != 3:
+        raise SystemExit(__doc__)
+    total = match_schedule(args[0], args[1], args[2], int(options['--k']), options['--against'])
+    print(f"✅ Matched {total} activities against {args[1]}")
+    print(f"📁 File: {args[2]}")
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""Generate synthetic 911/UNO-style datasets at a multiple of the real size
+
+Usage: generate_synthetic_data.py <out_dir> [scale ...]
+
+For each scale (default 10) writes <out_dir>/x<scale>/ with the same file
+names the scripts expect:
+
+  911_raw.rtf, 911_clean.json, WhartonSmith_911_raw.csv
+      room-style locations, 94 * scale locations x 7 trades x 17 captures
+  UNO_BigJSON.js, UNO_BigJSON_clean.json, UNO_construction_data_fixed.csv
+      zone/pad-style locations, 117 * scale locations x 4-6 trades x 20 captures
+  UNO3A-MO-250814.csv
+      3307 * scale schedule activities in the P6 export layout
+  UNO3A.xer
+      3307 * scale TASK rows whose names hit compile_aliases()
+
+Progress JSON follows the exported schema (table, dateToReportId,
+reportIdToDate, trades, locationKeyToName, dateTradeStarted,
+dateTradeCompleted, locationTags, locationIssues). Each task moves from
+"not started" through "in progress" to "complete" at random captures, with
+"no data" gaps. Output is deterministic for a given seed and is written
+one capture at a time, so large scales do not need the table in memory.
+"""
+import csv
+import datetime
+import json
+import os
+import random
+import sys
+
+from convert_911_json_to_csv import iter_capture_rows
+from progress_store import PROGRESS_COLUMNS
+
+BASE_911_LOCATIONS = 94
+BASE_UNO_LOCATIONS = 117
+BASE_SCHEDULE_ACTIVITIES = 3307
+
+TRADES_911 = [
+    'Overhead Plumbing', 'Overhead Duct Insulation', 'Wall Drywall Finish', 'Overhead Duct Rough In',
+    'In Wall Insulation', 'Wall Drywall', 'Wall Prime Paint',
+]
+TRADES_UNO = [
+    'Backfill', 'Booster Pump System Installation', 'Concrete Pour', 'Conveyance', 'MWT Installation',
+    'Generator Placement', 'Roofing Flashing', 'Concrete Formwork', 'Concrete Rebar', 'DWTR Installation',
+    'Roofing Membrane', 'Roofing Metal Deck', 'Electrical Yard Equipment Conduit',
+    'Electrical Yard Equipment Placement', 'Structural Steel', 'Mechanical Yard - Equipment Placement',
+    'Roofing Insulation', 'Structural Piles',
+]
+ROOMS_911 = [
+    'CORRIDOR', 'RESTROOM', 'MENS RESTROOM', 'WOMENS RESTROOM', 'UNISEX RESTROOM', 'ADMIN ASSISTANT',
+    'OFFICE', 'STORAGE', 'CONFERENCE', 'JANITOR', 'ELECTRICAL', 'DISPATCH',
+]
+SCHEDULE_LOCATIONS = [
+    ('USS YARD', 854), ('EYD', 724), ('DCH', 663), ('MCP', 330), ('MYD', 252), ('SSS', 240),
+    ('GPS', 186), ('Loading Dock', 37), ('Fire Pump House', 14), ('Conveyance', 6), ('DWTR', 1),
+]
+SCHEDULE_NAMES = [
+    '{area}-Pour Slab West', '{area}-Pour SOG Center ({n})', '{area}-Install Insulation',
+    '{area}-Backfill Pad-MCP-{n:02d}/UTC {n:02d}', '{area}-Set Generator {n}', '{area}-Row {n} Bottom L3',
+    'Ground EY05-SWGR-USS-{n} in Zone {z} EYD', 'Complete Pathway to EY05-XFMR-USS-{n} in Zone {z} EYD',
+    '{area}-Erect Steel Zone {z}', '{area}-Install Piles Grid {n}', '{area}-Roof Metal Deck Area {n}',
+    'L2 QC Electrical Install-EY06-SWGR-RMU-USS-{n}', '{area}-Backfill/Fine Grade & Touch Up (West to East)',
+]
+SCHEDULE_AREAS = ['DCH1', 'DCH2', 'EYD1', 'EYD2', 'MYD1', 'MYD2', 'USS', 'GPS1']
+
+TASK_AREAS = ['DCH1', 'DCH2', 'EYD1', 'EYD2', 'MYD1', 'Zone-01', 'FSA', 'Level 2', 'Grid A-C']
+TASK_PHRASES = [
+    'Erect Steel', 'Set Columns', 'Hang Joists', 'Field Weld Moment Connection', 'Set Equipment',
+    'Rigging Equipment to Pad', 'Install Piles', 'Auger Cast Piles', 'Place Concrete', 'SOG Pour',
+    'Wall Forms', 'Edge Forms & Shoring', 'Tie Rebar', 'Post-Tension Slab', 'Install Generator',
+    'Genset Rigging', 'Dewatering Wellpoints', 'Set MWT Tank', 'Install Elevators', 'Escalator Rails',
+    'Backfill & Compaction', 'Install Equipment', 'Equipment Hook up', 'Commissioning',
+    'Underground Conduit', 'Duct Bank', 'Pull Box', 'Metal Deck', 'Pour Stop', 'TPO Roof Membrane',
+    'Base Flashing & Coping', 'Paint Doors', 'Drywall Finish', 'Submittal Review', 'Mobilize',
+]
+
+
+def build_names(count, seed=7):
+    """Synthetic P6 task names that hit (and miss) the compile_aliases() patterns"""
+    rng = random.Random(seed)
+    names = []
+    for i in range(count):
+        words = rng.sample(TASK_PHRASES, rng.choice([1, 1, 2]))
+        names.append('{}-{} ({})'.format(rng.choice(TASK_AREAS), ' / '.join(words), i % 50))
+    return names
+
+
+class ProgressSpec:
+    """Locations, trades, capture dates and per-task transition points for one synthetic project"""
+
+    def __init__(self, flavour, scale, seed=7):
+        rng = random.Random('{}-{}-{}'.format(flavour, scale, seed))
+        self.flavour = flavour
+        self.seed = seed
+        if flavour == '911':
+            self.trades = list(TRADES_911)
+            num_locations, num_dates = BASE_911_LOCATIONS * scale, 17
+        else:
+            self.trades = list(TRADES_UNO)
+            num_locations, num_dates = BASE_UNO_LOCATIONS * scale, 20
+
+        day = datetime.date(2025, 4, 11)
+        self.dates = []
+        for _ in range(num_dates):
+            self.dates.append(day.strftime('%Y/%m/%d'))
+            day += datetime.timedelta(days=rng.choice([1, 5, 7, 7, 7, 10, 14]))
+        self.report_ids = {date: 600 + i * 97 + rng.randrange(50) for i, date in enumerate(self.dates)}
+
+        self.location_keys = []
+        self.location_names = {}
+        self.location_trades = {}
+        self.location_tags = {}
+        # Per task: (location_key, trade, start_index, complete_index); indexes past the last date mean never
+        self.tasks = []
+        for i in range(num_locations):
+            key = '%024x' % rng.getrandbits(96)
+            self.location_keys.append(key)
+            self.location_names[key] = self._location_name(i, rng)
+            if flavour == '911':
+                trades = list(self.trades)
+            else:
+                trades = rng.sample(self.trades, rng.choice([4, 5, 5, 6, 6, 6]))
+            self.location_trades[key] = trades
+            self.location_tags[key] = ['Zone {}'.format(z) for z in rng.sample(range(1, 9), 2)]
+            for trade in trades:
+                start = rng.randrange(num_dates + 3) - 2
+                complete = start + rng.randrange(1, num_dates)
+                self.tasks.append((key, trade, max(start, 0), complete))
+
+    def _location_name(self, i, rng):
+        if self.flavour == '911':
+            return '{} {}'.format(ROOMS_911[i % len(ROOMS_911)], 100 + i // len(ROOMS_911))
+        zone = rng.randrange(1, 9)
+        kind = i % 5
+        if kind == 0:
+            return 'Zone {}-USS {}'.format(zone, i // 5 + 1)
+        if kind == 1:
+            return 'Zone {}-USS Yard-Module{}'.format(zone, i // 5 + 1)
+        if kind == 2:
+            return 'DCH{}-{}'.format(zone % 2 + 1, i // 5 + 1)
+        if kind == 3:
+            return 'Zone {}-Conveyance {}'.format(zone, i // 5 + 1)
+        return 'MYD{}-Pad-{}'.format(zone % 2 + 1, i // 5 + 1)
+
+    def iter_dated_tables(self):
+        """Yield (date, {locationKey: {trade: state}}) in date order"""
+        rng = random.Random('{}-{}-states'.format(self.flavour, self.seed))
+        for i, date in enumerate(self.dates):
+            locations = {}
+            for key, trade, start, complete in self.tasks:
+                if rng.random() < 0.2:
+                    state = 'no data'
+                elif i < start:
+                    state = 'not started'
+                elif i < complete:
+                    state = 'in progress'
+                else:
+                    state = 'complete'
+                locations.setdefault(key, {})[trade] = state
+            yield date, locations
+
+    def transition_dates(self, index):
+        """{locationKey: {trade: date}} for the task start (index 2) or complete (index 3) points"""
+        result = {}
+        for task in self.tasks:
+            if task[index] < len(self.dates):
+                result.setdefault(task[0], {})[task[1]] = self.dates[task[index]]
+        return result
+
+
+def _indent(text, spaces):
+    return text.replace('\n', '\n' + ' ' * spaces)
+
+
+def write_progress_json_text(spec, write):
+    """Write the progress JSON for spec through write(text), one capture at a time"""
+    write('{\n  "table": {')
+    for i, (date, locations) in enumerate(spec.iter_dated_tables()):
+        write(',' if i else '')
+        write('\n    {}: {}'.format(json.dumps(date), _indent(json.dumps(locations, indent=2), 4)))
+    write('\n  }')
+    metadata = [
+        ('dateToReportId', spec.report_ids),
+        ('reportIdToDate', {str(report_id): date for date, report_id in spec.report_ids.items()}),
+        ('trades', spec.trades),
+        ('locationKeyToName', spec.location_names),
+        ('dateTradeStarted', spec.transition_dates(2)),
+        ('dateTradeCompleted', spec.transition_dates(3)),
+        ('locationTags', spec.location_tags),
+        ('locationIssues', {}),
+    ]
+    for key, value in metadata:
+        write(',\n  {}: {}'.format(json.dumps(key), _indent(json.dumps(value, indent=2), 2)))
+    write('\n}\n')
+
+
+def write_progress_json(spec, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        write_progress_json_text(spec, f.write)
+
+
+RTF_HEADER = (
+    '{\\rtf1\\ansi\\ansicpg1252\\cocoartf2822\n'
+    '\\cocoatextscaling0\\cocoaplatform0{\\fonttbl\\f0\\fmodern\\fcharset0 Courier;}\n'
+    '{\\colortbl;\\red255\\green255\\blue255;\\red255\\green255\\blue255;\\red0\\green0\\blue0;}\n'
+    '{\\*\\expandedcolortbl;;\\cssrgb\\c100000\\c100000\\c100000;\\cssrgb\\c0\\c0\\c0;}\n'
+    '\\paperw11900\\paperh16840\\margl1440\\margr1440\\vieww11520\\viewh8400\\viewkind0\n'
+    '\\deftab720\n'
+    '\\pard\\pardeftab720\\partightenfactor0\n\n'
+    '\\f0\\fs26 \\cf0 \\cb2 \\expnd0\\expndtw0\\kerning0\n'
+    '\\outl0\\strokewidth0 \\strokec3 '
+)
+_RTF_ESCAPES = str.maketrans({'\\': '\\\\', '{': '\\{', '}': '\\}', '\n': '\\\n'})
+
+
+def write_progress_rtf(spec, path):
+    """Write the progress JSON wrapped in RTF the way TextEdit saves it"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(RTF_HEADER)
+        write_progress_json_text(spec, lambda text: f.write(text.translate(_RTF_ESCAPES)))
+        f.write('}')
+
+
+def write_progress_csv(spec, path):
+    """Write the progress CSV that convert_911_json_to_csv produces for spec"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(PROGRESS_COLUMNS)
+        writer.writerows(iter_capture_rows(spec.location_names, spec.iter_dated_tables()))
+
+
+def write_schedule_csv(path, scale, seed=7):
+    """Write a P6 schedule export in the UNO3A-MO-250814.csv layout"""
+    rng = random.Random('schedule-{}-{}'.format(scale, seed))
+    locations = [name for name, _ in SCHEDULE_LOCATIONS]
+    weights = [count for _, count in SCHEDULE_LOCATIONS]
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(['Location', 'Activity ID', 'Activity Name', 'Start Date', 'Finish Date', 'Duration'])
+        for i in range(BASE_SCHEDULE_ACTIVITIES * scale):
+            name = rng.choice(SCHEDULE_NAMES).format(
+                area=rng.choice(SCHEDULE_AREAS), n=rng.randrange(1, 30), z=rng.randrange(1, 9))
+            start = datetime.date(2025, 8, 14) + datetime.timedelta(days=rng.randrange(120))
+            days = rng.randrange(1, 60)
+            writer.writerow([
+                rng.choices(locations, weights)[0], 'PRO-{:06d}'.format(i), name,
+                start.isoformat(), (start + datetime.timedelta(days=days)).isoformat(), str(days * 8),
+            ])
+
+
+def write_xer(path, scale, seed=7):
+    """Write a minimal P6 XER file with PROJWBS and TASK tables"""
+    names = build_names(BASE_SCHEDULE_ACTIVITIES * scale, seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('ERMHDR\t19.12\t2025-08-14\tProject\tadmin\tadmin\tdbxDatabaseNoName\tProject Management\tUSD\n')
+        f.write('%T\tPROJWBS\n%F\twbs_id\tproj_id\twbs_short_name\twbs_name\n')
+        for i, area in enumerate(SCHEDULE_AREAS):
+            f.write('%R\t{}\t1\t{}\t{} Work\n'.format(1000 + i, area, area))
+        f.write('%T\tTASK\n%F\ttask_id\tproj_id\twbs_id\ttask_code\ttask_name\ttarget_start_date\ttarget_end_date\n')
+        for i, name in enumerate(names):
+            f.write('%R\t{}\t1\t{}\tCON-{:05d}\t{}\t2025-08-14 08:00\t2025-09-01 17:00\n'.format(
+                20000 + i, 1000 + i % len(SCHEDULE_AREAS), i, name))
+        f.write('%E\n')
+
+
+def generate_dataset(out_dir, scale, seed=7):
+    """Write every synthetic input for one scale into out_dir; returns out_dir"""
+    os.makedirs(out_dir, exist_ok=True)
+    for flavour, rtf_name, json_name, csv_name in (
+        ('911', '911_raw.rtf', '911_clean.json', 'WhartonSmith_911_raw.csv'),
+        ('uno', 'UNO_BigJSON.js', 'UNO_BigJSON_clean.json', 'UNO_construction_data_fixed.csv'),
+    ):
+        spec = ProgressSpec(flavour, scale, seed)
+        write_progress_rtf(spec, os.path.join(out_dir, rtf_name))
+        write_progress_json(spec, os.path.join(out_dir, json_name))
+        write_progress_csv(spec, os.path.join(out_dir, csv_name))
+    write_schedule_csv(os.path.join(out_dir, 'UNO3A-MO-250814.csv'), scale, seed)
+    write_xer(os.path.join(out_dir, 'UNO3A.xer'), scale, seed)
+    return out_dir
+
+
+def main(argv):
+    if not argv:
+        raise SystemExit(__doc__)
+    scales = [int(s) for s in argv[1:]] or [10]
+    for scale in scales:
+        out_dir = generate_dataset(os.path.join(argv[0], 'x{}'.format(scale)), scale)
+        print(f"✅ Generated x{scale} dataset in {out_dir}")
+        for name in sorted(os.listdir(out_dir)):
+            print(f"   {name}: {os.path.getsize(os.path.join(out_dir, name)) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""Per-stage timings, throughput and peak memory for the scripts
+
+Scripts wrap each logical step in a stage:
+
+    with stage('flatten table') as s:
+        ...
+        s.rows_out = total_rows
+
+which records wall time, rows in/out, rows per second, the process peak RSS
+at the end of the stage and, when tracing is on, the tracemalloc peak
+within the stage. Stages may nest; nested names are joined with ' / '.
+
+Nothing is written unless asked for. Run any script through this module:
+
+    instrument.py [--report run.json] [--profile run.prof] [--tracemalloc] script.py [args ...]
+
+or set SCRIPTS_REPORT / SCRIPTS_PROFILE / SCRIPTS_TRACEMALLOC=1 in the
+environment. The report is a JSON document listing every stage; the
+profile is a cProfile dump readable with pstats or snakeviz.
+"""
+import atexit
+import cProfile
+import datetime
+import json
+import multiprocessing
+import os
+import runpy
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPORT_ENV = 'SCRIPTS_REPORT'
+PROFILE_ENV = 'SCRIPTS_PROFILE'
+TRACEMALLOC_ENV = 'SCRIPTS_TRACEMALLOC'
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB; None where unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def _round_mb(value, digits):
+    return round(value, digits) if value is not None else None
+
+
+class Stage:
+    """Measurements for one stage; set rows_in/rows_out inside the block"""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows_in = None
+        self.rows_out = None
+        self.seconds = None
+        self.peak_rss_mb = None
+        self.peak_traced_mb = None
+        self._start = None
+        self._traced_peak = 0  # tracemalloc peak seen before nested stages reset it
+
+    def as_dict(self):
+        rows = self.rows_out if self.rows_out is not None else self.rows_in
+        result = {
+            'stage': self.name,
+            'seconds': round(self.seconds, 6),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'rows_per_s': round(rows / self.seconds, 1) if rows and self.seconds else None,
+            'peak_rss_mb': _round_mb(self.peak_rss_mb, 1),
+        }
+        if self.peak_traced_mb is not None:
+            result['peak_traced_mb'] = round(self.peak_traced_mb, 2)
+        return result
+
+
+class RunReport:
+    """Stages recorded in this process
+
+    Stages are always timed, but only kept in stages while recording is on,
+    which enable() turns on when a report is to be written.
+    """
+
+    def __init__(self):
+        self.stages = []
+        self.recording = False
+        self._stack = []
+        self.started = datetime.datetime.now()
+
+    def stage(self, name, rows_in=None):
+        return _StageContext(self, name, rows_in)
+
+    def as_dict(self):
+        return {
+            'argv': sys.argv,
+            'started': self.started.isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'tracemalloc': tracemalloc.is_tracing(),
+            'peak_rss_mb': _round_mb(peak_rss_mb(), 1),
+            'stages': [s.as_dict() for s in self.stages],
+        }
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+
+class _StageContext:
+    def __init__(self, report, name, rows_in):
+        self.report = report
+        self.stage = Stage(name)
+        self.stage.rows_in = rows_in
+
+    def __enter__(self):
+        stack = self.report._stack
+        parent = stack[-1] if stack else None
+        if parent is not None:
+            self.stage.name = parent.name + ' / ' + self.stage.name
+        if tracemalloc.is_tracing():
+            # Peaks are per stage; keep the enclosing stage's peak before resetting
+            if parent is not None:
+                parent._traced_peak = max(parent._traced_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        stack.append(self.stage)
+        self.stage._start = time.perf_counter()
+        return self.stage
+
+    def __exit__(self, exc_type, exc, tb):
+        stage = self.stage
+        stage.seconds = time.perf_counter() - stage._start
+        stage.peak_rss_mb = peak_rss_mb()
+        stack = self.report._stack
+        stack.pop()
+        if tracemalloc.is_tracing():
+            peak = max(stage._traced_peak, tracemalloc.get_traced_memory()[1])
+            stage.peak_traced_mb = peak / (1 << 20)
+            if stack:
+                stack[-1]._traced_peak = max(stack[-1]._traced_peak, peak)
+        if self.report.recording:
+            self.report.stages.append(stage)
+        return False
+
+
+_report = RunReport()
+
+
+def stage(name, rows_in=None):
+    """Context manager recording one stage in the current run report"""
+    return _report.stage(name, rows_in)
+
+
+def current_report():
+    return _report
+
+
+def _write_on_exit(report_path, profiler, profile_path):
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
+        print(f"🧪 Profile written: {profile_path}", file=sys.stderr)
+    if report_path:
+        _report.write(report_path)
+        print(f"🧪 Run report written: {report_path}", file=sys.stderr)
+
+
+def enable(report_path=None, profile_path=None, trace_memory=False):
+    """Write the report/profile when the process exits; start tracing if asked"""
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    profiler = None
+    if profile_path:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    if report_path:
+        _report.recording = True
+    if report_path or profiler is not None:
+        atexit.register(_write_on_exit, report_path, profiler, profile_path)
+
+
+def _enable_from_environment():
+    if multiprocessing.parent_process() is not None:
+        # Pool workers import the scripts too; only the main process reports
+        return
+    report_path = os.environ.get(REPORT_ENV)
+    profile_path = os.environ.get(PROFILE_ENV)
+    trace_memory = os.environ.get(TRACEMALLOC_ENV, '0') not in ('', '0')
+    if report_path or profile_path or trace_memory:
+        enable(report_path, profile_path, trace_memory)
+
+
+_enable_from_environment()
+
+
+def main(argv):
+    args = list(argv)
+    options = {'--report': None, '--profile': None}
+    trace_memory = '--tracemalloc' in args
+    if trace_memory:
+        args.remove('--tracemalloc')
+    for flag in options:
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1]
+            del args[i:i + 2]
+    if not args:
+        raise SystemExit(__doc__)
+
+    # Stages are only recorded in this process, not in pool workers
+    enable(options['--report'] or 'run_report.json', options['--profile'], trace_memory)
+
+    script = args[0]
+    sys.argv = args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    with stage(os.path.basename(script)):
+        runpy.run_path(script, run_name='__main__')
+
+
+if __name__ == '__main__':
+    # Scripts import instrument; make that this module so their stages land in this report
+    sys.modules.setdefault('instrument', sys.modules[__name__])
+    main(sys.argv[1:])
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""Location catalog built from a project's own location names
+
+Progress exports name locations like "Zone 1-USS 2", "Zone 2-Gen Yard-Pad5",
+"DCH1-FSA-1" or "Loading Dock". Each name is parsed once into a
+(zone, kind, numbers) key, e.g. ('Zone 2', 'Gen Yard-Pad', (5,)), and indexed
+so a schedule reference such as ('EYD1', 'USS', (1, 2)) resolves with one
+dictionary lookup per number. Numbers are matched exactly, so pad 1 never
+matches USS 10-19. A number list such as "06&7" or a range suffix such as
+"4-6" stands for every number in it (see expand_numbers).
+
+A kind is referenced by its first or last word ('USS' finds both "USS 3" and
+"USS Yard-Module3", 'Pad' finds "Gen Yard-Pad1"). Areas are matched against
+zones with letters and numbers compared separately ('Zone-01' is "Zone 1").
+Schedule areas that are not zones in the data (EYD1, MYD1) can be given the
+zones and kinds they cover with area_kinds, e.g.
+{'EYD1': (('Zone 1',), ('Pad', 'USS'))}.
+
+Usage: location_catalog.py <progress.json | progress.csv | .pgs>
+"""
+import re
+import sys
+from collections import defaultdict, namedtuple
+
+from progress_json import scan_progress_json
+from progress_store import iter_progress_rows
+
+LocationKey = namedtuple('LocationKey', 'zone kind numbers')
+
+# A number, or a list/range of them: '06', '06&7', '4-6', '1&3-5'
+NUMBER_LIST = r'\d+(?:(?:\s*&\s*|-)\d+)*'
+
+_NUMBERED = re.compile(r'(.*?)[\s]*(' + NUMBER_LIST + ')')
+_NUMBER_RANGE = re.compile(r'(\d+)(?:-(\d+))?')
+_RANGE_SUFFIX = re.compile(r'\d+')
+_AREA = re.compile(r'([a-z][a-z ]*?)[\s-]*(\d*)')
+_WORD = re.compile(r'[a-z]+')
+
+
+def expand_numbers(text):
+    """Numbers of a number list: '06&7' -> (6, 7), '4-6' -> (4, 5, 6), '1&3-5' -> (1, 3, 4, 5)
+
+    A descending pair such as '9-2' is read as the two numbers, not a range.
+    """
+    numbers = []
+    for part in text.split('&'):
+        for match in _NUMBER_RANGE.finditer(part):
+            first = int(match.group(1))
+            last = int(match.group(2)) if match.group(2) else first
+            numbers.extend(range(first, last + 1) if last >= first else (first, last))
+    return tuple(dict.fromkeys(numbers))
+
+
+def parse_location_name(name):
+    """Split a location name into LocationKey(zone, kind, numbers)
+
+    "Zone 1-USS Yard-Module14" -> ('Zone 1', 'USS Yard-Module', (14,)),
+    "Zone 3-Pad-06&7" -> ('Zone 3', 'Pad', (6, 7)), "Zone 2-Pad4-6" ->
+    ('Zone 2', 'Pad', (4, 5, 6)), "DCH1-3" -> ('DCH1', '', (3,)),
+    "Loading Dock" -> ('Loading Dock', '', ()).
+    """
+    parts = [part.strip() for part in name.split('-') if part.strip()]
+    if not parts:
+        return LocationKey(name, '', ())
+    zone, rest = parts[0], parts[1:]
+    if len(rest) >= 2 and _RANGE_SUFFIX.fullmatch(rest[-1]) and rest[-2][-1:].isdigit():
+        # A range suffix: "Pad4-6" was split into "Pad4" and "6"
+        rest = rest[:-2] + [rest[-2] + '-' + rest[-1]]
+    if not rest:
+        return LocationKey(zone, '', ())
+    match = _NUMBERED.fullmatch(rest[-1])
+    if match is None:
+        return LocationKey(zone, '-'.join(rest), ())
+    kind_parts = rest[:-1] + [match.group(1)] if match.group(1) else rest[:-1]
+    return LocationKey(zone, '-'.join(kind_parts), expand_numbers(match.group(2)))
+
+
+def area_key(area):
+    """Comparable form of a zone or area: 'Zone-01' and 'Zone 1' -> ('zone', 1)"""
+    text = area.strip().lower()
+    match = _AREA.fullmatch(text)
+    if match is None:
+        return (text, None)
+    return (match.group(1).strip(), int(match.group(2)) if match.group(2) else None)
+
+
+def kind_words(kind):
+    """Words a kind can be referenced by: its first and last word"""
+    words = _WORD.findall(kind.lower())
+    return {words[0], words[-1]} if words else set()
+
+
+def _kind_word(kind):
+    words = _WORD.findall(kind.lower())
+    return words[-1] if words else ''
+
+
+def _sort_key(item):
+    name, key = item
+    zone = area_key(key.zone)
+    return (zone[0], -1 if zone[1] is None else zone[1], key.kind, key.numbers, name)
+
+
+class LocationCatalog:
+    """Structured, indexed view of a project's location names"""
+
+    def __init__(self, names, area_kinds=None):
+        parsed = {name: parse_location_name(name) for name in names if name}
+        self.keys = dict(sorted(parsed.items(), key=_sort_key))
+        self.names = tuple(self.keys)
+        self.area_kinds = {
+            area_key(area): ({area_key(zone) for zone in zones}, {_kind_word(kind) for kind in kinds})
+            for area, (zones, kinds) in (area_kinds or {}).items()
+        }
+        self._scopes = {}
+        self._zones = {}
+        self._words = {}
+        self._by_zone = defaultdict(list)         # area key -> names
+        self._by_kind = defaultdict(list)         # kind word -> names
+        self._by_kind_number = defaultdict(list)  # (kind word, number) -> names
+        self._order = {name: i for i, name in enumerate(self.names)}
+        for name, key in self.keys.items():
+            zone = self._zones[name] = area_key(key.zone)
+            words = self._words[name] = kind_words(key.kind)
+            self._by_zone[zone].append(name)
+            for word in words:
+                self._by_kind[word].append(name)
+                for number in key.numbers:
+                    self._by_kind_number[(word, number)].append(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_progress_json(cls, json_file, area_kinds=None):
+        """Catalog of a progress snapshot JSON's locationKeyToName"""
+        metadata, _ = scan_progress_json(json_file, keep_keys=('locationKeyToName',))
+        return cls(metadata.get('locationKeyToName', {}).values(), area_kinds)
+
+    @classmethod
+    def from_progress_rows(cls, path, area_kinds=None):
+        """Catalog of the location column of a progress CSV or .pgs store"""
+        return cls(dict.fromkeys(row['location'] for row in iter_progress_rows(path)), area_kinds)
+
+    def _scope(self, area):
+        """(names, name set) an area covers, in catalog order; None means unrestricted"""
+        if area not in self._scopes:
+            self._scopes[area] = self._build_scope(area)
+        return self._scopes[area]
+
+    def _build_scope(self, area):
+        zone = area_key(area)
+        if zone in self._by_zone:
+            names = self._by_zone[zone]
+        elif zone in self.area_kinds:
+            # The listed kinds within the listed zones
+            zones, words = self.area_kinds[zone]
+            names = [name for name in self.names if self._zones[name] in zones and self._words[name] & words]
+        elif zone[1] is None and _kind_word(area) in self._by_kind:
+            # An area that is really a kind, e.g. 'FSA' for "DCH1-FSA-1"
+            names = self._by_kind[_kind_word(area)]
+        else:
+            return None
+        return tuple(names), frozenset(names)
+
+    def resolve(self, area, kind='', numbers=()):
+        """Location names for an area, optionally narrowed to a kind and numbers
+
+        Each number is one lookup in the (kind word, number) index, so the
+        cost is proportional to the matches rather than to the catalog.
+        Returns a tuple in catalog order within each number.
+        """
+        scope = self._scope(area)
+        word = _kind_word(kind)
+        if numbers:
+            if not word:
+                return ()
+            candidates = [name for number in numbers for name in self._by_kind_number.get((word, number), ())]
+        elif word:
+            candidates = self._by_kind.get(word, ())
+        elif scope is not None:
+            return scope[0]
+        else:
+            return ()
+        if scope is not None:
+            candidates = [name for name in candidates if name in scope[1]]
+        return tuple(dict.fromkeys(candidates))
+
+
+def load_location_catalog(path, area_kinds=None):
+    """Catalog from a progress JSON (locationKeyToName) or a progress CSV/.pgs"""
+    if path.lower().endswith('.json'):
+        return LocationCatalog.from_progress_json(path, area_kinds)
+    return LocationCatalog.from_progress_rows(path, area_kinds)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        raise SystemExit(__doc__)
+    catalog = load_location_catalog(sys.argv[1])
+    print(f"📍 {len(catalog)} locations")
+    for name, key in catalog.keys.items():
+        numbers = '&'.join(map(str, key.numbers))
+        print(f"  {name:32s} {key.zone:20s} {key.kind:20s} {numbers}")
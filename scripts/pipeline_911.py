@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Run the 911 conversion chain in one process
+
+Usage: pipeline_911.py <911_raw.rtf | 911_clean.json | .delta.json> <enhanced.csv|.pgs>
+                       [--json PATH] [--raw-csv PATH] [--raw-txt PATH]
+                       [--raw-txt-csv PATH] [--checkpoint PATH]
+
+Each script of the chain (convert_911_rtf_to_json -> convert_911_json_to_csv /
+extract_911_raw_data -> convert_raw_txt_to_csv -> enhance_911_data) is used
+as a generator stage, so captures flow from the source file straight into
+the enhanced output. The intermediate files those scripts write are only
+produced when asked for:
+
+  --json         clean JSON (RTF sources only), as convert_911_rtf_to_json
+  --raw-csv      progress CSV/.pgs before enhancement, as convert_911_json_to_csv
+  --raw-txt      pipe-delimited text export, as extract_911_raw_data
+  --raw-txt-csv  date/location/trade/status CSV, as convert_raw_txt_to_csv
+  --checkpoint   task checkpoint for enhance_911_data.py --append
+"""
+import csv
+import os
+import sys
+import tempfile
+from contextlib import ExitStack
+
+from convert_911_json_to_csv import iter_capture_rows
+from convert_911_rtf_to_json import read_rtf_chunks, write_rtf_json
+from convert_raw_txt_to_csv import RAW_CSV_HEADERS
+from enhance_911_data import enhance_progress_store
+from extract_911_raw_data import iter_raw_entries, write_raw_entries, write_raw_header
+from instrument import stage
+from progress_delta import is_delta_path, load_delta_history
+from progress_json import iter_table_dates, scan_progress_json
+from progress_store import PROGRESS_COLUMNS, ProgressStore, open_progress_writer
+
+OPTIONAL_OUTPUTS = ('--json', '--raw-csv', '--raw-txt', '--raw-txt-csv', '--checkpoint')
+
+
+def read_source(source_path, json_path=None):
+    """Return (location_mapping, dated_tables) for an RTF, JSON or delta source
+
+    dated_tables yields (date, {locationKey: {trade: state}}) in date order.
+    An RTF source's embedded JSON is streamed to json_path (or a temporary
+    file) and then read like a JSON source, one capture date at a time; a
+    delta source (progress_delta.py) is replayed one capture at a time.
+    """
+    if is_delta_path(source_path):
+        history = load_delta_history(source_path)
+        return history.location_names, history.iter_snapshots()
+    if source_path.lower().endswith('.rtf'):
+        if json_path:
+            write_rtf_json(read_rtf_chunks(source_path), json_path)
+            print(f"📝 Clean JSON written: {json_path}")
+            return _read_json_source(json_path, source_path)
+        fd, tmp_path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        try:
+            write_rtf_json(read_rtf_chunks(source_path), tmp_path)
+            location_mapping, dated_tables = _read_json_source(tmp_path, source_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return location_mapping, _removing_after(dated_tables, tmp_path)
+
+    if json_path:
+        print(f"Warning: {source_path} is already JSON, not writing {json_path}")
+    metadata, table_spans = scan_progress_json(source_path)
+    return metadata.get('locationKeyToName', {}), iter_table_dates(source_path, table_spans)
+
+
+def _read_json_source(json_path, source_path):
+    metadata, table_spans = scan_progress_json(json_path)
+    if not table_spans and 'table' not in metadata:
+        raise ValueError(f"No 'table' key found in {source_path}")
+    return metadata.get('locationKeyToName', {}), iter_table_dates(json_path, table_spans)
+
+
+def _removing_after(items, path):
+    """Pass items through, deleting path once they are exhausted or abandoned"""
+    try:
+        yield from items
+    finally:
+        os.remove(path)
+
+
+def tee_raw_entries(dated_tables, location_mapping, txt_file=None, csv_writer=None):
+    """Pass captures through while writing the raw TXT/CSV exports for each date"""
+    for date, locations in dated_tables:
+        for _, date_entries in iter_raw_entries(location_mapping, [(date, locations)]):
+            if txt_file is not None:
+                write_raw_entries(txt_file, date, date_entries)
+            if csv_writer is not None:
+                csv_writer.writerows([date, location, trade, status] for location, trade, status in date_entries)
+        yield date, locations
+
+
+def tee_rows(rows, writer):
+    """Pass progress rows through while writing them out"""
+    for row in rows:
+        writer.writerow(row)
+        yield row
+
+
+def run_911_pipeline(source_path, output_path, json_path=None, raw_csv_path=None, raw_txt_path=None,
+                     raw_txt_csv_path=None, checkpoint_path=None):
+    """Convert an RTF/JSON 911 export to the enhanced CSV (or .pgs) in one pass"""
+    with stage('read source'):
+        location_mapping, dated_tables = read_source(source_path, json_path)
+    print(f"Total locations: {len(location_mapping)}")
+
+    with ExitStack() as stack:
+        txt_file = None
+        txt_csv_writer = None
+        if raw_txt_path:
+            txt_file = stack.enter_context(open(raw_txt_path, 'w', encoding='utf-8'))
+            write_raw_header(txt_file)
+        if raw_txt_csv_path:
+            txt_csv_writer = csv.writer(stack.enter_context(open(raw_txt_csv_path, 'w', newline='', encoding='utf-8')))
+            txt_csv_writer.writerow(RAW_CSV_HEADERS)
+        if txt_file is not None or txt_csv_writer is not None:
+            dated_tables = tee_raw_entries(dated_tables, location_mapping, txt_file, txt_csv_writer)
+
+        rows = iter_capture_rows(location_mapping, dated_tables)
+        if raw_csv_path:
+            rows = tee_rows(rows, stack.enter_context(open_progress_writer(raw_csv_path, PROGRESS_COLUMNS)))
+
+        with stage('flatten table') as s:
+            store = ProgressStore(PROGRESS_COLUMNS)
+            store.extend(rows)
+            s.rows_out = len(store)
+
+    for path in (raw_csv_path, raw_txt_path, raw_txt_csv_path):
+        if path:
+            print(f"📝 Intermediate output written: {path}")
+
+    return enhance_progress_store(store, output_path, checkpoint_path)
+
+
+def main(argv):
+    args = list(argv)
+    options = {}
+    for flag in OPTIONAL_OUTPUTS:
+        if flag in args:
+            i = args.index(flag)
+            if i + 1 >= len(args):
+                raise SystemExit(f"{flag} needs a path")
+            options[flag.lstrip('-').replace('-', '_') + '_path'] = args[i + 1]
+            del args[i:i + 2]
+    if len(args) != 2:
+        raise SystemExit(__doc__)
+    run_911_pipeline(args[0], args[1], **options)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
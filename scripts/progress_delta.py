@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Delta-encoded progress history
+
+Usage: progress_delta.py encode <progress.json> <history.delta.json>
+       progress_delta.py decode <history.delta.json> <progress.json> [--date D]
+
+A progress JSON repeats every trade state of every location on every capture
+date, although most states do not change between captures. The delta format
+stores each capture as the list of cells that changed since the previous
+one: flat [location id, trade id, state id, ...] triples with integer ids
+into the locations, trades and states lists. The first capture's list is
+the base snapshot; state id -1 means the cell is no longer reported.
+
+Key order is kept too. A capture lists its cells in the previous capture's
+order, with new cells appended; only a capture whose order differs from that
+stores its layout, as [location id, trade id, ...] lists.
+
+File size and decode time grow with the number of state changes, not with
+dates x locations x trades. Decoding replays the changes in date order, so
+any capture is rebuilt exactly, and every capture in one pass.
+"""
+import json
+import os
+import sys
+
+from progress_json import iter_table_dates, scan_progress_json
+
+DELTA_VERSION = 1
+DELTA_SUFFIX = '.delta.json'
+REMOVED = -1
+
+
+def _next_layout(layout, cells, delta):
+    """Layout {location id: [trade ids]} after delta: removed cells dropped, new ones appended"""
+    layout = {location_id: list(trade_ids) for location_id, trade_ids in layout.items()}
+    for i in range(0, len(delta), 3):
+        location_id, trade_id, state_id = delta[i:i + 3]
+        if state_id == REMOVED:
+            trade_ids = layout.get(location_id)
+            if trade_ids and trade_id in trade_ids:
+                trade_ids.remove(trade_id)
+                if not trade_ids:
+                    del layout[location_id]
+        elif (location_id, trade_id) not in cells:
+            layout.setdefault(location_id, []).append(trade_id)
+    return layout
+
+
+def is_delta_path(path):
+    return path.lower().endswith(DELTA_SUFFIX)
+
+
+def encode_progress_json(json_file):
+    """Delta document for a progress JSON, read one capture date at a time
+
+    Every top-level key besides the table is carried through as metadata.
+    """
+    metadata, table_spans = scan_progress_json(json_file, keep_keys=None)
+    locations = {}
+    trades = {trade: i for i, trade in enumerate(metadata.get('trades', []))}
+    states = {}
+    dates = []
+    changes = []
+    layouts = []
+    previous = {}
+    previous_layout = {}
+    for date, snapshot in iter_table_dates(json_file, table_spans):
+        current = {}
+        delta = []
+        layout = {}
+        for location_key, trade_states in snapshot.items():
+            location_id = locations.setdefault(location_key, len(locations))
+            layout[location_id] = [trades.setdefault(trade, len(trades)) for trade in trade_states]
+            for trade, state in trade_states.items():
+                cell = (location_id, trades.setdefault(trade, len(trades)))
+                state_id = current[cell] = states.setdefault(state, len(states))
+                if previous.get(cell) != state_id:
+                    delta.extend((cell[0], cell[1], state_id))
+        for cell in previous.keys() - current.keys():
+            delta.extend((cell[0], cell[1], REMOVED))
+        if list(_next_layout(previous_layout, previous, delta).items()) == list(layout.items()):
+            layouts.append(None)
+        else:
+            layouts.append([[location_id] + trade_ids for location_id, trade_ids in layout.items()])
+        dates.append(date)
+        changes.append(delta)
+        previous = current
+        previous_layout = layout
+
+    return {
+        'version': DELTA_VERSION,
+        'dates': dates,
+        'locations': list(locations),
+        'trades': list(trades),
+        'states': list(states),
+        'changes': changes,
+        'layouts': layouts,
+        'metadata': metadata,
+    }
+
+
+class DeltaHistory:
+    """Capture history decoded from a delta document"""
+
+    def __init__(self, data):
+        if data.get('version') != DELTA_VERSION:
+            raise ValueError(f"Unsupported delta version {data.get('version')}")
+        self.dates = data['dates']
+        self.locations = data['locations']
+        self.trades = data['trades']
+        self.states = data['states']
+        self.changes = data['changes']
+        self.layouts = data.get('layouts') or [None] * len(self.changes)
+        self.metadata = data.get('metadata', {})
+        if not len(self.dates) == len(self.changes) == len(self.layouts):
+            raise ValueError(f"{len(self.dates)} dates but {len(self.changes)} change lists"
+                             f" and {len(self.layouts)} layouts")
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def location_names(self):
+        return self.metadata.get('locationKeyToName', {})
+
+    def change_count(self):
+        return sum(len(delta) for delta in self.changes) // 3
+
+    def _snapshot(self, cells, layout):
+        """{locationKey: {trade: state}} for {(location id, trade id): state id} in layout order"""
+        trades, states = self.trades, self.states
+        return {
+            self.locations[location_id]: {trades[t]: states[cells[location_id, t]] for t in trade_ids}
+            for location_id, trade_ids in layout.items()
+        }
+
+    def _replay(self):
+        """Yield (date, cells, layout) after applying each capture's changes"""
+        cells = {}
+        layout = {}
+        for date, delta, stored_layout in zip(self.dates, self.changes, self.layouts):
+            if stored_layout is None:
+                layout = _next_layout(layout, cells, delta)
+            else:
+                layout = {ids[0]: ids[1:] for ids in stored_layout}
+            for i in range(0, len(delta), 3):
+                location_id, trade_id, state_id = delta[i:i + 3]
+                if state_id == REMOVED:
+                    cells.pop((location_id, trade_id), None)
+                else:
+                    cells[location_id, trade_id] = state_id
+            yield date, cells, layout
+
+    def iter_snapshots(self, dates=None):
+        """Yield (date, {locationKey: {trade: state}}) in date order, like iter_table_dates"""
+        wanted = None if dates is None else set(dates)
+        for date, cells, layout in self._replay():
+            if wanted is None or date in wanted:
+                yield date, self._snapshot(cells, layout)
+
+    def snapshot(self, date):
+        """{locationKey: {trade: state}} as captured on date"""
+        for captured, cells, layout in self._replay():
+            if captured == date:
+                return self._snapshot(cells, layout)
+        raise KeyError(f"No capture on {date}")
+
+
+def save_delta(data, delta_path):
+    """Write a delta document as compact JSON, replacing any previous one atomically"""
+    tmp_path = delta_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, delta_path)
+
+
+def load_delta_history(delta_path):
+    with open(delta_path, 'r', encoding='utf-8') as f:
+        return DeltaHistory(json.load(f))
+
+
+def write_progress_json(history, json_path, dates=None):
+    """Write captures back out as a progress JSON, one capture at a time"""
+    with open(json_path, 'w', encoding='utf-8') as f:
+        f.write('{"table": {')
+        for i, (date, snapshot) in enumerate(history.iter_snapshots(dates)):
+            f.write('{}\n{}: {}'.format(',' if i else '', json.dumps(date), json.dumps(snapshot)))
+        f.write('\n}')
+        for key, value in history.metadata.items():
+            f.write(',\n{}: {}'.format(json.dumps(key), json.dumps(value)))
+        f.write('}\n')
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    command = args.pop(0) if args else None
+    dates = None
+    if '--date' in args:
+        i = args.index('--date')
+        dates = [args[i + 1]]
+        del args[i:i + 2]
+    if command == 'encode' and len(args) == 2:
+        data = encode_progress_json(args[0])
+        save_delta(data, args[1])
+        history = DeltaHistory(data)
+        before, after = os.path.getsize(args[0]), os.path.getsize(args[1])
+        print(f"✅ {len(history)} captures, {history.change_count()} state changes -> {args[1]}")
+        print(f"📦 {before:,} bytes -> {after:,} bytes ({after / before:.1%})")
+    elif command == 'decode' and len(args) == 2:
+        history = load_delta_history(args[0])
+        if dates and dates[0] not in history.dates:
+            raise SystemExit(f"No capture on {dates[0]}")
+        write_progress_json(history, args[1], dates)
+        print(f"✅ {len(dates or history.dates)} captures -> {args[1]}")
+    else:
+        raise SystemExit(__doc__)
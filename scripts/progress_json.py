@@ -0,0 +1,187 @@
+"""Streaming reader for progress snapshot JSON
+
+The exported JSON keeps the whole capture history under
+`table -> date -> locationKey -> trade -> state`, with `locationKeyToName`
+and `trades` after it. scan_progress_json walks the file once in fixed-size
+chunks, decoding only the small metadata keys and recording the byte span
+of each date's slice. iter_table_dates then loads one date at a time, so
+memory is bounded by a single capture rather than the project history.
+"""
+import json
+import re
+
+# Metadata decoded by default; everything else except `table` is skipped
+METADATA_KEYS = ('locationKeyToName', 'trades', 'dateToReportId', 'reportIdToDate')
+
+_WHITESPACE = re.compile(rb'[ \t\r\n]*')
+_STRUCTURE = re.compile(rb'["{}\[\]]')
+_STRING_END = re.compile(rb'["\\]')
+_SCALAR_END = re.compile(rb'[,}\] \t\r\n]')
+
+
+class _ByteStream:
+    """Byte buffer over a binary file that tracks absolute offsets"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = b''
+        self.pos = 0
+        self.base = 0
+
+    def offset(self):
+        return self.base + self.pos
+
+    def fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buf += chunk
+        return True
+
+    def compact(self):
+        """Drop consumed bytes"""
+        self.base += self.pos
+        self.buf = self.buf[self.pos:]
+        self.pos = 0
+
+    def search(self, pattern, keep):
+        """Find the next match of pattern, reading more of the file as needed"""
+        while True:
+            m = pattern.search(self.buf, self.pos)
+            if m is not None:
+                return m
+            if not keep:
+                self.compact()
+            if not self.fill():
+                raise ValueError('Unexpected end of JSON at byte {}'.format(self.offset()))
+
+    def next_byte(self):
+        """Skip whitespace and return the next byte without consuming it"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos:self.pos + 1]
+            self.compact()
+            if not self.fill():
+                raise ValueError('Unexpected end of JSON at byte {}'.format(self.offset()))
+
+    def expect(self, allowed):
+        c = self.next_byte()
+        if c not in allowed:
+            raise ValueError('Expected one of {!r} at byte {}, found {!r}'.format(allowed, self.offset(), c))
+        self.pos += 1
+        return c
+
+
+def _skip_string(s, keep):
+    """Advance past a string whose opening quote has been consumed"""
+    while True:
+        m = s.search(_STRING_END, keep)
+        if m.group() == b'\\':
+            # The escaped byte may be in the next chunk
+            s.pos = m.end()
+            if s.pos == len(s.buf):
+                if not keep:
+                    s.compact()
+                if not s.fill():
+                    raise ValueError('Unexpected end of JSON at byte {}'.format(s.offset()))
+            s.pos += 1
+            continue
+        s.pos = m.end()
+        return
+
+
+def _scan_value(s, keep):
+    """Advance past one JSON value; return its bytes if keep, else None"""
+    c = s.next_byte()
+    start = s.pos
+    if c == b'"':
+        s.pos += 1
+        _skip_string(s, keep)
+    elif c in (b'{', b'['):
+        depth = 0
+        while True:
+            m = s.search(_STRUCTURE, keep)
+            s.pos = m.end()
+            ch = m.group()
+            if ch == b'"':
+                _skip_string(s, keep)
+            elif ch in (b'{', b'['):
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    break
+    else:
+        while True:
+            m = _SCALAR_END.search(s.buf, s.pos)
+            if m is not None:
+                s.pos = m.start()
+                break
+            if not s.fill():
+                s.pos = len(s.buf)
+                break
+    return s.buf[start:s.pos] if keep else None
+
+
+def _read_key(s):
+    s.expect((b'"',))
+    start = s.pos - 1
+    _skip_string(s, True)
+    key = json.loads(s.buf[start:s.pos])
+    s.expect((b':',))
+    return key
+
+
+def _iter_object(s):
+    """Yield keys of the object at the current position, leaving each value unread"""
+    s.expect((b'{',))
+    if s.next_byte() == b'}':
+        s.pos += 1
+        return
+    while True:
+        s.compact()
+        yield _read_key(s)
+        if s.expect((b',', b'}')) == b'}':
+            return
+
+
+def scan_progress_json(json_file, keep_keys=METADATA_KEYS, chunk_size=1 << 20):
+    """Scan a progress JSON file once without loading the table
+
+    Returns (metadata, table_spans): metadata holds the decoded top-level
+    keys listed in keep_keys (every key but 'table' if keep_keys is None),
+    and table_spans maps each capture date to the
+    (start, end) byte span of its slice in file order.
+    """
+    metadata = {}
+    table_spans = {}
+    with open(json_file, 'rb') as f:
+        s = _ByteStream(f, chunk_size)
+        for key in _iter_object(s):
+            if key == 'table':
+                for date in _iter_object(s):
+                    s.next_byte()
+                    start = s.offset()
+                    _scan_value(s, False)
+                    table_spans[date] = (start, s.offset())
+            elif keep_keys is None or key in keep_keys:
+                metadata[key] = json.loads(_scan_value(s, True))
+            else:
+                _scan_value(s, False)
+    return metadata, table_spans
+
+
+def iter_table_dates(json_file, table_spans, dates=None):
+    """Yield (date, {locationKey: {trade: state}}) one capture at a time
+
+    dates defaults to every date in table_spans in sorted order.
+    """
+    if dates is None:
+        dates = sorted(table_spans)
+    with open(json_file, 'rb') as f:
+        for date in dates:
+            start, end = table_spans[date]
+            f.seek(start)
+            yield date, json.loads(f.read(end - start))
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""Local HTTP query service over processed progress data
+
+Usage: progress_service.py <progress.csv|.pgs|.json|.delta.json|.rtf|warehouse.sqlite#dataset> [--host 127.0.0.1] [--port 8765]
+
+The data is loaded once into in-memory indexes, so a request costs the same
+however long the project history is. All endpoints are GET (or HEAD) and
+return JSON:
+
+  /summary                                     rows, tasks, sections, trades, capture dates
+  /percent-complete?section=&trade=&date=&group_by=section|trade|date
+                                               share of tasks complete as of a date
+  /locations?trade=&state=&section=&date=      tasks in a state as of a date
+  /history?location=                           every observation of one location
+  /counts?section=&trade=&date=                observations per state at capture dates
+
+A task is a (location, trade) pair and its state as of a date is its latest
+observation on or before that date, skipping 'no data' captures, as the
+dashboards count it. `date` defaults to the last capture date and accepts
+YYYY/MM/DD or YYYY-MM-DD; any other value gets 400 Bad Request.
+
+Responses carry an ETag derived from the data file's content and the
+request, and a matching If-None-Match gets 304 Not Modified. --port 0 picks
+a free port, which is printed on startup.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from bisect import bisect_right
+from collections import Counter, OrderedDict, defaultdict
+from datetime import datetime
+from urllib.parse import parse_qsl, urlsplit
+
+from convert_911_json_to_csv import iter_capture_rows
+from instrument import stage
+from pipeline_911 import read_source
+from progress_store import PROGRESS_COLUMNS, is_warehouse_path, iter_progress_rows, split_warehouse_path
+from rollup_cube import RollupCube
+from stage_cache import file_digest
+
+NO_DATA = 'no data'
+COMPLETE = 'complete'
+RESPONSE_CACHE_SIZE = 1024
+MAX_HEADER_LINES = 100
+DATE_FORMATS = ('%Y/%m/%d', '%Y-%m-%d')
+
+STATUS_TEXT = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+
+def _date_key(date):
+    return date.replace('/', '').replace('-', '')
+
+
+def _query_date(value):
+    """A date parameter as YYYY/MM/DD; QueryError (400) if it is not a date"""
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).strftime('%Y/%m/%d')
+        except ValueError:
+            pass
+    raise QueryError('date must be YYYY/MM/DD or YYYY-MM-DD, not {!r}'.format(value))
+
+
+def load_progress_rows(path):
+    """Progress rows (dicts of PROGRESS_COLUMNS) from a CSV/.pgs store, warehouse dataset, JSON or RTF export"""
+    if path.lower().endswith(('.json', '.rtf')):
+        location_mapping, dated_tables = read_source(path)
+        return (dict(zip(PROGRESS_COLUMNS, row)) for row in iter_capture_rows(location_mapping, dated_tables))
+    return iter_progress_rows(path)
+
+
+def source_version(path):
+    """Content hash of a progress file; for a warehouse dataset, of the database and its WAL"""
+    if not is_warehouse_path(path):
+        return file_digest(path)
+    db_path, dataset = split_warehouse_path(path)
+    digest = hashlib.sha256(dataset.encode('utf-8'))
+    for part in (db_path, db_path + '-wal'):
+        digest.update(file_digest(part).encode('ascii') if os.path.exists(part) else b'-')
+    return digest.hexdigest()
+
+
+class QueryError(Exception):
+    """A request the index cannot answer; status is the HTTP status to send"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class ProgressIndex:
+    """In-memory indexes over progress rows for the service's queries"""
+
+    def __init__(self, rows, version=''):
+        self.version = version
+        self.rows = 0
+        self.task_section = {}
+        self.location_observations = defaultdict(list)
+        self.tasks_by_trade = defaultdict(list)
+        self.cube = RollupCube()
+        observations = defaultdict(list)
+        dates = set()
+        for row in rows:
+            location, trade, state, date = row['location'], row['trade'], row['state'], row['capture_date']
+            task = (location, trade)
+            if task not in self.task_section:
+                self.tasks_by_trade[trade].append(task)
+            self.task_section[task] = row['section']
+            self.location_observations[location].append((date, trade, state))
+            dates.add(date)
+            self.cube.add(row['section'], trade, date, state)
+            if state != NO_DATA:
+                observations[task].append((_date_key(date), state))
+            self.rows += 1
+
+        self.dates = sorted(dates, key=_date_key)
+        self._date_keys = [_date_key(date) for date in self.dates]
+        self.sections = sorted({section for section in self.task_section.values()})
+        self.trades = sorted(self.tasks_by_trade)
+
+        # Per task, observation dates and states in date order for as-of lookups
+        self._task_dates = {}
+        self._task_states = {}
+        changes = defaultdict(list)
+        for task, observed in observations.items():
+            observed.sort(key=lambda item: item[0])
+            self._task_dates[task] = [date for date, _ in observed]
+            self._task_states[task] = [state for _, state in observed]
+            for date, state in observed:
+                changes[date].append((task, state))
+
+        # (complete, tasks) per (section, trade) as of every capture date, in one sweep
+        current = {}
+        counts = defaultdict(Counter)
+        self._snapshots = []
+        for date in self._date_keys:
+            for task, state in changes[date]:
+                group = counts[(self.task_section[task], task[1])]
+                previous = current.get(task)
+                if previous is not None:
+                    group[previous] -= 1
+                group[state] += 1
+                current[task] = state
+            self._snapshots.append({
+                group: (state_counts[COMPLETE], sum(state_counts.values()))
+                for group, state_counts in counts.items()
+            })
+
+    @classmethod
+    def load(cls, path):
+        return cls(load_progress_rows(path), source_version(path))
+
+    def _date_position(self, date):
+        """Index of the last capture date on or before date (-1 if none); default the last"""
+        if not date:
+            return len(self.dates) - 1
+        return bisect_right(self._date_keys, _date_key(date)) - 1
+
+    def _state_as_of(self, task, date_key):
+        dates = self._task_dates.get(task)
+        if not dates:
+            return None
+        i = bisect_right(dates, date_key) - 1
+        return self._task_states[task][i] if i >= 0 else None
+
+    @staticmethod
+    def _percent(complete, tasks):
+        return round(complete / tasks * 100, 1) if tasks else 0.0
+
+    def _totals(self, position, section, trade, group_by):
+        if position < 0:
+            return {}
+        totals = defaultdict(lambda: [0, 0])
+        for (group_section, group_trade), (complete, tasks) in self._snapshots[position].items():
+            if section is not None and group_section != section:
+                continue
+            if trade is not None and group_trade != trade:
+                continue
+            key = group_section if group_by == 'section' else group_trade if group_by == 'trade' else None
+            totals[key][0] += complete
+            totals[key][1] += tasks
+        return totals
+
+    def summary(self):
+        return {
+            'rows': self.rows,
+            'tasks': len(self.task_section),
+            'locations': len(self.location_observations),
+            'sections': self.sections,
+            'trades': self.trades,
+            'capture_dates': self.dates,
+        }
+
+    def percent_complete(self, section=None, trade=None, date=None, group_by=None):
+        """Complete tasks / observed tasks as of date, optionally broken down"""
+        if group_by not in (None, 'section', 'trade', 'date'):
+            raise QueryError("group_by must be 'section', 'trade' or 'date'")
+
+        if group_by == 'date':
+            series = []
+            for position, capture_date in enumerate(self.dates):
+                complete, tasks = self._totals(position, section, trade, None).get(None, (0, 0))
+                series.append({'date': capture_date, 'complete': complete, 'tasks': tasks,
+                               'percent': self._percent(complete, tasks)})
+            return {'section': section, 'trade': trade, 'series': series}
+
+        position = self._date_position(date)
+        as_of = self.dates[position] if position >= 0 else None
+        if group_by is None:
+            complete, tasks = self._totals(position, section, trade, None).get(None, (0, 0))
+            return {'section': section, 'trade': trade, 'date': as_of, 'complete': complete, 'tasks': tasks,
+                    'percent': self._percent(complete, tasks)}
+
+        totals = self._totals(position, section, trade, group_by)
+        return {
+            'section': section, 'trade': trade, 'date': as_of,
+            'groups': [
+                {group_by: key, 'complete': complete, 'tasks': tasks, 'percent': self._percent(complete, tasks)}
+                for key, (complete, tasks) in sorted(totals.items())
+            ],
+        }
+
+    def locations(self, trade=None, state=None, section=None, date=None):
+        """Tasks with their state as of date, filtered by trade, state and section"""
+        position = self._date_position(date)
+        as_of = self.dates[position] if position >= 0 else None
+        date_key = self._date_keys[position] if position >= 0 else ''
+        tasks = self.tasks_by_trade.get(trade, []) if trade is not None else list(self.task_section)
+        results = []
+        for task in tasks:
+            if section is not None and self.task_section[task] != section:
+                continue
+            task_state = self._state_as_of(task, date_key)
+            if task_state is None or (state is not None and task_state != state):
+                continue
+            results.append({'location': task[0], 'trade': task[1], 'state': task_state})
+        results.sort(key=lambda item: (item['location'], item['trade']))
+        return {'trade': trade, 'state': state, 'section': section, 'date': as_of,
+                'count': len(results), 'locations': results}
+
+    def counts(self, section=None, trade=None, date=None):
+        """Raw observation counts per state from the rollup cube (date: that capture only)"""
+        if date is not None:
+            position = self._date_position(date)
+            if position < 0 or self._date_keys[position] != _date_key(date):
+                raise QueryError('No capture on {!r}'.format(date), 404)
+            date = self.dates[position]
+        by_state = {state: self.cube.count(section, trade, date, state) for state in self.cube.values['state']}
+        return {'section': section, 'trade': trade, 'date': date,
+                'observations': self.cube.count(section, trade, date),
+                'percent_complete': self.cube.percent_complete(section, trade, date),
+                'by_state': {state: count for state, count in by_state.items() if count}}
+
+    def history(self, location=None):
+        """Every capture of one location in date order"""
+        if not location:
+            raise QueryError('location is required')
+        observed = self.location_observations.get(location)
+        if observed is None:
+            raise QueryError('Unknown location {!r}'.format(location), 404)
+        observed = sorted(observed, key=lambda item: (_date_key(item[0]), item[1]))
+        trades = sorted({trade for _, trade, _ in observed})
+        return {
+            'location': location,
+            'section': self.task_section[(location, trades[0])],
+            'trades': trades,
+            'observations': [{'date': date, 'trade': trade, 'state': state} for date, trade, state in observed],
+        }
+
+
+class ProgressService:
+    """Routes requests to a ProgressIndex and caches the encoded responses"""
+
+    def __init__(self, index):
+        self.index = index
+        self.routes = {
+            '/summary': (index.summary, ()),
+            '/percent-complete': (index.percent_complete, ('section', 'trade', 'date', 'group_by')),
+            '/locations': (index.locations, ('trade', 'state', 'section', 'date')),
+            '/history': (index.history, ('location',)),
+            '/counts': (index.counts, ('section', 'trade', 'date')),
+        }
+        self._responses = OrderedDict()
+
+    def etag(self, path, params):
+        request = json.dumps([path, sorted(params.items())])
+        return '"{}"'.format(hashlib.sha1((self.index.version + request).encode('utf-8')).hexdigest()[:20])
+
+    def respond(self, target, if_none_match=None):
+        """(status, body bytes, etag) for a request target such as '/history?location=GPS'"""
+        url = urlsplit(target)
+        route = self.routes.get(url.path.rstrip('/') or '/')
+        if route is None:
+            return 404, _json_body({'error': 'Unknown endpoint', 'endpoints': sorted(self.routes)}), None
+        handler, allowed = route
+        params = {name: value for name, value in parse_qsl(url.query) if value != ''}
+        unknown = sorted(set(params) - set(allowed))
+        if unknown:
+            return 400, _json_body({'error': 'Unknown parameters {}'.format(unknown), 'allowed': list(allowed)}), None
+
+        if 'date' in params:
+            # Checked here once, so every endpoint rejects the same bad dates
+            try:
+                params['date'] = _query_date(params['date'])
+            except QueryError as e:
+                return e.status, _json_body({'error': str(e)}), None
+
+        etag = self.etag(url.path, params)
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return 304, b'', etag
+        body = self._responses.get(etag)
+        if body is None:
+            try:
+                body = _json_body(handler(**params))
+            except QueryError as e:
+                return e.status, _json_body({'error': str(e)}), None
+            self._responses[etag] = body
+            if len(self._responses) > RESPONSE_CACHE_SIZE:
+                self._responses.popitem(last=False)
+        else:
+            self._responses.move_to_end(etag)
+        return 200, body, etag
+
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it is closed"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    break
+                method, target, version = parts
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+
+                if method not in ('GET', 'HEAD'):
+                    status, body, etag = 405, _json_body({'error': 'Only GET and HEAD are supported'}), None
+                else:
+                    status, body, etag = self.respond(target, headers.get('if-none-match'))
+                writer.write(_response_head(status, len(body), etag, keep_alive))
+                if method != 'HEAD':
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _json_body(data):
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def _response_head(status, length, etag, keep_alive):
+    lines = [
+        'HTTP/1.1 {} {}'.format(status, STATUS_TEXT[status]),
+        'Content-Type: application/json',
+        'Content-Length: {}'.format(length),
+        'Cache-Control: no-cache',
+        # The dashboards are opened from disk, so allow any origin
+        'Access-Control-Allow-Origin: *',
+        'Connection: {}'.format('keep-alive' if keep_alive else 'close'),
+    ]
+    if etag:
+        lines.append('ETag: {}'.format(etag))
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+async def start_service(index, host='127.0.0.1', port=8765):
+    """Start serving an index; returns the asyncio server (port 0 picks a free port)"""
+    service = ProgressService(index)
+    return await asyncio.start_server(service.handle, host, port)
+
+
+async def serve(path, host='127.0.0.1', port=8765):
+    with stage('load index') as s:
+        index = ProgressIndex.load(path)
+        s.rows_out = index.rows
+    server = await start_service(index, host, port)
+    bound = server.sockets[0].getsockname()
+    print(f"📊 {index.rows} rows, {len(index.task_section)} tasks, {len(index.dates)} capture dates from {path}")
+    print(f"🌐 Serving on http://{bound[0]}:{bound[1]}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {'--host': '127.0.0.1', '--port': '8765'}
+    for flag in options:
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1]
+            del args[i:i + 2]
+    if len(args) != 1:
+        raise SystemExit(__doc__)
+    try:
+        asyncio.run(serve(args[0], options['--host'], int(options['--port'])))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,342 @@
+"""Dictionary-encoded columnar store for progress observations
+
+Progress rows repeat a handful of strings (location names, trades,
+"not started"/"in progress"/"complete", capture dates) thousands of times.
+ProgressStore keeps one integer code column per field in an `array`, plus
+the list of distinct values for each column. A store is saved as a single
+binary file: a small JSON header holding the dictionaries and column
+offsets, followed by the raw code arrays, which load() memory-maps.
+
+Paths ending in STORE_SUFFIX are treated as stores by read_progress_table,
+iter_progress_rows and open_progress_writer, and warehouse paths
+(warehouse.sqlite[#dataset], see progress_warehouse.py) as SQLite datasets;
+anything else is CSV.
+"""
+import csv
+import json
+import mmap
+import struct
+import sys
+from array import array
+from contextlib import contextmanager
+
+PROGRESS_COLUMNS = ['location', 'section', 'level / floor', 'trade', 'state', 'start_date', 'complete_date', 'capture_date']
+STORE_SUFFIX = '.pgs'
+WAREHOUSE_SUFFIXES = ('.sqlite', '.db')
+
+_MAGIC = b'PGS1'
+_ALIGN = 8
+
+
+def _code_typecode(size):
+    """Smallest unsigned array typecode that can index `size` values"""
+    if size <= 1 << 8:
+        return 'B'
+    if size <= 1 << 16:
+        return 'H'
+    return 'I'
+
+
+def _narrow(codes, typecode):
+    """Copy codes into an array of the given typecode"""
+    if getattr(codes, 'typecode', None) == typecode:
+        return array(typecode, codes)
+    try:
+        import numpy as np
+    except ImportError:
+        return array(typecode, codes)
+    data = array(typecode)
+    data.frombytes(np.asarray(codes).astype(np.dtype(typecode)).tobytes())
+    return data
+
+
+class ProgressStore:
+    """Integer-coded progress columns with one dictionary per column"""
+
+    def __init__(self, columns=PROGRESS_COLUMNS):
+        self.columns = list(columns)
+        self.dictionaries = {name: [] for name in self.columns}
+        self._codes = {name: array('I') for name in self.columns}
+        self._lookup = None
+        self._mmap = None
+
+    def __len__(self):
+        return len(self._codes[self.columns[0]]) if self.columns else 0
+
+    def _encoders(self):
+        if self._lookup is None:
+            self._lookup = {name: {v: i for i, v in enumerate(values)} for name, values in self.dictionaries.items()}
+            # Stores loaded from disk hold read-only views; copy before appending
+            for name in self.columns:
+                if not isinstance(self._codes[name], array):
+                    self._codes[name] = array('I', self._codes[name])
+        return self._lookup
+
+    def encode(self, name, value):
+        """Code for value in column name, adding it to the dictionary if new"""
+        lookup = self._encoders()[name]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self.dictionaries[name])
+            self.dictionaries[name].append(value)
+        return code
+
+    def append(self, row):
+        """Append one row given as a dict keyed by column or a sequence in column order"""
+        if isinstance(row, dict):
+            row = [row.get(name, '') for name in self.columns]
+        elif len(row) < len(self.columns):
+            row = list(row) + [''] * (len(self.columns) - len(row))
+        lookup = self._encoders()
+        for name, value in zip(self.columns, row):
+            codes = lookup[name]
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(self.dictionaries[name])
+                self.dictionaries[name].append(value)
+            self._codes[name].append(code)
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def codes(self, name):
+        """Integer codes for one column (array or memory-mapped view)"""
+        return self._codes[name]
+
+    def codes_numpy(self, name):
+        """Codes for one column as a NumPy array, without copying mapped data"""
+        import numpy as np
+        return np.asarray(self._codes[name])
+
+    def column(self, name):
+        """Decoded values for one column"""
+        values = self.dictionaries[name]
+        return [values[c] for c in self._codes[name]]
+
+    def iter_rows(self):
+        """Yield each row as a dict keyed by column name"""
+        columns = self.columns
+        decoded = [(self.dictionaries[name], self._codes[name]) for name in columns]
+        for i in range(len(self)):
+            yield {name: values[codes[i]] for name, (values, codes) in zip(columns, decoded)}
+
+    @classmethod
+    def from_rows(cls, rows, columns=PROGRESS_COLUMNS):
+        store = cls(columns)
+        store.extend(rows)
+        return store
+
+    @classmethod
+    def from_codes(cls, columns):
+        """Build a store from (name, values, codes) triples, codes being any integer sequence"""
+        store = cls([name for name, _, _ in columns])
+        for name, values, codes in columns:
+            store.dictionaries[name] = list(values)
+            if hasattr(codes, 'astype'):
+                # NumPy arrays: copy the buffer instead of iterating elements
+                data = array('I')
+                data.frombytes(codes.astype('uint32').tobytes())
+            else:
+                data = array('I', codes)
+            store._codes[name] = data
+        return store
+
+    @classmethod
+    def from_csv(cls, csv_file):
+        with open(csv_file, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            store = cls(header)
+            store.extend(row for row in reader if row)
+        return store
+
+    def iter_tuples(self):
+        """Yield each row as a tuple in column order"""
+        decoded = [(self.dictionaries[name], self._codes[name]) for name in self.columns]
+        for i in range(len(self)):
+            yield tuple(values[codes[i]] for values, codes in decoded)
+
+    def to_csv(self, csv_file):
+        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.columns)
+            writer.writerows(self.iter_tuples())
+
+    def save(self, path):
+        """Write the store as header + aligned little-endian code arrays"""
+        columns = []
+        blobs = []
+        offset = 0
+        for name in self.columns:
+            typecode = _code_typecode(len(self.dictionaries[name]))
+            data = _narrow(self._codes[name], typecode)
+            if sys.byteorder != 'little':
+                data.byteswap()
+            blob = data.tobytes()
+            columns.append({
+                'name': name,
+                'typecode': typecode,
+                'offset': offset,
+                'length': len(data),
+                'values': self.dictionaries[name],
+            })
+            blobs.append(blob)
+            offset += len(blob) + (-len(blob) % _ALIGN)
+
+        header = json.dumps({'rows': len(self), 'columns': columns}, separators=(',', ':')).encode('utf-8')
+        prefix = len(_MAGIC) + 4 + len(header)
+        padding = -prefix % _ALIGN
+        with open(path, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(struct.pack('<I', len(header) + padding))
+            f.write(header + b' ' * padding)
+            for blob in blobs:
+                f.write(blob)
+                f.write(b'\0' * (-len(blob) % _ALIGN))
+
+    @classmethod
+    def load(cls, path, use_mmap=True):
+        """Open a saved store; code columns are memory-mapped when possible"""
+        with open(path, 'rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{path} is not a progress store")
+            (header_size,) = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_size))
+            data_start = len(_MAGIC) + 4 + header_size
+            if use_mmap and sys.byteorder == 'little':
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                f.seek(0)
+                buffer = f.read()
+
+        store = cls([c['name'] for c in header['columns']])
+        if isinstance(buffer, mmap.mmap):
+            store._mmap = buffer
+        view = memoryview(buffer)
+        for c in header['columns']:
+            store.dictionaries[c['name']] = c['values']
+            size = array(c['typecode']).itemsize
+            start = data_start + c['offset']
+            codes = view[start:start + c['length'] * size].cast(c['typecode'])
+            if sys.byteorder != 'little':
+                codes = array(c['typecode'], codes)
+                codes.byteswap()
+            store._codes[c['name']] = codes
+        return store
+
+
+def is_store_path(path):
+    return str(path).endswith(STORE_SUFFIX)
+
+
+def is_warehouse_path(path):
+    return split_warehouse_path(path)[0].lower().endswith(WAREHOUSE_SUFFIXES)
+
+
+def split_warehouse_path(path):
+    """'warehouse.sqlite#name' -> ('warehouse.sqlite', 'name'); the dataset defaults to 'progress'"""
+    db_path, _, dataset = str(path).partition('#')
+    return db_path, dataset or 'progress'
+
+
+def load_progress_store(path):
+    """Load a progress CSV, store or warehouse dataset as a ProgressStore"""
+    if is_warehouse_path(path):
+        from progress_warehouse import iter_warehouse_rows
+        return ProgressStore.from_rows(iter_warehouse_rows(*split_warehouse_path(path)))
+    if is_store_path(path):
+        return ProgressStore.load(path)
+    return ProgressStore.from_csv(path)
+
+
+def save_progress_store(store, path):
+    """Write a ProgressStore to a .pgs store, a warehouse dataset or a CSV"""
+    if is_warehouse_path(path):
+        from progress_warehouse import write_progress_rows
+        write_progress_rows(*split_warehouse_path(path), store.iter_rows())
+    elif is_store_path(path):
+        store.save(path)
+    else:
+        store.to_csv(path)
+
+
+def iter_progress_rows(path):
+    """Yield rows as dicts from a progress CSV, store or warehouse dataset"""
+    if is_warehouse_path(path):
+        from progress_warehouse import iter_warehouse_rows
+        yield from iter_warehouse_rows(*split_warehouse_path(path))
+        return
+    if is_store_path(path):
+        yield from ProgressStore.load(path).iter_rows()
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+
+def read_progress_table(path):
+    """Return (fieldnames, rows as dicts) from a progress CSV, store or warehouse dataset"""
+    if is_warehouse_path(path):
+        return list(PROGRESS_COLUMNS), list(iter_progress_rows(path))
+    if is_store_path(path):
+        store = ProgressStore.load(path)
+        return list(store.columns), list(store.iter_rows())
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+        return reader.fieldnames, rows
+
+
+class _StoreWriter:
+    """csv.writer-like front end that appends rows to a ProgressStore"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def writerow(self, row):
+        self.store.append(row)
+
+    def writerows(self, rows):
+        self.store.extend(rows)
+
+
+class _CsvWriter:
+    """csv.writer that also accepts rows as dicts keyed by fieldname"""
+
+    def __init__(self, f, fieldnames):
+        self.fieldnames = fieldnames
+        self.writer = csv.writer(f)
+
+    def writerow(self, row):
+        if isinstance(row, dict):
+            row = [row.get(name, '') for name in self.fieldnames]
+        self.writer.writerow(row)
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+
+@contextmanager
+def open_progress_writer(path, fieldnames):
+    """Write progress rows (dicts or sequences) to a CSV, store or warehouse dataset
+
+    The CSV header is written up front; a store is saved, and a warehouse
+    dataset committed, when the block exits.
+    """
+    if is_warehouse_path(path):
+        if list(fieldnames) != PROGRESS_COLUMNS:
+            raise ValueError(f"Warehouse datasets hold {PROGRESS_COLUMNS}, not {list(fieldnames)}")
+        from progress_warehouse import open_warehouse_writer
+        with open_warehouse_writer(*split_warehouse_path(path)) as writer:
+            yield writer
+        return
+    if is_store_path(path):
+        store = ProgressStore(fieldnames)
+        yield _StoreWriter(store)
+        store.save(path)
+        return
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = _CsvWriter(f, list(fieldnames))
+        writer.writer.writerow(fieldnames)
+        yield writer
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""SQLite warehouse for progress observations, schedules and mappings
+
+Usage: progress_warehouse.py <warehouse.sqlite[#NAME]> load-progress <progress.csv|.pgs|.json|.rtf> [--dataset NAME]
+       progress_warehouse.py <warehouse.sqlite[#NAME]> load-schedule <schedule.csv|.xer> [--dataset NAME]
+       progress_warehouse.py <warehouse.sqlite[#NAME]> load-mapping <mapping.csv> [--dataset NAME]
+       progress_warehouse.py <warehouse.sqlite> datasets
+       progress_warehouse.py <warehouse.sqlite> query "<SQL>"
+
+Everything is loaded once with batched executemany calls into a WAL-mode
+database, indexed on (location, trade, capture_date) and (trade, state), so
+later queries and joins do not re-parse the source files.
+
+Progress observations are grouped into named datasets. A path of the form
+warehouse.sqlite#NAME is accepted by iter_progress_rows, read_progress_table,
+load_progress_store, save_progress_store and open_progress_writer in
+progress_store.py, so any script reading or writing a progress CSV or .pgs
+store can use a dataset instead; without #NAME the dataset is 'progress'.
+Writing a dataset replaces it in one transaction. On the command line,
+--dataset overrides a #NAME given with the warehouse path.
+"""
+import csv
+import json
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from instrument import stage
+from progress_store import PROGRESS_COLUMNS, split_warehouse_path
+
+BATCH_ROWS = 10_000
+DEFAULT_DATASET = 'progress'
+
+# SQL column for each progress column
+OBSERVATION_COLUMNS = [column.replace(' / ', '_') for column in PROGRESS_COLUMNS]
+SCHEDULE_COLUMNS = ['activity_id', 'activity_name', 'location', 'trade', 'start', 'finish']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    dataset TEXT NOT NULL,
+    {observation_columns}
+);
+CREATE INDEX IF NOT EXISTS observations_dataset ON observations (dataset);
+CREATE INDEX IF NOT EXISTS observations_location_trade_date ON observations (location, trade, capture_date);
+CREATE INDEX IF NOT EXISTS observations_trade_state ON observations (trade, state);
+
+CREATE TABLE IF NOT EXISTS schedule_activities (
+    dataset TEXT NOT NULL,
+    {schedule_columns}
+);
+CREATE INDEX IF NOT EXISTS schedule_activities_id ON schedule_activities (dataset, activity_id);
+CREATE INDEX IF NOT EXISTS schedule_activities_trade ON schedule_activities (trade);
+
+CREATE TABLE IF NOT EXISTS schedule_mapping (
+    dataset TEXT NOT NULL,
+    activity_id TEXT,
+    activity_name TEXT,
+    schedule_trade TEXT,
+    row_json TEXT
+);
+CREATE INDEX IF NOT EXISTS schedule_mapping_id ON schedule_mapping (dataset, activity_id);
+""".format(
+    observation_columns=',\n    '.join(f'"{column}" TEXT' for column in OBSERVATION_COLUMNS),
+    schedule_columns=',\n    '.join(f'{column} TEXT' for column in SCHEDULE_COLUMNS),
+)
+
+
+def open_warehouse(db_path):
+    """Connect to (and if needed create) a warehouse in WAL mode"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _insert_batches(conn, sql, rows):
+    """executemany in batches of BATCH_ROWS; returns rows inserted"""
+    total = 0
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, BATCH_ROWS))
+        if not batch:
+            return total
+        conn.executemany(sql, batch)
+        total += len(batch)
+
+
+def _insert_sql(table, columns):
+    names = ', '.join(f'"{column}"' for column in columns)
+    return f'INSERT INTO {table} ({names}) VALUES ({", ".join("?" * len(columns))})'
+
+
+class _WarehouseWriter:
+    """csv.writer-like front end inserting progress rows in batches"""
+
+    def __init__(self, conn, dataset):
+        self.conn = conn
+        self.dataset = dataset
+        self.sql = _insert_sql('observations', ['dataset'] + OBSERVATION_COLUMNS)
+        self.pending = []
+        self.rows = 0
+
+    def writerow(self, row):
+        if isinstance(row, dict):
+            row = [row.get(column, '') for column in PROGRESS_COLUMNS]
+        elif len(row) != len(PROGRESS_COLUMNS):
+            raise ValueError(f"Expected {len(PROGRESS_COLUMNS)} progress columns, got {len(row)}")
+        self.pending.append((self.dataset, *row))
+        if len(self.pending) >= BATCH_ROWS:
+            self.flush()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self):
+        self.conn.executemany(self.sql, self.pending)
+        self.rows += len(self.pending)
+        self.pending = []
+
+
+@contextmanager
+def open_warehouse_writer(db_path, dataset=DEFAULT_DATASET, replace=True):
+    """Writer for a dataset's progress rows (dicts or sequences in PROGRESS_COLUMNS order)
+
+    Everything is written in one transaction, committed when the block exits;
+    with replace the dataset's previous rows are deleted in it too.
+    """
+    conn = open_warehouse(db_path)
+    try:
+        with conn:
+            if replace:
+                conn.execute('DELETE FROM observations WHERE dataset = ?', (dataset,))
+            writer = _WarehouseWriter(conn, dataset)
+            yield writer
+            writer.flush()
+    finally:
+        conn.close()
+
+
+def write_progress_rows(db_path, dataset, rows, replace=True):
+    """Store progress rows as a dataset, replacing or appending to it; returns rows written"""
+    with open_warehouse_writer(db_path, dataset, replace) as writer:
+        writer.writerows(rows)
+    return writer.rows
+
+
+def iter_warehouse_rows(db_path, dataset=DEFAULT_DATASET):
+    """Yield a dataset's progress rows as dicts keyed by PROGRESS_COLUMNS, in insertion order"""
+    conn = open_warehouse(db_path)
+    try:
+        names = ', '.join(f'"{column}"' for column in OBSERVATION_COLUMNS)
+        cursor = conn.execute(f'SELECT {names} FROM observations WHERE dataset = ? ORDER BY rowid', (dataset,))
+        while True:
+            batch = cursor.fetchmany(BATCH_ROWS)
+            if not batch:
+                return
+            for values in batch:
+                yield dict(zip(PROGRESS_COLUMNS, values))
+    finally:
+        conn.close()
+
+
+def _iter_schedule(path):
+    """(activity_id, name, location, trade, start, finish) from a schedule CSV or XER
+
+    A trade missing from the export is judged from the activity name by the
+    alias classifier of xer_trade_map ('Unassigned' if nothing matches). XER
+    tasks carry no location, so theirs is the area prefix the UNO activity
+    parser reads from the name ('' if it finds none).
+    """
+    from uno_schedule_mapping_generator import extract_location_prefix, read_schedule_csv
+    from xer_trade_map import TradeClassifier, compile_aliases, iter_xer_records, judge_task_name, pick_field
+
+    classifier = TradeClassifier(compile_aliases())
+    if path.lower().endswith('.xer'):
+        fields = None
+        for _, record in iter_xer_records(path, ('TASK',)):
+            if fields is None:
+                keys = list(record._fields)
+                fields = [
+                    pick_field(keys, ['task_code', 'task_id']),
+                    pick_field(keys, ['task_name']),
+                    pick_field(keys, ['target_start_date', 'early_start_date', 'act_start_date']),
+                    pick_field(keys, ['target_end_date', 'early_end_date', 'act_end_date']),
+                ]
+            activity_id, name, start, finish = (getattr(record, field) if field else '' for field in fields)
+            yield (activity_id, name, extract_location_prefix(name)[0], judge_task_name(name, classifier)[0],
+                   start, finish)
+    else:
+        for activity_id, name, location, trade, start, finish in read_schedule_csv(path):
+            yield activity_id, name, location, trade or judge_task_name(name, classifier)[0], start, finish
+
+
+def load_schedule(conn, path, dataset):
+    """Replace a dataset of schedule activities from a schedule CSV or XER"""
+    with conn:
+        conn.execute('DELETE FROM schedule_activities WHERE dataset = ?', (dataset,))
+        return _insert_batches(conn, _insert_sql('schedule_activities', ['dataset'] + SCHEDULE_COLUMNS),
+                               ((dataset,) + tuple(activity) for activity in _iter_schedule(path)))
+
+
+def load_mapping(conn, path, dataset):
+    """Replace a dataset of schedule-to-actual mapping rows
+
+    The ID, name and trade are columns for joins; the full row is kept as JSON.
+    """
+    with conn, open(path, 'r', encoding='utf-8', newline='') as f:
+        conn.execute('DELETE FROM schedule_mapping WHERE dataset = ?', (dataset,))
+        rows = ((dataset, row.get('Activity_ID', ''), row.get('Activity_Name', ''), row.get('Schedule_Trade', ''),
+                 json.dumps(row)) for row in csv.DictReader(f))
+        return _insert_batches(conn, _insert_sql('schedule_mapping', ['dataset', 'activity_id', 'activity_name',
+                                                                      'schedule_trade', 'row_json']), rows)
+
+
+def load_progress(db_path, path, dataset=DEFAULT_DATASET):
+    """Replace a dataset with the observations of a progress CSV/.pgs store, JSON or RTF"""
+    from progress_service import load_progress_rows
+
+    return write_progress_rows(db_path, dataset, load_progress_rows(path))
+
+
+def _pop_option(args, flag, default):
+    if flag not in args:
+        return default
+    i = args.index(flag)
+    value = args[i + 1]
+    del args[i:i + 2]
+    return value
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) < 2:
+        raise SystemExit(__doc__)
+    warehouse, command, args = args[0], args[1], args[2:]
+    db_path, path_dataset = split_warehouse_path(warehouse)
+    # A dataset named in the path (warehouse.sqlite#NAME) is the default for --dataset
+    dataset = _pop_option(args, '--dataset', path_dataset if '#' in warehouse else None)
+
+    if command in ('load-progress', 'load-schedule', 'load-mapping') and len(args) == 1:
+        with stage(command) as s:
+            if command == 'load-progress':
+                s.rows_out = load_progress(db_path, args[0], dataset or DEFAULT_DATASET)
+            else:
+                conn = open_warehouse(db_path)
+                try:
+                    load = load_schedule if command == 'load-schedule' else load_mapping
+                    s.rows_out = load(conn, args[0], dataset or 'schedule')
+                finally:
+                    conn.close()
+        print(f"✅ Loaded {s.rows_out} rows from {args[0]} into {db_path}")
+    elif command == 'datasets' and not args:
+        conn = open_warehouse(db_path)
+        for table in ('observations', 'schedule_activities', 'schedule_mapping'):
+            for name, count in conn.execute(f'SELECT dataset, COUNT(*) FROM {table} GROUP BY dataset'):
+                print(f"  {table:20s} {name:24s} {count:>10,}")
+        conn.close()
+    elif command == 'query' and len(args) == 1:
+        conn = open_warehouse(db_path)
+        started = time.perf_counter()
+        cursor = conn.execute(args[0])
+        writer = csv.writer(sys.stdout)
+        if cursor.description:
+            writer.writerow([column[0] for column in cursor.description])
+            writer.writerows(cursor)
+        conn.close()
+        print(f"⏱️ {(time.perf_counter() - started) * 1000:.1f} ms", file=sys.stderr)
+    else:
+        raise SystemExit(__doc__)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Pre-aggregated observation counts per section x trade x capture date x state
+
+Usage: rollup_cube.py build <progress.csv|.pgs|.json|.rtf> <cube.json>
+       rollup_cube.py append <cube.json> <capture.csv|.pgs>
+       rollup_cube.py query <cube.json> [--section S] [--trade T] [--date D] [--state X]
+
+One pass over the observations counts every (section, trade, capture_date,
+state) cell together with all of its roll-ups: any of the four dimensions
+can be left out (None), so project totals, trade totals, section totals and
+per-date totals are all materialised. Every count, and so every completion
+percentage, is a single dictionary lookup.
+
+Capture dates are stored as YYYY/MM/DD; YYYY-MM-DD is accepted wherever a
+date is given and normalised on the way in.
+
+The cube is saved as JSON holding the dimension values and the base cells
+as coded integers; roll-ups are rebuilt on load. A new capture is added with
+append, which only reads the new rows and refuses dates that are not after
+the cube's last capture date.
+"""
+import json
+import os
+import sys
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from itertools import product
+
+from instrument import stage
+
+CUBE_VERSION = 1
+COMPLETE = 'complete'
+DIMENSIONS = ('section', 'trade', 'capture_date', 'state')
+DATE_FORMATS = ('%Y/%m/%d', '%Y-%m-%d')
+
+
+@lru_cache(maxsize=4096)
+def normalize_date(date):
+    """A capture date as the stored YYYY/MM/DD; None (all dates) stays None"""
+    if date is None:
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(date, date_format).strftime('%Y/%m/%d')
+        except ValueError:
+            pass
+    raise ValueError(f"Unrecognised capture date {date!r}")
+
+
+class RollupCube:
+    """Counts per (section, trade, capture_date, state); None in a key means all values"""
+
+    def __init__(self):
+        self.cells = Counter()
+        self.values = {dimension: {} for dimension in DIMENSIONS}  # insertion-ordered value sets
+
+    def __len__(self):
+        return self.cells[(None, None, None, None)]
+
+    @property
+    def dates(self):
+        return sorted(self.values['capture_date'])
+
+    def add(self, section, trade, date, state, count=1):
+        """Count one observation (or count of them) in its cell and every roll-up"""
+        date = normalize_date(date)
+        cell = (section, trade, date, state)
+        for dimension, value in zip(DIMENSIONS, cell):
+            self.values[dimension].setdefault(value, None)
+        cells = self.cells
+        for key in product((section, None), (trade, None), (date, None), (state, None)):
+            cells[key] += count
+
+    def add_rows(self, rows):
+        """Count progress rows (dicts with section, trade, capture_date and state)"""
+        added = 0
+        for row in rows:
+            self.add(row['section'], row['trade'], row['capture_date'], row['state'])
+            added += 1
+        return added
+
+    def count(self, section=None, trade=None, date=None, state=None):
+        return self.cells.get((section, trade, normalize_date(date), state), 0)
+
+    def percent_complete(self, section=None, trade=None, date=None):
+        """Share of observations in the 'complete' state, in percent"""
+        total = self.count(section, trade, date)
+        return round(self.count(section, trade, date, COMPLETE) / total * 100, 1) if total else 0.0
+
+    def base_cells(self):
+        """(section, trade, capture_date, state, count) for every non-rolled-up cell"""
+        for key, count in self.cells.items():
+            if None not in key and count:
+                yield key + (count,)
+
+    def to_json(self):
+        codes = {dimension: {value: i for i, value in enumerate(self.values[dimension])} for dimension in DIMENSIONS}
+        cells = []
+        for *cell, count in self.base_cells():
+            cells.extend(codes[dimension][value] for dimension, value in zip(DIMENSIONS, cell))
+            cells.append(count)
+        data = {'version': CUBE_VERSION}
+        data.update((dimension, list(self.values[dimension])) for dimension in DIMENSIONS)
+        data['cells'] = cells
+        return data
+
+    @classmethod
+    def from_json(cls, data):
+        if data.get('version') != CUBE_VERSION:
+            raise ValueError(f"Unsupported cube version {data.get('version')}")
+        cube = cls()
+        values = [data[dimension] for dimension in DIMENSIONS]
+        for dimension, dimension_values in zip(DIMENSIONS, values):
+            cube.values[dimension] = dict.fromkeys(dimension_values)
+        cells = data['cells']
+        width = len(DIMENSIONS) + 1
+        for i in range(0, len(cells), width):
+            s, t, d, st, count = cells[i:i + width]
+            cube.add(values[0][s], values[1][t], values[2][d], values[3][st], count)
+        return cube
+
+
+def save_cube(cube, cube_path):
+    """Write a cube as compact JSON, replacing any previous one atomically"""
+    tmp_path = cube_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cube.to_json(), f, separators=(',', ':'))
+    os.replace(tmp_path, cube_path)
+
+
+def load_cube(cube_path):
+    with open(cube_path, 'r', encoding='utf-8') as f:
+        return RollupCube.from_json(json.load(f))
+
+
+def build_cube(input_path, cube_path):
+    """Count every observation of a progress file into a new cube"""
+    # Imported here so the cube itself does not pull in the 911 readers
+    from progress_service import load_progress_rows
+
+    with stage('build cube') as s:
+        cube = RollupCube()
+        s.rows_in = cube.add_rows(load_progress_rows(input_path))
+        s.rows_out = sum(1 for _ in cube.base_cells())
+    save_cube(cube, cube_path)
+    print(f"✅ {len(cube)} observations in {s.rows_out} cells, {len(cube.dates)} capture dates -> {cube_path}")
+    return cube
+
+
+def append_capture(cube_path, capture_path):
+    """Add the rows of a new capture to a saved cube
+
+    Only the new rows are read. Dates must be after the cube's last capture
+    date, so a capture cannot be counted twice.
+    """
+    from progress_store import iter_progress_rows
+
+    cube = load_cube(cube_path)
+    last_capture_date = cube.dates[-1] if cube.dates else ''
+    new_cells = Counter()
+    for row in iter_progress_rows(capture_path):
+        new_cells[(row['section'], row['trade'], normalize_date(row['capture_date']), row['state'])] += 1
+    stale = sorted({date for _, _, date, _ in new_cells if date <= last_capture_date})
+    if stale:
+        raise ValueError(f"Capture dates {stale} are not after {last_capture_date}; rebuild the cube")
+
+    with stage('append capture') as s:
+        for cell, count in new_cells.items():
+            cube.add(*cell, count=count)
+        s.rows_out = sum(new_cells.values())
+    save_cube(cube, cube_path)
+    print(f"✅ Added {s.rows_out} observations; cube now has {len(cube)} over {len(cube.dates)} capture dates")
+    return cube
+
+
+def _parse_query(args):
+    options = {}
+    for flag, name in (('--section', 'section'), ('--trade', 'trade'), ('--date', 'date'), ('--state', 'state')):
+        if flag in args:
+            i = args.index(flag)
+            options[name] = args[i + 1]
+            del args[i:i + 2]
+    return options
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    command = args.pop(0) if args else None
+    if command == 'build' and len(args) == 2:
+        build_cube(args[0], args[1])
+    elif command == 'append' and len(args) == 2:
+        append_capture(args[0], args[1])
+    elif command == 'query' and args:
+        options = _parse_query(args)
+        cube = load_cube(args[0])
+        state = options.pop('state', None)
+        print(json.dumps({
+            **options,
+            'state': state,
+            'count': cube.count(state=state, **options),
+            'percent_complete': cube.percent_complete(**options),
+        }, indent=2))
+    else:
+        raise SystemExit(__doc__)
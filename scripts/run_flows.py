@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Re-run the 911 and UNO conversion flows through the stage cache
+
+Usage: run_flows.py [911|uno|all] [--out DIR] [--no-cache]
+
+Inputs are read from outputs/WhartonSmith/911 and outputs/Google/UNO.
+Outputs go to DIR/911 and DIR/UNO, DIR being build/ unless --out is given;
+the tracked files in outputs/ are never overwritten. Each stage goes through
+stage_cache, so only the stages whose inputs, code or parameters changed
+(and the stages downstream of an output that actually changed) run.
+"""
+import os
+import sys
+
+from convert_911_json_to_csv import write_json_csv
+from convert_911_rtf_to_json import convert_rtf_to_json
+from convert_raw_txt_to_csv import write_raw_txt_csv
+from create_uno_synthesized import create_uno_synthesized
+from enhance_911_data import write_enhanced_911_csv
+from extract_911_raw_data import write_raw_data_txt
+from stage_cache import DISABLE_ENV, StageCache, run_stage
+from uno_schedule_mapping_generator import stream_uno_schedule_mapping_csv
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WHARTON_911_DIR = os.path.join(REPO_DIR, 'outputs', 'WhartonSmith', '911')
+UNO_DIR = os.path.join(REPO_DIR, 'outputs', 'Google', 'UNO')
+BUILD_DIR = os.path.join(REPO_DIR, 'build')
+
+
+def _check_out_dir(data_dir, out_dir):
+    if os.path.realpath(out_dir) == os.path.realpath(data_dir):
+        raise ValueError(f"Output directory {out_dir} is the source data directory")
+
+
+def run_911_flow(data_dir=WHARTON_911_DIR, out_dir=os.path.join(BUILD_DIR, '911'), cache=None):
+    """911_raw.rtf -> clean JSON -> raw CSV / raw TXT -> TXT CSV, enhanced CSV"""
+    _check_out_dir(data_dir, out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    src = lambda name: os.path.join(data_dir, name)
+    out = lambda name: os.path.join(out_dir, name)
+
+    run_stage(convert_rtf_to_json, {'rtf_file_path': src('911_raw.rtf')},
+              {'output_file_path': out('911_clean.json')}, cache=cache)
+    run_stage(write_json_csv, {'json_file_path': out('911_clean.json')},
+              {'csv_file_path': out('WhartonSmith_911_raw.csv')}, cache=cache)
+    run_stage(write_raw_data_txt, {'json_file': out('911_clean.json')},
+              {'output_txt': out('WhartonSmith_911_Raw_Data.txt')}, cache=cache)
+    run_stage(write_raw_txt_csv, {'txt_file': out('WhartonSmith_911_Raw_Data.txt')},
+              {'csv_file': out('WhartonSmith_911_Raw_Data.csv')}, cache=cache)
+    run_stage(write_enhanced_911_csv, {'input_csv': out('WhartonSmith_911_raw.csv')},
+              {'output_csv': out('WhartonSmith_911_enhanced.csv')}, cache=cache)
+
+
+def run_uno_flow(data_dir=UNO_DIR, out_dir=os.path.join(BUILD_DIR, 'UNO'), cache=None):
+    """UNO_BigJSON.js -> clean JSON -> progress CSV -> synthesized CSV, schedule mapping"""
+    _check_out_dir(data_dir, out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    src = lambda name: os.path.join(data_dir, name)
+    out = lambda name: os.path.join(out_dir, name)
+
+    run_stage(convert_rtf_to_json, {'rtf_file_path': src('UNO_BigJSON.js')},
+              {'output_file_path': out('UNO_BigJSON_clean.json')}, cache=cache)
+    run_stage(write_json_csv, {'json_file_path': out('UNO_BigJSON_clean.json')},
+              {'csv_file_path': out('UNO_construction_data_fixed.csv')}, cache=cache)
+    run_stage(create_uno_synthesized, {'input_file': out('UNO_construction_data_fixed.csv')},
+              {'output_file': out('UNO_synthesized.csv')}, cache=cache)
+    run_stage(stream_uno_schedule_mapping_csv,
+              {'schedule_csv': src('UNO3A-MO-250814.csv'), 'actual_csv': out('UNO_construction_data_fixed.csv')},
+              {'output_csv': out('uno_schedule_to_actualised_mapping.csv')}, cache=cache)
+
+
+def main(argv):
+    args = list(argv)
+    out_root = BUILD_DIR
+    if '--no-cache' in args:
+        args.remove('--no-cache')
+        os.environ[DISABLE_ENV] = '0'
+    if '--out' in args:
+        i = args.index('--out')
+        out_root = args[i + 1]
+        del args[i:i + 2]
+    flow = args[0] if args else 'all'
+    if flow not in ('911', 'uno', 'all'):
+        raise SystemExit(__doc__)
+
+    cache = StageCache()
+    if flow in ('911', 'all'):
+        print("🚧 911 flow")
+        run_911_flow(out_dir=os.path.join(out_root, '911'), cache=cache)
+    if flow in ('uno', 'all'):
+        print("🚧 UNO flow")
+        run_uno_flow(out_dir=os.path.join(out_root, 'UNO'), cache=cache)
+    print(f"\n📊 Stages run: {cache.misses}, restored from cache: {cache.hits}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,201 @@
+"""Content-addressed cache for conversion stages
+
+A stage is one call of a script function that reads input files and writes
+output files, e.g. write_json_csv(json_file_path, csv_file_path). Its
+cache key is a hash of the input file contents, the source of the script
+(plus the sibling modules it uses) and the remaining parameters. Outputs are
+stored once per content hash under objects/, so identical artifacts produced
+by different stages or runs share one copy, and entries/<key>.json records
+which objects a stage produced.
+
+When a key is found the outputs are restored from the store and the stage
+function is not called. Because the key covers input contents rather than
+paths or timestamps, a stage whose upstream output came out unchanged is
+skipped too.
+
+The cache lives in .stage_cache (or $STAGE_CACHE_DIR); STAGE_CACHE=0
+turns it off.
+"""
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import shutil
+import sys
+import types
+
+CACHE_DIR_ENV = 'STAGE_CACHE_DIR'
+DISABLE_ENV = 'STAGE_CACHE'
+DEFAULT_CACHE_DIR = '.stage_cache'
+
+_SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _file_stamp(path):
+    """(inode, mtime, size) of a file, None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _local_modules(module, seen):
+    """module plus the modules from scripts/ it uses, transitively"""
+    if module is None or module.__name__ in seen:
+        return
+    path = getattr(module, '__file__', None)
+    if not path or os.path.dirname(os.path.abspath(path)) != _SCRIPTS_DIR:
+        return
+    seen[module.__name__] = os.path.abspath(path)
+    for value in list(vars(module).values()):
+        if isinstance(value, types.ModuleType):
+            _local_modules(value, seen)
+        else:
+            _local_modules(sys.modules.get(getattr(value, '__module__', None) or ''), seen)
+
+
+def script_version(func):
+    """Hash of the source of func's module and the scripts/ modules it uses"""
+    seen = {}
+    _local_modules(inspect.getmodule(func), seen)
+    if not seen:
+        return hashlib.sha256(inspect.getsource(func).encode('utf-8')).hexdigest()
+    digest = hashlib.sha256()
+    for name in sorted(seen):
+        digest.update(name.encode('utf-8'))
+        digest.update(file_digest(seen[name]).encode('ascii'))
+    return digest.hexdigest()
+
+
+def cache_enabled():
+    return os.environ.get(DISABLE_ENV, '1') != '0'
+
+
+class StageCache:
+    """Stage results keyed by input hashes, script version and parameters"""
+
+    def __init__(self, root=None):
+        self.root = root or os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR
+        self.hits = 0
+        self.misses = 0
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest[2:])
+
+    def _entry_path(self, key):
+        return os.path.join(self.root, 'entries', key + '.json')
+
+    def _write_atomic(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def store_file(self, path):
+        """Add a file to the object store; return its digest"""
+        digest = file_digest(path)
+        target = self._object_path(digest)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = '{}.{}.tmp'.format(target, os.getpid())
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, target)
+        return digest
+
+    def store_bytes(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        target = self._object_path(digest)
+        if not os.path.exists(target):
+            self._write_atomic(target, data)
+        return digest
+
+    def restore_file(self, digest, path):
+        """Write object digest to path unless path already holds it"""
+        if os.path.exists(path) and file_digest(path) == digest:
+            return
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        shutil.copyfile(self._object_path(digest), tmp_path)
+        os.replace(tmp_path, path)
+
+    def stage_key(self, func, inputs, params=None, version=None):
+        """Cache key for calling func on the given input files and parameters"""
+        description = {
+            'stage': '{}.{}'.format(func.__module__, func.__qualname__),
+            'version': version or script_version(func),
+            'inputs': {name: file_digest(path) for name, path in sorted(inputs.items())},
+            'params': {name: repr(value) for name, value in sorted((params or {}).items())},
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _load_entry(self, key):
+        try:
+            with open(self._entry_path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        digests = list(entry['outputs'].values()) + [entry['result']]
+        if not all(os.path.exists(self._object_path(d)) for d in digests):
+            return None
+        return entry
+
+    def run(self, func, inputs, outputs, params=None, version=None):
+        """Call func(**inputs, **outputs, **params) unless an identical run is cached
+
+        inputs and outputs map func's parameter names to file paths. Returns
+        func's result, which is restored from the cache on a hit.
+        """
+        name = func.__name__
+        params = params or {}
+        key = self.stage_key(func, inputs, params, version)
+        entry = self._load_entry(key)
+        if entry is not None:
+            for param, path in outputs.items():
+                self.restore_file(entry['outputs'][param], path)
+            with open(self._object_path(entry['result']), 'rb') as f:
+                result = pickle.load(f)
+            self.hits += 1
+            print(f"⏭️  {name}: unchanged inputs, restored {', '.join(outputs.values())} from cache")
+            return result
+
+        self.misses += 1
+        print(f"▶️  {name}: running")
+        before = {path: _file_stamp(path) for path in outputs.values()}
+        result = func(**inputs, **outputs, **params)
+        # A stage that fails without raising can leave an earlier run's output
+        # in place; only outputs written by this call are cached
+        stale = [path for path in outputs.values() if _file_stamp(path) in (None, before[path])]
+        if stale:
+            print(f"⚠️  {name}: not caching, outputs not written {stale}")
+            return result
+
+        entry = {
+            'stage': name,
+            'outputs': {param: self.store_file(path) for param, path in outputs.items()},
+            'result': self.store_bytes(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)),
+        }
+        self._write_atomic(self._entry_path(key), json.dumps(entry, indent=2).encode('utf-8'))
+        return result
+
+
+def run_stage(func, inputs, outputs, params=None, cache=None):
+    """Run one stage through the default cache (or directly if STAGE_CACHE=0)"""
+    if not cache_enabled():
+        return func(**inputs, **outputs, **(params or {}))
+    return (cache or StageCache()).run(func, inputs, outputs, params)
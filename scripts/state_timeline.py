@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""Run-length state timelines for every location-trade series
+
+Usage: state_timeline.py <progress.csv|.pgs|.json|.delta.json|.rtf>
+                         [--as-of D] [--diff D1 D2] [--derived OUT.csv] [--time-in-state OUT.csv]
+
+A series only changes state a few times over a project's captures, so each
+(location, trade) keeps just its changes, as parallel arrays of capture-date
+indexes and state codes. State code -1 marks a capture the series is missing
+from. On top of that:
+
+  state_at        state as of any date: one binary search in the series
+  first_date      first capture in a given state: one lookup
+  snapshot        whole project as of a date: one binary search per series
+  diff            series whose state differs between two dates
+  derived_dates   start/complete dates with enhance_911_data's rules
+  time_in_state   days spent in each state
+
+Locations are keyed by locationKey for JSON, delta and RTF sources, so two
+locations sharing a name stay separate series; location_names maps each key
+back to its name for output. Progress CSVs only carry names, so there a name
+seen twice for one trade on one capture date is told apart by row order;
+that keeps both series, but exports do not list duplicates in a fixed order,
+so use the JSON when their dates matter.
+"""
+import csv
+import sys
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+from functools import lru_cache
+
+from instrument import stage
+
+MISSING = -1
+DATE_FORMATS = ('%Y/%m/%d', '%Y-%m-%d')
+
+
+def parse_date(value):
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    raise ValueError(f"Unrecognised capture date {value!r}")
+
+
+@lru_cache(maxsize=4096)
+def normalize_date(value):
+    """A capture date as the stored YYYY/MM/DD, whichever DATE_FORMATS it is in"""
+    return parse_date(value).strftime('%Y/%m/%d')
+
+
+class StateTimelines:
+    """State changes per series, keyed by (location, trade)"""
+
+    def __init__(self, dates, states):
+        self.dates = list(dates)        # sorted capture dates
+        self.states = list(states)      # state code -> state
+        self.location_names = {}        # location key -> name, where they differ
+        self.series = {}                # (location, trade) -> series index
+        self.change_dates = []          # per series: array of date indexes
+        self.change_states = []         # per series: array of state codes
+        self._first = []                # per series: {state code: first change index}
+
+    @classmethod
+    def from_observations(cls, observations):
+        """Timelines from (location, trade, capture_date, state) tuples in any order
+
+        A series seen twice on one date keeps the later observation.
+        """
+        by_series = {}
+        for location, trade, date, state in observations:
+            by_series.setdefault((location, trade), {})[date] = state
+        dates = sorted({date for history in by_series.values() for date in history})
+        states = sorted({state for history in by_series.values() for state in history.values()})
+        timelines = cls(dates, states)
+        date_index = {date: i for i, date in enumerate(dates)}
+        state_code = {state: i for i, state in enumerate(states)}
+        for series_key, history in by_series.items():
+            timelines._add_series(series_key, sorted(
+                (date_index[date], state_code[state]) for date, state in history.items()))
+        return timelines
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Timelines from progress rows (dicts with location, trade, capture_date, state)
+
+        The n-th row of a (location, trade) on one capture date (n > 1) is a
+        different location with the same name; it is keyed "location#n".
+        """
+        location_names = {}
+
+        def observations():
+            seen = {}
+            for row in rows:
+                location, trade, date = row['location'], row['trade'], row['capture_date']
+                occurrence = seen[location, trade, date] = seen.get((location, trade, date), 0) + 1
+                if occurrence > 1:
+                    location_names[location + '#' + str(occurrence)] = location
+                    location = location + '#' + str(occurrence)
+                yield location, trade, date, row['state']
+
+        timelines = cls.from_observations(observations())
+        timelines.location_names = location_names
+        return timelines
+
+    @classmethod
+    def from_dated_tables(cls, dated_tables, location_names=None):
+        """Timelines keyed by location key from (date, {locationKey: {trade: state}}) pairs"""
+        timelines = cls.from_observations(
+            (location_key, trade, date, state)
+            for date, locations in dated_tables
+            for location_key, trade_states in locations.items()
+            for trade, state in trade_states.items())
+        timelines.location_names = dict(location_names or {})
+        return timelines
+
+    def location_name(self, location):
+        return self.location_names.get(location, location)
+
+    def _add_series(self, series_key, observations):
+        """Run-length encode one series' (date index, state code) observations, in date order"""
+        change_dates = array('I')
+        change_states = array('b')
+        first = {}
+        previous_date = None
+        for date, state in observations:
+            if previous_date is not None and date > previous_date + 1 and change_states[-1] != MISSING:
+                change_dates.append(previous_date + 1)
+                change_states.append(MISSING)
+            if not change_states or change_states[-1] != state:
+                first.setdefault(state, len(change_states))
+                change_dates.append(date)
+                change_states.append(state)
+            previous_date = date
+        if previous_date is not None and previous_date + 1 < len(self.dates):
+            change_dates.append(previous_date + 1)
+            change_states.append(MISSING)
+        self.series[series_key] = len(self.change_dates)
+        self.change_dates.append(change_dates)
+        self.change_states.append(change_states)
+        self._first.append(first)
+
+    def __len__(self):
+        return len(self.series)
+
+    def change_count(self):
+        return sum(len(states) for states in self.change_states)
+
+    def _date_position(self, date):
+        """Index of the last capture on or before date, -1 if before the first"""
+        return bisect_right(self.dates, normalize_date(date)) - 1
+
+    def _code_at(self, index, position):
+        if position < 0:
+            return MISSING
+        change = bisect_right(self.change_dates[index], position) - 1
+        return self.change_states[index][change] if change >= 0 else MISSING
+
+    def state_at(self, location, trade, date):
+        """State of a series as of date (its last capture on or before it), None if unknown"""
+        index = self.series.get((location, trade))
+        if index is None:
+            return None
+        code = self._code_at(index, self._date_position(date))
+        return self.states[code] if code != MISSING else None
+
+    def first_date(self, location, trade, state):
+        """First capture date on which a series was in state, '' if never"""
+        index = self.series.get((location, trade))
+        if index is None or state not in self.states:
+            return ''
+        change = self._first[index].get(self.states.index(state))
+        return self.dates[self.change_dates[index][change]] if change is not None else ''
+
+    def history(self, location, trade):
+        """[(capture_date, state)] for each change of a series; state None while missing"""
+        index = self.series[(location, trade)]
+        return [(self.dates[date], self.states[state] if state != MISSING else None)
+                for date, state in zip(self.change_dates[index], self.change_states[index])]
+
+    def snapshot(self, date):
+        """{location: {trade: state}} as of date"""
+        position = self._date_position(date)
+        snapshot = {}
+        for (location, trade), index in self.series.items():
+            code = self._code_at(index, position)
+            if code != MISSING:
+                snapshot.setdefault(location, {})[trade] = self.states[code]
+        return snapshot
+
+    def diff(self, date_a, date_b):
+        """[(location, trade, state as of date_a, state as of date_b)] where they differ"""
+        position_a = self._date_position(date_a)
+        position_b = self._date_position(date_b)
+        changed = []
+        for (location, trade), index in self.series.items():
+            code_a = self._code_at(index, position_a)
+            code_b = self._code_at(index, position_b)
+            if code_a != code_b:
+                changed.append((location, trade,
+                                self.states[code_a] if code_a != MISSING else None,
+                                self.states[code_b] if code_b != MISSING else None))
+        return changed
+
+    def derived_dates(self, location, trade):
+        """(start_date, complete_date) with enhance_911_data's rules
+
+        Start is the first "not started" -> "in progress" transition between
+        consecutive observations; complete is the first "complete" capture.
+        """
+        index = self.series[(location, trade)]
+        start = ''
+        previous = MISSING
+        not_started = self.states.index("not started") if "not started" in self.states else None
+        in_progress = self.states.index("in progress") if "in progress" in self.states else None
+        for date, state in zip(self.change_dates[index], self.change_states[index]):
+            if state == MISSING:
+                continue
+            if previous == not_started and state == in_progress:
+                start = self.dates[date]
+                break
+            previous = state
+        return start, self.first_date(location, trade, "complete")
+
+    def time_in_state(self, location, trade, until=None):
+        """{state: days} spent in each state, the last one counted up to until (default: last capture)"""
+        index = self.series[(location, trade)]
+        end = parse_date(until or self.dates[-1])
+        change_dates = self.change_dates[index]
+        change_states = self.change_states[index]
+        days = {}
+        for i, (date, state) in enumerate(zip(change_dates, change_states)):
+            if state == MISSING:
+                continue
+            began = parse_date(self.dates[date])
+            ended = parse_date(self.dates[change_dates[i + 1]]) if i + 1 < len(change_dates) else end
+            state = self.states[state]
+            days[state] = days.get(state, 0) + max((min(ended, end) - began).days, 0)
+        return days
+
+
+def load_timelines(path):
+    """Timelines of a progress file: keyed by locationKey for JSON, delta and RTF, by name for CSV"""
+    # Imported here so the timelines themselves do not pull in the 911 readers
+    from pipeline_911 import read_source
+    from progress_store import iter_progress_rows
+
+    with stage('build timelines') as s:
+        if path.lower().endswith(('.json', '.rtf')):
+            location_names, dated_tables = read_source(path)
+            timelines = StateTimelines.from_dated_tables(dated_tables, location_names)
+        else:
+            timelines = StateTimelines.from_rows(iter_progress_rows(path))
+        s.rows_out = timelines.change_count()
+    return timelines
+
+
+def write_derived_dates(timelines, output_csv):
+    with open(output_csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['location', 'trade', 'state', 'start_date', 'complete_date'])
+        last_date = timelines.dates[-1] if timelines.dates else ''
+        for location, trade in timelines.series:
+            writer.writerow([timelines.location_name(location), trade,
+                             timelines.state_at(location, trade, last_date) or '',
+                             *timelines.derived_dates(location, trade)])
+
+
+def write_time_in_state(timelines, output_csv):
+    columns = [state for state in timelines.states]
+    with open(output_csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['location', 'trade'] + ['days ' + state for state in columns])
+        for location, trade in timelines.series:
+            days = timelines.time_in_state(location, trade)
+            writer.writerow([timelines.location_name(location), trade] + [days.get(state, 0) for state in columns])
+
+
+def _pop_option(args, flag, count=1):
+    if flag not in args:
+        return None
+    i = args.index(flag)
+    values = args[i + 1:i + 1 + count]
+    del args[i:i + 1 + count]
+    return values
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    as_of = _pop_option(args, '--as-of')
+    diff = _pop_option(args, '--diff', 2)
+    derived = _pop_option(args, '--derived')
+    time_in_state = _pop_option(args, '--time-in-state')
+    if len(args) != 1:
+        raise SystemExit(__doc__)
+
+    timelines = load_timelines(args[0])
+    print(f"📈 {len(timelines)} series, {timelines.change_count()} changes over {len(timelines.dates)} captures")
+    if as_of:
+        counts = {}
+        for trades in timelines.snapshot(as_of[0]).values():
+            for state in trades.values():
+                counts[state] = counts.get(state, 0) + 1
+        print(f"As of {as_of[0]}: {counts}")
+    if diff:
+        changed = timelines.diff(*diff)
+        print(f"{len(changed)} series changed between {diff[0]} and {diff[1]}")
+        for location, trade, before, after in changed:
+            print(f"  {timelines.location_name(location):32s} {trade:28s} {before} -> {after}")
+    if derived:
+        write_derived_dates(timelines, derived[0])
+        print(f"📁 Derived dates: {derived[0]}")
+    if time_in_state:
+        write_time_in_state(timelines, time_in_state[0])
+        print(f"📁 Time in state: {time_in_state[0]}")
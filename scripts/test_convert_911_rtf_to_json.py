@@ -0,0 +1,50 @@
+"""Chunk-boundary tests for the streaming RTF reader"""
+import json
+import unittest
+
+from convert_911_rtf_to_json import RTF_TOKEN_LOOKAHEAD, iter_rtf_json_text, iter_rtf_text
+
+RUN = 'x' * (RTF_TOKEN_LOOKAHEAD + 12)
+DOCUMENT = (
+    r"{\rtf1\ansi\ansicpg1252{\fonttbl\f0\fswiss Helvetica;}" "\n"
+    r"\f0\fs24 \cf0 \{" "\n"
+    r'"table": \{"2025/04/11": \{"CORRIDOR 108": \{"Drywall": "caf\'e9 \\\\ \}"\}\}\},' "\n"
+    r'"note": "' + RUN + r'\{' + RUN + r'\}' + RUN + r"\'e9" + RUN + r'\\\\"' "\n"
+    r"\}}"
+)
+
+
+def _split(text, offset):
+    return [text[:offset], text[offset:]]
+
+
+class SplitOffsetTest(unittest.TestCase):
+
+    def test_every_offset_around_escapes(self):
+        expected = ''.join(iter_rtf_text([DOCUMENT]))
+        expected_json = ''.join(iter_rtf_json_text([DOCUMENT]))
+        offsets = set()
+        for escape in (r'\{', r'\}', r"\'e9", '\\\\'):
+            start = DOCUMENT.find(escape)
+            while start != -1:
+                offsets.update(range(max(start - 2, 0), min(start + len(escape) + 2, len(DOCUMENT) + 1)))
+                start = DOCUMENT.find(escape, start + 1)
+        for offset in sorted(offsets):
+            with self.subTest(offset=offset):
+                self.assertEqual(''.join(iter_rtf_text(_split(DOCUMENT, offset))), expected)
+                self.assertEqual(''.join(iter_rtf_json_text(_split(DOCUMENT, offset))), expected_json)
+
+    def test_single_character_chunks(self):
+        self.assertEqual(''.join(iter_rtf_text(DOCUMENT)), ''.join(iter_rtf_text([DOCUMENT])))
+
+    def test_decoded_text(self):
+        text = ''.join(iter_rtf_json_text([DOCUMENT]))
+        self.assertTrue(text.startswith('{"table": {'))
+        self.assertTrue(text.endswith('\\\\"}'))
+        self.assertEqual(json.loads(text)['table']['2025/04/11']['CORRIDOR 108']['Drywall'], 'café \\ }')
+        self.assertIn('"café \\\\ }"', text)
+        self.assertIn(RUN + '{' + RUN + '}' + RUN + 'é' + RUN, text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""Number-list, range and scope-word cases for the location catalog"""
+import unittest
+
+from location_catalog import LocationCatalog, LocationKey, expand_numbers, parse_location_name
+from uno_schedule_mapping_generator import AREA_KINDS, UNOActivityParser
+
+NAMES = [
+    'Zone 1-MCP-1', 'Zone 1-MCP-2', 'Zone 2-MCP-6', 'Zone 3-MCP-6', 'Zone 4-MCP-7', 'Zone 4-MCP-17',
+    'Zone 1-Gen Yard-Pad6', 'Zone 2-Gen Yard-Pad6', 'Zone 2-Pad-06&7', 'Zone 3-Gen Yard-Pad7',
+    'Zone 2-Pad10-12', 'Zone 5-Pad10-12', 'Zone 1-USS 1', 'Zone 1-USS 10', 'Zone 2-USS 1',
+    'Zone 2-USS Yard-Module2', 'MYD-Tank Yard', 'DCH1-FSA-1', 'Loading Dock',
+]
+
+
+class ExpandNumbersTest(unittest.TestCase):
+
+    def test_lists_and_ranges(self):
+        self.assertEqual(expand_numbers('06&7'), (6, 7))
+        self.assertEqual(expand_numbers('4-6'), (4, 5, 6))
+        self.assertEqual(expand_numbers('1&3-5'), (1, 3, 4, 5))
+        self.assertEqual(expand_numbers('01 & 2'), (1, 2))
+        self.assertEqual(expand_numbers('9-2'), (9, 2))
+
+
+class ParseLocationNameTest(unittest.TestCase):
+
+    def test_number_list(self):
+        self.assertEqual(parse_location_name('MCP-06&7'), LocationKey('MCP', '', (6, 7)))
+        self.assertEqual(parse_location_name('Zone 3-Pad-06&7'), LocationKey('Zone 3', 'Pad', (6, 7)))
+
+    def test_range_suffix(self):
+        self.assertEqual(parse_location_name('Zone 5-Pad10-12'), LocationKey('Zone 5', 'Pad', (10, 11, 12)))
+        self.assertEqual(parse_location_name('DCH1-FSA-1'), LocationKey('DCH1', 'FSA', (1,)))
+
+    def test_single_and_unnumbered(self):
+        self.assertEqual(parse_location_name('Zone 2--USS Yard-Module14'),
+                         LocationKey('Zone 2', 'USS Yard-Module', (14,)))
+        self.assertEqual(parse_location_name('Loading Dock'), LocationKey('Loading Dock', '', ()))
+
+
+class ResolveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.catalog = LocationCatalog(NAMES, AREA_KINDS)
+        self.parser = UNOActivityParser(self.catalog)
+
+    def test_numbers_are_exact(self):
+        self.assertEqual(self.catalog.resolve('Zone 1', 'USS', [1]), ('Zone 1-USS 1',))
+        self.assertEqual(self.catalog.resolve('MYD1', 'MCP', [1]), ('Zone 1-MCP-1',))
+
+    def test_areas_are_zone_scoped(self):
+        self.assertEqual(self.catalog.resolve('EYD1', 'USS', [1]), ('Zone 1-USS 1',))
+        self.assertEqual(self.catalog.resolve('EYD2', 'USS', [1]), ('Zone 2-USS 1',))
+        self.assertEqual(self.catalog.resolve('EYD1', 'Pad', [6]), ('Zone 1-Gen Yard-Pad6',))
+        self.assertEqual(self.catalog.resolve('MYD1', 'MCP', [7]), ())
+        self.assertEqual(self.catalog.resolve('MYD2', 'MCP', [1]), ())
+
+    def test_listed_location_resolves_each_number(self):
+        self.assertIn('Zone 2-Pad-06&7', self.catalog.resolve('EYD2', 'Pad', [6]))
+        self.assertIn('Zone 2-Pad-06&7', self.catalog.resolve('EYD2', 'Pad', [7]))
+        self.assertEqual(self.catalog.resolve('EYD2', 'Pad', [11]), ('Zone 2-Pad10-12',))
+
+    def test_schedule_mcp_list(self):
+        parsed = self.parser._parse_name('MYD1-Pour Equipment Base Pad-MCP-06&7 (PH 4)', 'Concrete Pour')
+        self.assertEqual(parsed['parsed_pad_numbers'], (6, 7))
+        self.assertEqual(parsed['matched_physical_locations'], ('Zone 2-MCP-6',))
+
+    def test_schedule_pad_list(self):
+        parsed = self.parser._parse_name('EYD2-Backfill Pad-06&7', 'Backfill')
+        self.assertEqual(parsed['parsed_pad_numbers'], (6, 7))
+        self.assertEqual(parsed['matched_physical_locations'], ('Zone 2-Gen Yard-Pad6', 'Zone 2-Pad-06&7'))
+
+    def test_schedule_range(self):
+        parsed = self.parser._parse_name('MYD1-Backfill Pad-MCP01-02', 'Backfill')
+        self.assertEqual(parsed['matched_physical_locations'], ('Zone 1-MCP-1', 'Zone 1-MCP-2'))
+
+    def test_scope_in_catalog_order(self):
+        self.assertEqual(self.catalog.resolve('MYD1'),
+                         ('MYD-Tank Yard', 'Zone 1-MCP-1', 'Zone 1-MCP-2', 'Zone 2-MCP-6'))
+
+    def test_dch_covers_its_zone_uss(self):
+        self.assertEqual(self.catalog.resolve('DCH2'), ('Zone 2-USS 1', 'Zone 2-USS Yard-Module2'))
+        self.assertEqual(self.catalog.resolve('DCH1'), ('DCH1-FSA-1',))
+        self.assertEqual(LocationCatalog(NAMES[:-2], AREA_KINDS).resolve('DCH1'), ('Zone 1-USS 1', 'Zone 1-USS 10'))
+
+
+if __name__ == '__main__':
+    unittest.main()
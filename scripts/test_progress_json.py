@@ -0,0 +1,48 @@
+"""Chunk-boundary tests for the streaming progress JSON scanner"""
+import json
+import os
+import tempfile
+import unittest
+
+from progress_json import iter_table_dates, scan_progress_json
+
+DOCUMENT = {
+    'table': {
+        '2025/04/11': {'L1': {'Drywall': 'complete'}, 'L2': {'Paint': 'started'}},
+        '2025/04/18': {'L1': {'Drywall': 'complete'}, 'L2': {'Paint': 'complete'}},
+    },
+    'locationKeyToName': {'L1': 'CORRIDOR \\ 108', 'L2': 'ROOM "B" \\"2\\"'},
+    'trades': ['Drywall', 'Paint'],
+    'notes': 'skipped \\" value',
+}
+
+
+class ChunkSizeTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(DOCUMENT, f)
+        with open(self.path, 'rb') as f:
+            self.size = len(f.read())
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_every_chunk_size(self):
+        expected_metadata = {key: DOCUMENT[key] for key in ('locationKeyToName', 'trades')}
+        for chunk_size in range(1, self.size + 1):
+            with self.subTest(chunk_size=chunk_size):
+                metadata, spans = scan_progress_json(self.path, chunk_size=chunk_size)
+                self.assertEqual(metadata, expected_metadata)
+                self.assertEqual(dict(iter_table_dates(self.path, spans)), DOCUMENT['table'])
+
+    def test_every_key_kept(self):
+        for chunk_size in range(1, self.size + 1):
+            with self.subTest(chunk_size=chunk_size):
+                metadata, _ = scan_progress_json(self.path, keep_keys=None, chunk_size=chunk_size)
+                self.assertEqual(metadata['notes'], DOCUMENT['notes'])
+
+
+if __name__ == '__main__':
+    unittest.main()
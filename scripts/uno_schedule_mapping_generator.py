@@ -6,95 +6,143 @@ Matches schedule items to actual UNO construction data
 """
 
 import csv
+import os
+import sys
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 from io import StringIO
 from datetime import datetime
+from functools import lru_cache
 import re
 
+from instrument import stage
+from location_catalog import NUMBER_LIST, LocationCatalog, expand_numbers, load_location_catalog
+from progress_store import iter_progress_rows
+
+# Schedule areas and the (zones, location kinds) they cover when they are not
+# zones in the progress data (see location_catalog); everything else comes
+# from the data
+AREA_KINDS = {
+    # Data halls: their USS lineups, unless the data has DCH1/DCH2 zones
+    'DCH1': (('Zone 1',), ('USS',)),
+    'DCH2': (('Zone 2',), ('USS',)),
+    # Electrical yards: generator pads and USS modules
+    'EYD1': (('Zone 1',), ('Pad', 'USS')),
+    'EYD2': (('Zone 2',), ('Pad', 'USS')),
+    # Mechanical yard: MCP pads and the tank yard
+    'MYD1': (('Zone 1', 'Zone 2', 'MYD'), ('MCP', 'Tank')),
+    'MYD2': (('Zone 2', 'MYD'), ('MCP', 'Tank')),
+}
+
+# Location prefixes in priority order: (literal that must appear, pattern or None
+# for the literal itself, location kind the prefix implies)
+LOCATION_PREFIX_GRAMMAR = (
+    ('DCH', re.compile(r'(DCH\d+)-'), ''),   # DCH1, DCH2
+    ('MYD', re.compile(r'(MYD\d+)-'), ''),   # MYD1
+    ('EYD', re.compile(r'(EYD\d+)-'), ''),   # EYD1, EYD2
+    ('Zone-', re.compile(r'(Zone-\d+)'), 'Conveyance'),  # Zone-01, Zone-02
+    ('FSA', None, ''),                  # Facility Support Area
+    ('GPS', None, ''),
+    ('Loading Dock', None, ''),
+    ('Booster Pump System', None, ''),
+    ('Fire Pump House', None, ''),
+    ('DWTR', None, ''),
+)
+
+# Numbered pads/equipment: (literal that must appear, pattern, location kind);
+# the group is a number list, expanded with expand_numbers
+LOCATION_NUMBER_GRAMMAR = (
+    ('MCP', re.compile(r'MCP-?(' + NUMBER_LIST + ')'), 'MCP'),  # MCP01&2, MCP-04, MCP-06&7
+    ('Pad-', re.compile(r'Pad-(' + NUMBER_LIST + ')'), 'Pad'),  # Pad-06, Pad-06&7
+    ('USS', re.compile(r'USS[ -](' + NUMBER_LIST + ')'), 'USS'),  # USS 01, USS-01, USS 01-03
+)
+
+# Trade mapping patterns
+TRADE_PATTERNS = {
+    'mep': ('Plumbing', 'Electrical', 'Mechanical', 'Fire'),
+    'mepf': ('Plumbing', 'Electrical', 'Mechanical', 'Fire'),
+    'electrical': ('Electrical',),
+    'plumbing': ('Plumbing',),
+    'mechanical': ('Mechanical',),
+    'fire': ('Fire',),
+    'concrete': ('Concrete Formwork', 'Concrete Rebar', 'Concrete Pour'),
+    'roofing': ('Roofing Flashing', 'Roofing Insulation', 'Roofing Membrane', 'Roofing Metal Deck'),
+    'structural': ('Structural Steel',),
+    'conveyance': ('Conveyance',)
+}
+# Multi-trade keywords in priority order ('mep' also covers 'mepf')
+TRADE_KEYWORDS = ('mep', 'electrical', 'plumbing', 'mechanical', 'concrete', 'roofing', 'structural', 'conveyance')
+
+# Phase keywords
+PHASE_KEYWORDS = {
+    'rough': 'Rough-in Phase',
+    'finish': 'Finish Phase',
+    'trim': 'Trim Out Phase',
+    'oh': 'Overhead Work',
+    'final': 'Final Phase'
+}
+
+# Exclude patterns (inspections, milestones)
+EXCLUDE_PATTERNS = ('inspection', 'commissioning', 'testing', 'milestone', 'handover')
+EXCLUDE_GRAMMAR = re.compile('|'.join(map(re.escape, EXCLUDE_PATTERNS)))
+
+# Parses kept per parser, keyed on (name, trade)
+PARSE_CACHE_SIZE = 8192
+# Longest n-gram ActualDataIndex indexes names by
+NGRAM = 3
+
+def extract_location_prefix(name):
+    """(location prefix, implied location kind) of an activity name, ('', '') if none"""
+    for literal, pattern, kind in LOCATION_PREFIX_GRAMMAR:
+        if literal not in name:
+            continue
+        if pattern is None:
+            return literal, kind
+        match = pattern.search(name)
+        if match:
+            return match.group(1), kind
+    
+    return '', ''
+
 class UNOActivityParser:
-    """Intelligent parser for UNO construction activity names"""
+    """Intelligent parser for UNO construction activity names
+
+    The grammar above is compiled once at import. Schedules repeat the same
+    names many times, so results are memoized per (name, trade) in a
+    bounded LRU cache; matched locations are shared tuples.
+
+    Physical locations come from `catalog`, a LocationCatalog built from the
+    project's own location names; without one nothing is matched.
+    """
     
-    def __init__(self):
-        # Location hierarchy mapping - updated to match actual UNO data structure
-        self.location_hierarchy = {
-            'DCH1': {
-                'type': 'Data Centre Hall Zone 1',
-                'locations': ['Zone 1-USS 1', 'Zone 1-USS 2', 'Zone 1-USS 3', 'Zone 1-USS 4', 'Zone 1-USS 5', 'Zone 1-USS 6', 'Zone 1-USS 7', 'Zone 1-USS 8'],
-                'description': 'Left section of building'
-            },
-            'DCH2': {
-                'type': 'Data Centre Hall Zone 2', 
-                'locations': ['Zone 2-USS 1', 'Zone 2-USS 2', 'Zone 2-USS 3', 'Zone 2-USS 4', 'Zone 2-USS 5', 'Zone 2-USS 6'],
-                'description': 'Right section of building'
-            },
-            'EYD1': {
-                'type': 'Electrical Yard Zone 1',
-                'gen_yard': {
-                    'locations': ['Zone 1-Gen Yard-Pad1', 'Zone 1-Gen Yard-Pad2', 'Zone 1-Gen Yard-Pad3', 'Zone 1-Gen Yard-Pad4', 'Zone 1-Gen Yard-Pad5', 'Zone 1-Gen Yard-Pad6', 'Zone 1-Gen Yard-Pad7', 'Zone 1-Gen Yard-Pad8', 'Zone 1-Gen Yard-Pad9']
-                },
-                'uss_yard': {
-                    'locations': ['Zone 1-USS 1', 'Zone 1-USS 2', 'Zone 1-USS 3', 'Zone 1-USS 4', 'Zone 1-USS 5', 'Zone 1-USS 6', 'Zone 1-USS 7', 'Zone 1-USS 8', 'Zone 1-USS 9', 'Zone 1-USS 10', 'Zone 1-USS 11', 'Zone 1-USS 12', 'Zone 1-USS 13', 'Zone 1-USS 14', 'Zone 1-USS 15', 'Zone 1-USS 16', 'Zone 1-USS 17', 'Zone 1-USS 18', 'Zone 1-USS 19', 'Zone 1-USS 20', 'Zone 1-USS 21', 'Zone 1-USS 22', 'Zone 1-USS 23', 'Zone 1-USS 24', 'Zone 1-USS 25', 'Zone 1-USS 26']
-                }
-            },
-            'EYD2': {
-                'type': 'Electrical Yard Zone 2',
-                'gen_yard': {
-                    'locations': ['Zone 2-Gen Yard-Pad1', 'Zone 2-Gen Yard-Pad2', 'Zone 2-Gen Yard-Pad3', 'Zone 2-Gen Yard-Pad4', 'Zone 2-Gen Yard-Pad5', 'Zone 2-Gen Yard-Pad6', 'Zone 2-Gen Yard-Pad7', 'Zone 2-Gen Yard-Pad8', 'Zone 2-Gen Yard-Pad9']
-                },
-                'uss_yard': {
-                    'locations': ['Zone 2-USS 1', 'Zone 2-USS 2', 'Zone 2-USS 3', 'Zone 2-USS 4', 'Zone 2-USS 5', 'Zone 2-USS 6', 'Zone 2-USS 7', 'Zone 2-USS 8', 'Zone 2-USS 9', 'Zone 2-USS 10', 'Zone 2-USS 11', 'Zone 2-USS 12', 'Zone 2-USS 13', 'Zone 2-USS 14', 'Zone 2-USS 15', 'Zone 2-USS 16', 'Zone 2-USS 17', 'Zone 2-USS 18', 'Zone 2-USS 19', 'Zone 2-USS 20', 'Zone 2-USS 21', 'Zone 2-USS 22', 'Zone 2-USS 23', 'Zone 2-USS 24', 'Zone 2-USS 25', 'Zone 2-USS 26']
-                }
-            },
-            'MYD1': {
-                'type': 'Mechanical Yard Zone 1',
-                'mcp1': {
-                    'locations': ['Zone 1-MCP-1', 'Zone 1-MCP-2', 'Zone 1-MCP-3', 'Zone 1-MCP-4']
-                },
-                'mcp2': {
-                    'locations': ['Zone 2-MCP-1', 'Zone 2-MCP-2', 'Zone 2-MCP-3']
-                }
-            }
-        }
-        
-        # Trade mapping patterns
-        self.trade_patterns = {
-            'mep': ['Plumbing', 'Electrical', 'Mechanical', 'Fire'],
-            'mepf': ['Plumbing', 'Electrical', 'Mechanical', 'Fire'],
-            'electrical': ['Electrical'],
-            'plumbing': ['Plumbing'],
-            'mechanical': ['Mechanical'],
-            'fire': ['Fire'],
-            'concrete': ['Concrete Formwork', 'Concrete Rebar', 'Concrete Pour'],
-            'roofing': ['Roofing Flashing', 'Roofing Insulation', 'Roofing Membrane', 'Roofing Metal Deck'],
-            'structural': ['Structural Steel'],
-            'conveyance': ['Conveyance']
-        }
-        
-        # Phase keywords
-        self.phase_keywords = {
-            'rough': 'Rough-in Phase',
-            'finish': 'Finish Phase', 
-            'trim': 'Trim Out Phase',
-            'oh': 'Overhead Work',
-            'final': 'Final Phase'
-        }
-        
-        # Exclude patterns (inspections, milestones)
-        self.exclude_patterns = [
-            'inspection', 'commissioning', 'testing', 'milestone', 'handover'
-        ]
+    def __init__(self, catalog=None, cache_size=PARSE_CACHE_SIZE):
+        self.catalog = catalog if catalog is not None else LocationCatalog((), AREA_KINDS)
+        self.trade_patterns = TRADE_PATTERNS
+        self.phase_keywords = PHASE_KEYWORDS
+        self.exclude_patterns = EXCLUDE_PATTERNS
+        self._parse_name = lru_cache(maxsize=cache_size)(self._parse_name_uncached)
 
     def parse_activity(self, activity_id, name, location, trade):
         """Parse activity name to extract location and trade information"""
+        # Cached results only hold immutable values, so a shallow copy is enough
+        result = self._parse_name(name, trade).copy()
+        result['activity_id'] = activity_id
+        result['schedule_location'] = location
+        return result
+
+    def _parse_name_uncached(self, name, trade):
+        """Parse result for a (name, trade) pair, with activity_id and schedule_location left blank"""
         
         # Check if should be excluded
         if self._should_exclude(name):
-            return self._create_excluded_result(activity_id, name, location, trade)
+            return self._create_excluded_result('', name, '', trade)
         
         # Extract location prefix from activity name
-        location_prefix = self._extract_location_prefix(name)
+        location_prefix, prefix_kind = self._extract_location_prefix(name)
         
-        # Parse pad/equipment numbers
-        pad_numbers = self._extract_pad_numbers(name)
+        # Parse numbered pads/equipment as (kind, number) references
+        location_refs = self._extract_location_refs(name)
+        pad_numbers = sorted({number for _, number in location_refs})
         
         # Extract work phase
         work_phase = self._extract_work_phase(name)
@@ -103,20 +151,20 @@ class UNOActivityParser:
         trade_components = self._parse_trade_components(name, trade)
         
         # Get matched physical locations
-        matched_locations = self._get_matched_locations(location_prefix, pad_numbers, name)
+        matched_locations = self._get_matched_locations(location_prefix, prefix_kind, location_refs)
         
         # Calculate confidence score
         confidence_score = self._calculate_confidence(location_prefix, matched_locations, trade_components)
         
         return {
-            'activity_id': activity_id,
+            'activity_id': '',
             'activity_name': name,
-            'schedule_location': location,
+            'schedule_location': '',
             'schedule_trade': trade,
             'parsed_location_prefix': location_prefix,
-            'parsed_pad_numbers': pad_numbers,
+            'parsed_pad_numbers': tuple(pad_numbers),
             'parsed_work_phase': work_phase,
-            'trade_components': trade_components,
+            'trade_components': tuple(trade_components),
             'matched_physical_locations': matched_locations,
             'confidence_score': confidence_score,
             'is_excluded': False
@@ -124,8 +172,7 @@ class UNOActivityParser:
 
     def _should_exclude(self, name):
         """Check if activity should be excluded from physical tracking"""
-        name_lower = name.lower()
-        return any(pattern in name_lower for pattern in self.exclude_patterns)
+        return EXCLUDE_GRAMMAR.search(name.lower()) is not None
 
     def _create_excluded_result(self, activity_id, name, location, trade):
         """Create result for excluded activities"""
@@ -135,75 +182,35 @@ class UNOActivityParser:
             'schedule_location': location,
             'schedule_trade': trade,
             'parsed_location_prefix': '',
-            'parsed_pad_numbers': [],
+            'parsed_pad_numbers': (),
             'parsed_work_phase': 'Excluded',
-            'trade_components': [],
-            'matched_physical_locations': [],
+            'trade_components': (),
+            'matched_physical_locations': (),
             'confidence_score': 'EXCLUDED',
             'is_excluded': True
         }
 
     def _extract_location_prefix(self, name):
-        """Extract location prefix from activity name"""
-        # Look for patterns like DCH1-, MYD1-, EYD1-, Zone-01
-        patterns = [
-            r'(DCH\d+)-',  # DCH1, DCH2
-            r'(MYD\d+)-',  # MYD1
-            r'(EYD\d+)-',  # EYD1, EYD2
-            r'(Zone-\d+)',  # Zone-01, Zone-02
-            r'(FSA)',       # Facility Support Area
-            r'(GPS)',       # GPS
-            r'(Loading Dock)',  # Loading Dock
-            r'(Booster Pump System)',  # Booster Pump System
-            r'(Fire Pump House)',  # Fire Pump House
-            r'(DWTR)',      # DWTR
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, name)
-            if match:
-                return match.group(1)
-        
-        return ''
-
-    def _extract_pad_numbers(self, name):
-        """Extract pad numbers from activity name"""
-        pad_numbers = []
-        
-        # Look for MCP pad patterns
-        mcp_patterns = [
-            r'MCP(\d+)&(\d+)',  # MCP01&2
-            r'MCP-(\d+)',        # MCP-04
-            r'Pad-(\d+)&(\d+)',  # Pad-06&7
-            r'Pad-(\d+)',        # Pad-06
-        ]
-        
-        for pattern in mcp_patterns:
-            matches = re.findall(pattern, name)
-            for match in matches:
-                if len(match) == 2:
-                    pad_numbers.extend([int(match[0]), int(match[1])])
-                else:
-                    pad_numbers.append(int(match[0]))
-        
-        # Look for USS module patterns
-        uss_patterns = [
-            r'USS (\d+)',        # USS 01
-            r'USS-(\d+)',        # USS-01
-        ]
-        
-        for pattern in uss_patterns:
-            matches = re.findall(pattern, name)
-            for match in matches:
-                pad_numbers.append(int(match))
-        
-        return sorted(list(set(pad_numbers)))
+        """Extract (location prefix, implied location kind) from activity name"""
+        return extract_location_prefix(name)
+
+    def _extract_location_refs(self, name):
+        """Extract (kind, number) pad/equipment references from activity name"""
+        refs = []
+        
+        for literal, pattern, kind in LOCATION_NUMBER_GRAMMAR:
+            if literal not in name:
+                continue
+            for numbers in pattern.findall(name):
+                refs.extend((kind, number) for number in expand_numbers(numbers))
+        
+        return tuple(dict.fromkeys(refs))
 
     def _extract_work_phase(self, name):
         """Extract work phase from activity name"""
         name_lower = name.lower()
         
-        for keyword, phase in self.phase_keywords.items():
+        for keyword, phase in PHASE_KEYWORDS.items():
             if keyword in name_lower:
                 return phase
         
@@ -211,107 +218,33 @@ class UNOActivityParser:
 
     def _parse_trade_components(self, name, trade):
         """Parse trade components from activity name and trade field"""
-        components = []
         
         # Check if it's a multi-trade activity
         name_lower = name.lower()
         
-        if 'mepf' in name_lower or 'mep' in name_lower:
-            components.extend(self.trade_patterns.get('mep', []))
-        elif 'electrical' in name_lower:
-            components.extend(self.trade_patterns.get('electrical', []))
-        elif 'plumbing' in name_lower:
-            components.extend(self.trade_patterns.get('plumbing', []))
-        elif 'mechanical' in name_lower:
-            components.extend(self.trade_patterns.get('mechanical', []))
-        elif 'concrete' in name_lower:
-            components.extend(self.trade_patterns.get('concrete', []))
-        elif 'roofing' in name_lower:
-            components.extend(self.trade_patterns.get('roofing', []))
-        elif 'structural' in name_lower:
-            components.extend(self.trade_patterns.get('structural', []))
-        elif 'conveyance' in name_lower:
-            components.extend(self.trade_patterns.get('conveyance', []))
-        else:
-            # Use the trade field from schedule
-            components.append(trade)
+        for keyword in TRADE_KEYWORDS:
+            if keyword in name_lower:
+                return TRADE_PATTERNS[keyword]
         
-        return components
+        # Use the trade field from schedule
+        return (trade,) if trade else ()
 
-    def _get_matched_locations(self, location_prefix, pad_numbers, name):
-        """Get matched physical locations based on parsed information"""
-        locations = []
-        
+    def _get_matched_locations(self, location_prefix, prefix_kind, location_refs):
+        """Get matched physical locations from the catalog"""
         if not location_prefix:
-            return locations
-        
-        # Handle different location types
-        if location_prefix.startswith('DCH'):
-            if location_prefix == 'DCH1':
-                locations.extend(self.location_hierarchy['DCH1']['locations'])
-            elif location_prefix == 'DCH2':
-                locations.extend(self.location_hierarchy['DCH2']['locations'])
-        
-        elif location_prefix.startswith('EYD'):
-            if location_prefix == 'EYD1':
-                # Add all EYD1 locations
-                locations.extend(self.location_hierarchy['EYD1']['gen_yard']['locations'])
-                locations.extend(self.location_hierarchy['EYD1']['uss_yard']['locations'])
-            elif location_prefix == 'EYD2':
-                # Add all EYD2 locations
-                locations.extend(self.location_hierarchy['EYD2']['gen_yard']['locations'])
-                locations.extend(self.location_hierarchy['EYD2']['uss_yard']['locations'])
-        
-        elif location_prefix.startswith('MYD'):
-            if location_prefix == 'MYD1':
-                # Add all MCP locations
-                locations.extend(self.location_hierarchy['MYD1']['mcp1']['locations'])
-                locations.extend(self.location_hierarchy['MYD1']['mcp2']['locations'])
-        
-        elif location_prefix.startswith('Zone-'):
-            # Conveyance zones
-            zone_num = location_prefix.split('-')[1]
-            locations.append(f'Zone {zone_num}-Conveyance {zone_num}')
-        
-        elif location_prefix in ['FSA', 'GPS', 'Loading Dock', 'Booster Pump System', 'Fire Pump House', 'DWTR']:
-            # Single location items
-            locations.append(location_prefix)
-        
-        # Add support for actual UNO location patterns
-        if not locations:
-            # Try to match based on actual data patterns
-            if 'DCH' in name or 'Data Centre' in name:
-                if '1' in name or 'Zone 1' in name:
-                    locations.extend(['Zone 1-USS 1', 'Zone 1-USS 2', 'Zone 1-USS 3', 'Zone 1-USS 4', 'Zone 1-USS 5', 'Zone 1-USS 6', 'Zone 1-USS 7', 'Zone 1-USS 8'])
-                elif '2' in name or 'Zone 2' in name:
-                    locations.extend(['Zone 2-USS 1', 'Zone 2-USS 2', 'Zone 2-USS 3', 'Zone 2-USS 4', 'Zone 2-USS 5', 'Zone 2-USS 6'])
-            elif 'EYD' in name or 'Electrical Yard' in name:
-                if '1' in name or 'Zone 1' in name:
-                    locations.extend(['Zone 1-Gen Yard-Pad1', 'Zone 1-Gen Yard-Pad2', 'Zone 1-Gen Yard-Pad3', 'Zone 1-Gen Yard-Pad4', 'Zone 1-Gen Yard-Pad5', 'Zone 1-Gen Yard-Pad6', 'Zone 1-Gen Yard-Pad7', 'Zone 1-Gen Yard-Pad8', 'Zone 1-Gen Yard-Pad9'])
-                    locations.extend(['Zone 1-USS 1', 'Zone 1-USS 2', 'Zone 1-USS 3', 'Zone 1-USS 4', 'Zone 1-USS 5', 'Zone 1-USS 6', 'Zone 1-USS 7', 'Zone 1-USS 8', 'Zone 1-USS 9', 'Zone 1-USS 10', 'Zone 1-USS 11', 'Zone 1-USS 12', 'Zone 1-USS 13', 'Zone 1-USS 14', 'Zone 1-USS 15', 'Zone 1-USS 16', 'Zone 1-USS 17', 'Zone 1-USS 18', 'Zone 1-USS 19', 'Zone 1-USS 20', 'Zone 1-USS 21', 'Zone 1-USS 22', 'Zone 1-USS 23', 'Zone 1-USS 24', 'Zone 1-USS 25', 'Zone 1-USS 26'])
-                elif '2' in name or 'Zone 2' in name:
-                    locations.extend(['Zone 2-Gen Yard-Pad1', 'Zone 2-Gen Yard-Pad2', 'Zone 2-Gen Yard-Pad3', 'Zone 2-Gen Yard-Pad4', 'Zone 2-Gen Yard-Pad5', 'Zone 2-Gen Yard-Pad6', 'Zone 2-Gen Yard-Pad7', 'Zone 2-Gen Yard-Pad8', 'Zone 2-Gen Yard-Pad9'])
-                    locations.extend(['Zone 2-USS 1', 'Zone 2-USS 2', 'Zone 2-USS 3', 'Zone 2-USS 4', 'Zone 2-USS 5', 'Zone 2-USS 6', 'Zone 2-USS 7', 'Zone 2-USS 8', 'Zone 2-USS 9', 'Zone 2-USS 10', 'Zone 2-USS 11', 'Zone 2-USS 12', 'Zone 2-USS 13', 'Zone 2-USS 14', 'Zone 2-USS 15', 'Zone 2-USS 16', 'Zone 2-USS 17', 'Zone 2-USS 18', 'Zone 2-USS 19', 'Zone 2-USS 20', 'Zone 2-USS 21', 'Zone 2-USS 22', 'Zone 2-USS 23', 'Zone 2-USS 24', 'Zone 2-USS 25', 'Zone 2-USS 26'])
-            elif 'MYD' in name or 'Mechanical Yard' in name:
-                if '1' in name or 'Zone 1' in name:
-                    locations.extend(['Zone 1-MCP-1', 'Zone 1-MCP-2', 'Zone 1-MCP-3', 'Zone 1-MCP-4'])
-                elif '2' in name or 'Zone 2' in name:
-                    locations.extend(['Zone 2-MCP-1', 'Zone 2-MCP-2', 'Zone 2-MCP-3'])
-            elif 'Conveyance' in name:
-                # Handle conveyance zones
-                for i in range(1, 9):  # Zones 1-8
-                    locations.append(f'Zone {i}-Conveyance {i}')
-        
-        # Filter by specific pad numbers if provided
-        if pad_numbers:
-            filtered_locations = []
-            for location in locations:
-                for pad_num in pad_numbers:
-                    if str(pad_num) in location:
-                        filtered_locations.append(location)
-            locations = filtered_locations
-        
-        return locations
+            return ()
+        
+        if not location_refs:
+            return self.catalog.resolve(location_prefix, prefix_kind)
+        
+        # One catalog lookup per (kind, number), grouped by kind
+        numbers_by_kind = defaultdict(list)
+        for kind, number in location_refs:
+            numbers_by_kind[kind].append(number)
+        locations = []
+        for kind, numbers in numbers_by_kind.items():
+            locations.extend(self.catalog.resolve(location_prefix, kind, sorted(numbers)))
+        return tuple(dict.fromkeys(locations))
 
     def _calculate_confidence(self, location_prefix, matched_locations, trade_components):
         """Calculate confidence score for the mapping"""
@@ -329,14 +262,101 @@ class UNOActivityParser:
         
         return 'HIGH'
 
-def load_actual_uno_data():
-    """Load actual UNO construction data to analyze what's being tracked"""
+class ActualDataIndex:
+    """Inverted location/trade index over the actual UNO construction data
+
+    Matching in `_analyze_actual_data_match` is a case-insensitive substring
+    test in either direction, and only the distinct names that match matter.
+    Distinct names are indexed exactly and by their short n-grams, so a
+    lookup confirms `in` on the names sharing the query's rarest n-gram and
+    looks up the query's slices of each name length, instead of walking
+    every row of the actual data.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.location_rows = defaultdict(list)
+        self.trade_rows = defaultdict(list)
+        for i, row in enumerate(rows):
+            self.location_rows[row['location']].append(i)
+            self.trade_rows[row['trade']].append(i)
+        self._locations = self._build_name_index(self.location_rows)
+        self._trades = self._build_name_index(self.trade_rows)
+        self._location_matches = {}
+        self._trade_matches = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def location_catalog(self):
+        """LocationCatalog of the distinct locations in the actual data"""
+        return LocationCatalog(self.location_rows, AREA_KINDS)
+
+    @staticmethod
+    def _build_name_index(names):
+        """Index lowercase names exactly, by length, and by their 1- to NGRAM-character n-grams"""
+        exact = defaultdict(set)
+        grams = defaultdict(set)
+        for name in names:
+            lower = name.lower()
+            exact[lower].add(name)
+            for n in range(1, NGRAM + 1):
+                for i in range(len(lower) - n + 1):
+                    grams[lower[i:i + n]].add(lower)
+        return {'exact': exact, 'grams': grams, 'lengths': sorted({len(lower) for lower in exact}), 'all': set(names)}
+
+    @staticmethod
+    def _lookup(index, query):
+        """Original names N where query.lower() in N.lower() or N.lower() in query.lower()"""
+        query = query.lower()
+        if not query:
+            return set(index['all'])
+        exact = index['exact']
+        grams = index['grams']
+        # Names containing the query: the rarest of its n-grams, confirmed with `in`
+        if len(query) <= NGRAM:
+            candidates = grams.get(query, ())
+        else:
+            candidates = min((grams.get(query[i:i + NGRAM], ()) for i in range(len(query) - NGRAM + 1)), key=len)
+        found = set()
+        for lower in candidates:
+            if query in lower:
+                found.update(exact[lower])
+        # Names contained in the query: one exact lookup per name length and position
+        for length in index['lengths']:
+            for i in range(len(query) - length + 1):
+                names = exact.get(query[i:i + length])
+                if names:
+                    found.update(names)
+        return found
+
+    def match_locations(self, parsed_locations):
+        """Distinct actual location names matching any parsed location"""
+        # Parses share their location tuples, so most lookups repeat
+        found = self._location_matches.get(parsed_locations)
+        if found is None:
+            found = set()
+            for parsed_location in parsed_locations:
+                found.update(self._lookup(self._locations, parsed_location))
+            self._location_matches[parsed_locations] = found
+        return found
+
+    def match_trades(self, trade_components):
+        """Distinct actual trade names matching any trade component"""
+        found = self._trade_matches.get(trade_components)
+        if found is None:
+            found = set()
+            for trade_component in trade_components:
+                found.update(self._lookup(self._trades, trade_component))
+            self._trade_matches[trade_components] = found
+        return found
+
+def load_actual_uno_data(actual_csv='UNO_construction_data_fixed.csv'):
+    """Load actual UNO construction data and index it by location and trade"""
     try:
-        with open('UNO_construction_data_fixed.csv', 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            data = list(reader)
+        data = list(iter_progress_rows(actual_csv))
         
-        print(f"✅ Loaded {len(data)} rows from UNO_construction_data_fixed.csv")
+        print(f"✅ Loaded {len(data)} rows from {actual_csv}")
         
         # Analyze the data structure
         unique_locations = set(row['location'] for row in data)
@@ -352,15 +372,37 @@ def load_actual_uno_data():
         for i, row in enumerate(data[:5]):
             print(f"  {i+1}. {row['location']} | {row['trade']} | {row['state']} | {row['section']}")
         
-        return data
+        return ActualDataIndex(data)
         
     except FileNotFoundError:
-        print("❌ UNO_construction_data_fixed.csv not found!")
+        print(f"❌ {actual_csv} not found!")
         return []
     except Exception as e:
         print(f"❌ Error loading data: {e}")
         return []
 
+MAPPING_FIELDNAMES = [
+    'Activity_ID',
+    'Activity_Name', 
+    'Schedule_Location',
+    'Schedule_Trade',
+    'Schedule_Start',
+    'Schedule_Finish',
+    'Parsed_Location_Prefix',
+    'Parsed_Pad_Numbers',
+    'Parsed_Work_Phase',
+    'Trade_Components',
+    'Matched_Physical_Locations',
+    'Number_of_Locations',
+    'Confidence_Score',
+    'Progress_Formula',
+    'Is_Excluded',
+    'Mapping_Notes',
+    'Actual_Data_Match_Quality',
+    'Actual_Locations_Found',
+    'Actual_Trades_Found'
+]
+
 def generate_uno_schedule_mapping_csv():
     """Generate comprehensive CSV mapping between UNO schedule and actualised work"""
     
@@ -413,73 +455,156 @@ def generate_uno_schedule_mapping_csv():
         ("CON-3420", "DCH2-Backfill/Fine Grade & Touch Up (West to East)", "DCH", "Backfill", "2025-06-18", "2025-07-07"),
     ]
     
-    # Initialize parser
-    parser = UNOActivityParser()
+    # Initialize parser with the locations found in the actual data
+    parser = UNOActivityParser(actual_data.location_catalog())
     
     # Create CSV in memory
     output = StringIO()
-    fieldnames = [
-        'Activity_ID',
-        'Activity_Name', 
-        'Schedule_Location',
-        'Schedule_Trade',
-        'Schedule_Start',
-        'Schedule_Finish',
-        'Parsed_Location_Prefix',
-        'Parsed_Pad_Numbers',
-        'Parsed_Work_Phase',
-        'Trade_Components',
-        'Matched_Physical_Locations',
-        'Number_of_Locations',
-        'Confidence_Score',
-        'Progress_Formula',
-        'Is_Excluded',
-        'Mapping_Notes',
-        'Actual_Data_Match_Quality',
-        'Actual_Locations_Found',
-        'Actual_Trades_Found'
-    ]
-    
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
+    writer = csv.DictWriter(output, fieldnames=MAPPING_FIELDNAMES)
     writer.writeheader()
     
     # Process each schedule item
     for activity_id, name, location, trade, start, finish in schedule_data:
         # Parse the activity
         parsed = parser.parse_activity(activity_id, name, location, trade)
+        writer.writerow(_build_mapping_row(parsed, start, finish, actual_data))
+    
+    return output.getvalue()
+
+def read_schedule_csv(schedule_csv):
+    """Stream activities from a schedule export such as UNO3A-MO-250814.csv
+
+    Yields (activity_id, name, location, trade, start, finish) tuples in the
+    same shape as the sample `schedule_data`. Exports without a trade column
+    yield an empty trade.
+    """
+    with open(schedule_csv, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield (
+                row.get('Activity ID', ''),
+                row.get('Activity Name', ''),
+                row.get('Location', ''),
+                row.get('Trade', '') or '',
+                row.get('Start Date', row.get('Start', '')),
+                row.get('Finish Date', row.get('Finish', ''))
+            )
+
+_worker_parser = None
+
+def _init_parse_worker(catalog=None):
+    """Create one parser per pool worker"""
+    global _worker_parser
+    _worker_parser = UNOActivityParser(catalog)
+
+def _parse_schedule_batch(batch):
+    """Parse a batch of schedule activities inside a pool worker"""
+    return [
+        (_worker_parser.parse_activity(activity_id, name, location, trade), start, finish)
+        for activity_id, name, location, trade, start, finish in batch
+    ]
+
+def _batched(items, batch_size):
+    """Group an iterable into lists of at most batch_size items"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _parse_batches_in_pool(activities, catalog, workers, batch_size):
+    """Yield parsed batches in schedule order, keeping only a few batches in flight"""
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_parse_worker, initargs=(catalog,)) as pool:
+        pending = deque()
+        for batch in _batched(activities, batch_size):
+            pending.append(pool.submit(_parse_schedule_batch, batch))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def stream_uno_schedule_mapping_csv(schedule_csv, output_csv, actual_csv='UNO_construction_data_fixed.csv',
+                                    workers=None, batch_size=500, locations=None):
+    """Map an arbitrary schedule CSV to actualised work, writing rows as they are parsed
+
+    Activities are parsed in batches across a process pool and written to
+    `output_csv` in schedule order, so memory stays flat regardless of the
+    schedule size. Physical locations are catalogued from the actual data, or
+    from `locations` (a progress JSON's locationKeyToName, or a progress
+    CSV/.pgs) when given. Returns the number of activities written.
+    """
+    with stage('load actual data') as s:
+        actual_data = load_actual_uno_data(actual_csv)
+        s.rows_out = len(actual_data) if actual_data else 0
+    if not actual_data:
+        print("❌ Cannot proceed without actual construction data")
+        return 0
+    
+    with stage('catalog locations') as s:
+        if locations:
+            catalog = load_location_catalog(locations, AREA_KINDS)
+        else:
+            catalog = actual_data.location_catalog()
+        s.rows_out = len(catalog)
+    
+    workers = workers or os.cpu_count() or 1
+    activities = read_schedule_csv(schedule_csv)
+    total = 0
+    
+    with stage('map activities') as s, open(output_csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=MAPPING_FIELDNAMES)
+        writer.writeheader()
         
-        # Check how well this matches actual data
-        actual_match_quality = _analyze_actual_data_match(parsed, actual_data)
-        
-        # Build the row
-        row = {
-            'Activity_ID': activity_id,
-            'Activity_Name': name,
-            'Schedule_Location': location,
-            'Schedule_Trade': trade,
-            'Schedule_Start': start,
-            'Schedule_Finish': finish,
-            'Parsed_Location_Prefix': parsed['parsed_location_prefix'],
-            'Parsed_Pad_Numbers': '; '.join(map(str, parsed['parsed_pad_numbers'])) if parsed['parsed_pad_numbers'] else '',
-            'Parsed_Work_Phase': parsed['parsed_work_phase'],
-            'Trade_Components': '; '.join(parsed['trade_components']),
-            'Matched_Physical_Locations': '; '.join(parsed['matched_physical_locations'][:10]),  # First 10
-            'Number_of_Locations': len(parsed['matched_physical_locations']),
-            'Confidence_Score': parsed['confidence_score'],
-            'Progress_Formula': _generate_progress_formula(parsed),
-            'Is_Excluded': 'Yes' if parsed['is_excluded'] else 'No',
-            'Mapping_Notes': _generate_mapping_notes(parsed),
-            'Actual_Data_Match_Quality': actual_match_quality['quality'],
-            'Actual_Locations_Found': actual_match_quality['locations_found'],
-            'Actual_Trades_Found': actual_match_quality['trades_found']
-        }
+        if workers == 1:
+            _init_parse_worker(catalog)
+            batches = (_parse_schedule_batch(batch) for batch in _batched(activities, batch_size))
+        else:
+            batches = _parse_batches_in_pool(activities, catalog, workers, batch_size)
         
-        writer.writerow(row)
+        for batch in batches:
+            for parsed, start, finish in batch:
+                writer.writerow(_build_mapping_row(parsed, start, finish, actual_data))
+            total += len(batch)
+        s.rows_out = total
     
-    return output.getvalue()
+    return total
+
+def _build_mapping_row(parsed, start, finish, actual_data):
+    """Build one mapping CSV row from a parsed activity"""
+    
+    # Check how well this matches actual data
+    actual_match_quality = _analyze_actual_data_match(parsed, actual_data)
+    
+    return {
+        'Activity_ID': parsed['activity_id'],
+        'Activity_Name': parsed['activity_name'],
+        'Schedule_Location': parsed['schedule_location'],
+        'Schedule_Trade': parsed['schedule_trade'],
+        'Schedule_Start': start,
+        'Schedule_Finish': finish,
+        'Parsed_Location_Prefix': parsed['parsed_location_prefix'],
+        'Parsed_Pad_Numbers': '; '.join(map(str, parsed['parsed_pad_numbers'])) if parsed['parsed_pad_numbers'] else '',
+        'Parsed_Work_Phase': parsed['parsed_work_phase'],
+        'Trade_Components': '; '.join(parsed['trade_components']),
+        'Matched_Physical_Locations': '; '.join(parsed['matched_physical_locations'][:10]),  # First 10
+        'Number_of_Locations': len(parsed['matched_physical_locations']),
+        'Confidence_Score': parsed['confidence_score'],
+        'Progress_Formula': _generate_progress_formula(parsed),
+        'Is_Excluded': 'Yes' if parsed['is_excluded'] else 'No',
+        'Mapping_Notes': _generate_mapping_notes(parsed),
+        'Actual_Data_Match_Quality': actual_match_quality['quality'],
+        'Actual_Locations_Found': actual_match_quality['locations_found'],
+        'Actual_Trades_Found': actual_match_quality['trades_found']
+    }
 
 def _analyze_actual_data_match(parsed, actual_data):
-    """Analyze how well the parsed activity matches actual construction data"""
+    """Analyze how well the parsed activity matches actual construction data
+
+    `actual_data` is the ActualDataIndex returned by load_actual_uno_data.
+    """
     
     if parsed['is_excluded']:
         return {
@@ -488,20 +613,9 @@ def _analyze_actual_data_match(parsed, actual_data):
             'trades_found': 0
         }
     
-    # Find matching locations in actual data
-    matching_locations = []
-    matching_trades = []
-    
-    for row in actual_data:
-        # Check location match
-        for parsed_location in parsed['matched_physical_locations']:
-            if parsed_location.lower() in row['location'].lower() or row['location'].lower() in parsed_location.lower():
-                matching_locations.append(row['location'])
-        
-        # Check trade match
-        for trade_component in parsed['trade_components']:
-            if trade_component.lower() in row['trade'].lower() or row['trade'].lower() in trade_component.lower():
-                matching_trades.append(row['trade'])
+    # Look up matching locations and trades in the prebuilt index
+    matching_locations = actual_data.match_locations(parsed['matched_physical_locations'])
+    matching_trades = actual_data.match_trades(parsed['trade_components'])
     
     # Calculate match quality
     if len(matching_locations) > 0 and len(matching_trades) > 0:
@@ -513,8 +627,8 @@ def _analyze_actual_data_match(parsed, actual_data):
     
     return {
         'quality': quality,
-        'locations_found': len(set(matching_locations)),
-        'trades_found': len(set(matching_trades))
+        'locations_found': len(matching_locations),
+        'trades_found': len(matching_trades)
     }
 
 def _generate_progress_formula(parsed):
@@ -552,7 +666,7 @@ def _generate_mapping_notes(parsed):
         notes.append("Multi-trade activity - tracks 4 separate trades")
     
     if parsed['parsed_pad_numbers']:
-        notes.append(f"Specific pads: {parsed['parsed_pad_numbers']}")
+        notes.append(f"Specific pads: {list(parsed['parsed_pad_numbers'])}")
     
     if not notes:
         notes.append("High confidence mapping")
@@ -560,6 +674,36 @@ def _generate_mapping_notes(parsed):
     return '; '.join(notes)
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Stream a real schedule export:
+        # <schedule.csv> [output.csv] [actual.csv] [--locations progress.json] [--warehouse warehouse.sqlite]
+        args = sys.argv[1:]
+        locations = warehouse = None
+        if '--locations' in args:
+            i = args.index('--locations')
+            locations = args[i + 1]
+            del args[i:i + 2]
+        if '--warehouse' in args:
+            i = args.index('--warehouse')
+            warehouse = args[i + 1]
+            del args[i:i + 2]
+        schedule_csv = args[0]
+        output_csv = args[1] if len(args) > 1 else 'uno_schedule_to_actualised_mapping.csv'
+        actual_csv = args[2] if len(args) > 2 else 'UNO_construction_data_fixed.csv'
+        total = stream_uno_schedule_mapping_csv(schedule_csv, output_csv, actual_csv, locations=locations)
+        if total:
+            print(f"✅ Mapped {total} activities from {schedule_csv}")
+            print(f"📁 File: {output_csv}")
+        if total and warehouse:
+            from progress_warehouse import load_mapping, load_schedule, open_warehouse
+            dataset = os.path.splitext(os.path.basename(schedule_csv))[0]
+            conn = open_warehouse(warehouse)
+            load_schedule(conn, schedule_csv, dataset)
+            load_mapping(conn, output_csv, dataset)
+            conn.close()
+            print(f"🗄️ Schedule and mapping loaded into {warehouse} as {dataset}")
+        sys.exit(0)
+    
     # Generate the CSV
     csv_content = generate_uno_schedule_mapping_csv()
     
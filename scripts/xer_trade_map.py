@@ -1,39 +1,85 @@
 #!/usr/bin/env python3
 import csv
+import glob
+import os
 import re
 import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
 from pathlib import Path
 
+from instrument import stage
 
-def find_task_records(xer_text):
-    lines = xer_text.splitlines()
-    in_task_table = False
-    fields = []
-    records = []
+# The pattern parser is private to re; without it every alias is scanned
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:
+    try:  # Python < 3.11
+        import sre_constants
+        import sre_parse
+    except ImportError:
+        sre_constants = sre_parse = None
+
+
+XER_TABLES = ('TASK', 'TASKPRED', 'PROJWBS', 'CALENDAR')
+TRADE_MAP_HEADER = ('TaskID', 'TaskName', 'TradeJudgement', 'Reasoning')
+
+
+def iter_xer_lines(lines, tables=XER_TABLES):
+    """Yield (table, record) for every %R row of the requested tables
+
+    `lines` is any iterable of XER lines, such as an open file, so nothing
+    beyond the current line is held in memory. Each record is a namedtuple
+    whose type is built once per table from its %F header; short rows are
+    padded with ''. Iteration stops once every requested table has been read.
+    """
+    wanted = {t.upper() for t in tables}
+    remaining = set(wanted)
+    table = None
+    record_type = None
 
     for line in lines:
+        line = line.rstrip('\r\n')
         if line.startswith('%T'):
+            if table in remaining:
+                remaining.discard(table)
+                if not remaining:
+                    return
             table = line[2:].strip().split('\t', 1)[-1].strip().upper()
-            if in_task_table and table != 'TASK':
-                # End of TASK table
-                break
-            in_task_table = table == 'TASK'
-            fields = []
+            record_type = None
             continue
 
-        if not in_task_table:
+        if table not in wanted:
             continue
 
         if line.startswith('%F'):
             fields = line[2:].strip().split('\t')
+            record_type = namedtuple(table.title() + 'Record', fields, rename=True)
             continue
 
-        if line.startswith('%R') and fields:
-            values = line[2:].split('\t')
-            if len(values) < len(fields):
-                values += [''] * (len(fields) - len(values))
-            records.append(dict(zip(fields, values)))
+        if line.startswith('%R') and record_type is not None:
+            # Drop only the separator after %R; trailing empty values are kept
+            values = line[3:].split('\t') if line[2:3] == '\t' else line[2:].split('\t')
+            width = len(record_type._fields)
+            if len(values) < width:
+                values += [''] * (width - len(values))
+            yield table, record_type._make(values[:width])
+
 
+def iter_xer_records(xer_path, tables=XER_TABLES):
+    """Stream records for the requested tables from an XER file in one pass"""
+    with open(xer_path, 'r', errors='ignore') as f:
+        yield from iter_xer_lines(f, tables)
+
+
+def find_task_records(xer_text):
+    fields = []
+    records = []
+    for _, rec in iter_xer_lines(xer_text.splitlines(), ('TASK',)):
+        fields = list(rec._fields)
+        records.append(rec._asdict())
     return fields, records
 
 
@@ -134,14 +180,160 @@ def compile_aliases():
     return {trade: [re.compile(pat, re.IGNORECASE) for pat in pats] for trade, pats in alias.items()}
 
 
-def map_tasks_to_trades(xer_path, out_path):
-    text = xer_path.read_text(errors='ignore')
-    fields, records = find_task_records(text)
-    if not records:
-        print('No TASK records found', file=sys.stderr)
-        sys.exit(2)
+def required_literals(parsed):
+    """Lowercase literals of which at least one occurs in any match, or None
+
+    `parsed` is a pattern parsed by sre_parse. Literal runs in a sequence are
+    collected, groups and repeats with a minimum of one recurse, and a branch
+    requires one literal from each alternative. The longest requirement is
+    kept so the prefilter is as selective as possible.
+    """
+    candidates = []
+    run = []
+
+    def end_run():
+        if run:
+            candidates.append({''.join(run)})
+            del run[:]
+
+    for op, av in parsed:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av).lower())
+            continue
+        if op is sre_constants.AT:
+            # Zero-width assertions keep neighbouring literals adjacent
+            continue
+        end_run()
+        if op is sre_constants.SUBPATTERN:
+            found = required_literals(av[-1])
+        elif op is sre_constants.BRANCH:
+            found = set()
+            for branch in av[1]:
+                branch_literals = required_literals(branch)
+                if branch_literals is None:
+                    found = None
+                    break
+                found |= branch_literals
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+            found = required_literals(av[2])
+        else:
+            found = None
+        if found:
+            candidates.append(found)
+    end_run()
+
+    if not candidates:
+        return None
+    return max(candidates, key=lambda lits: min(len(lit) for lit in lits))
+
+
+def _pattern_literals(pattern):
+    """required_literals of a compiled pattern, None if it cannot be parsed"""
+    if sre_parse is None:
+        return None
+    try:
+        return required_literals(sre_parse.parse(pattern.pattern, pattern.flags))
+    except Exception:  # private parser API changed; fall back to always searching
+        return None
+
+
+class TradeClassifier:
+    """Literal prefilter plus regex confirm over all compile_aliases() patterns
+
+    Every alias pattern is reduced to the literal text any match must contain.
+    One pass over the distinct literals finds the aliases that can possibly
+    match a name; only those are confirmed with their regex. For each trade
+    the first alias in list order that matches is reported, exactly as a
+    sequential search over compile_aliases() would.
+
+    The prefilter compares lowercased text, which agrees with IGNORECASE
+    matching only for ASCII, so other names are searched with every alias.
+    """
+
+    def __init__(self, patterns):
+        self.trades = list(patterns.items())
+        self.literals = {}
+        self.always = []
+        for t, (trade, pats) in enumerate(self.trades):
+            for a, p in enumerate(pats):
+                lits = _pattern_literals(p)
+                if lits is None:
+                    self.always.append((t, a))
+                    continue
+                for lit in lits:
+                    self.literals.setdefault(lit, []).append((t, a))
+
+    def classify(self, name):
+        """Return [(trade, first matching pattern)] in trade order"""
+        if not name.isascii():
+            return classify_sequential(name, dict(self.trades))
+        lower = name.lower()
+        candidates = set(self.always)
+        for lit, aliases in self.literals.items():
+            if lit in lower:
+                candidates.update(aliases)
+        if not candidates:
+            return []
+
+        matches = []
+        matched_trade = None
+        for t, a in sorted(candidates):
+            if t == matched_trade:
+                continue
+            trade, pats = self.trades[t]
+            if pats[a].search(name):
+                matches.append((trade, pats[a].pattern))
+                matched_trade = t
+        return matches
+
+
+def classify_sequential(name, patterns):
+    """Reference classifier: search every alias pattern one at a time"""
+    matches = []
+    for trade, pats in patterns.items():
+        for p in pats:
+            if p.search(name):
+                matches.append((trade, p.pattern))
+                break
+    return matches
+
+
+def judge_task_name(name, classifier):
+    """Return the (TradeJudgement, Reasoning) pair for one task name"""
+    matched = classifier.classify(name)
+    matches = [trade for trade, _ in matched]
+    reasons = ["{}: matched '{}' in '{}'".format(trade, pat, name) for trade, pat in matched]
 
-    all_keys = list({k for r in records for k in r.keys()})
+    # Prefer specific over generic equipment
+    if 'Equipment Placement' in matches and 'Equipment' in matches:
+        matches = [m for m in matches if m != 'Equipment']
+        reasons = [r for r in reasons if not r.startswith('Equipment:')]
+
+    judgement = '; '.join(dict.fromkeys(matches)) if matches else 'Unassigned'
+    reason_text = '; '.join(reasons) if reasons else 'No alias match'
+    return judgement, reason_text
+
+
+class XerMapError(Exception):
+    """An XER file that cannot be mapped; exit_code is what the CLI exits with"""
+
+    def __init__(self, message, exit_code):
+        super().__init__(message)
+        self.exit_code = exit_code
+
+
+def write_trade_map(xer_path, out_path, classifier=None):
+    """Write the TaskID/TaskName/TradeJudgement/Reasoning CSV for one XER file
+
+    Returns (TASK records read, rows written). Pass a shared classifier to
+    avoid recompiling the alias patterns for every file.
+    """
+    records = iter_xer_records(xer_path, ('TASK',))
+    first = next(records, None)
+    if first is None:
+        raise XerMapError('No TASK records found', 2)
+
+    all_keys = list(first[1]._fields)
     name_key = pick_field(
         all_keys,
         candidates=[
@@ -156,56 +348,181 @@ def map_tasks_to_trades(xer_path, out_path):
     )
 
     if not name_key:
-        print('No task name field found. Keys seen: ' + ', '.join(sorted(all_keys)), file=sys.stderr)
-        sys.exit(3)
+        raise XerMapError('No task name field found. Keys seen: ' + ', '.join(sorted(all_keys)), 3)
 
-    patterns = compile_aliases()
+    name_pos = all_keys.index(name_key)
+    id_pos = all_keys.index(id_key) if id_key else None
+    if classifier is None:
+        classifier = TradeClassifier(compile_aliases())
 
-    rows = []
-    for rec in records:
-        name = (rec.get(name_key, '') or '').strip()
-        if not name:
-            continue
-        task_id = (rec.get(id_key, '') or '').strip() if id_key else ''
+    with stage('classify tasks') as s, Path(out_path).open('w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(TRADE_MAP_HEADER)
+        rows_in = rows_out = 0
+        for _, rec in chain([first], records):
+            rows_in += 1
+            name = (rec[name_pos] or '').strip()
+            if not name:
+                continue
+            task_id = (rec[id_pos] or '').strip() if id_pos is not None else ''
 
-        matches = []
-        reasons = []
-        for trade, pats in patterns.items():
-            matched_pat = None
-            for p in pats:
-                if p.search(name):
-                    matched_pat = p.pattern
-                    break
-            if matched_pat:
-                matches.append(trade)
-                reasons.append("{}: matched '{}' in '{}'".format(trade, matched_pat, name))
+            judgement, reason_text = judge_task_name(name, classifier)
+            w.writerow((task_id, name, judgement, reason_text))
+            rows_out += 1
+        s.rows_in, s.rows_out = rows_in, rows_out
+    return rows_in, rows_out
 
-        # Prefer specific over generic equipment
-        if 'Equipment Placement' in matches and 'Equipment' in matches:
-            matches = [m for m in matches if m != 'Equipment']
-            reasons = [r for r in reasons if not r.startswith('Equipment:')]
 
-        judgement = '; '.join(dict.fromkeys(matches)) if matches else 'Unassigned'
-        reason_text = '; '.join(reasons) if reasons else 'No alias match'
-        rows.append((task_id, name, judgement, reason_text))
+def map_tasks_to_trades(xer_path, out_path, classifier=None):
+    try:
+        return write_trade_map(xer_path, out_path, classifier)
+    except XerMapError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(e.exit_code)
+
+
+def expand_xer_inputs(inputs):
+    """XER paths for a mix of files, directories (*.xer inside) and glob patterns"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(p for p in Path(item).iterdir() if p.suffix.lower() == '.xer'))
+        elif glob.has_magic(item):
+            paths.extend(Path(p) for p in sorted(glob.glob(item)))
+        else:
+            paths.append(Path(item))
+    return list(dict.fromkeys(paths))
+
+
+BatchResult = namedtuple('BatchResult', 'xer_path out_path rows_in rows_out seconds error')
+
+_worker_classifier = None
 
-    with out_path.open('w', newline='') as f:
-        w = csv.writer(f)
-        w.writerow(['TaskID', 'TaskName', 'TradeJudgement', 'Reasoning'])
-        w.writerows(rows)
+
+def _init_batch_worker():
+    """Compile the alias patterns once per worker"""
+    global _worker_classifier
+    _worker_classifier = TradeClassifier(compile_aliases())
+
+
+def _map_batch_job(job):
+    xer_path, out_path = job
+    start = time.perf_counter()
+    try:
+        rows_in, rows_out = write_trade_map(xer_path, out_path, _worker_classifier)
+        error = None
+    except (XerMapError, OSError) as e:
+        rows_in = rows_out = 0
+        error = str(e)
+    return BatchResult(xer_path, out_path, rows_in, rows_out, time.perf_counter() - start, error)
+
+
+def merge_trade_maps(results, merged_path):
+    """Concatenate per-file maps with a SourceFile column, keeping each task once
+
+    Files are read in input order and a (TaskID, TaskName) pair is written
+    the first time it is seen, so the merged CSV lists each task with the
+    earliest file it appears in. Returns the number of rows written.
+    """
+    seen = set()
+    written = 0
+    with Path(merged_path).open('w', newline='') as out:
+        w = csv.writer(out)
+        w.writerow(('SourceFile',) + TRADE_MAP_HEADER)
+        for result in results:
+            if result.error:
+                continue
+            source = result.xer_path.name
+            with Path(result.out_path).open('r', newline='') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                for row in reader:
+                    key = (row[0], row[1])
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    w.writerow([source] + row)
+                    written += 1
+    return written
+
+
+def map_xer_batch(inputs, out_dir, merged_path=None, workers=None):
+    """Map many XER files across a process pool
+
+    Each file gets <stem>_trades.csv in out_dir, and all of them are merged
+    into merged_path (default out_dir/merged_trades.csv). Workers compile
+    the alias patterns once and reuse them for every file they are given.
+    Returns the BatchResult of each file in input order.
+    """
+    xer_paths = expand_xer_inputs(inputs)
+    if not xer_paths:
+        raise ValueError('No XER files found in {}'.format(', '.join(inputs)))
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [(p, Path(out_dir) / '{}_trades.csv'.format(p.stem)) for p in xer_paths]
+    outputs = [out_path for _, out_path in jobs]
+    if len(set(outputs)) != len(outputs):
+        raise ValueError('Input files must have distinct names to get distinct outputs')
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    start = time.perf_counter()
+    with stage('map xer files', rows_in=len(jobs)) as s:
+        if workers == 1:
+            _init_batch_worker()
+            results = [_map_batch_job(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker) as pool:
+                results = list(pool.map(_map_batch_job, jobs))
+        s.rows_out = sum(r.rows_out for r in results)
+    elapsed = time.perf_counter() - start
+
+    for r in results:
+        if r.error:
+            print('FAILED {}: {}'.format(r.xer_path, r.error), file=sys.stderr)
+            continue
+        rate = r.rows_out / r.seconds if r.seconds else 0
+        print('{} -> {}: {} tasks in {:.2f}s ({:,.0f} tasks/s)'.format(r.xer_path, r.out_path, r.rows_out, r.seconds, rate))
+
+    merged_path = merged_path or Path(out_dir) / 'merged_trades.csv'
+    with stage('merge trade maps') as s:
+        s.rows_out = merged = merge_trade_maps(results, merged_path)
+    total = sum(r.rows_out for r in results)
+    print('{} files, {} tasks in {:.2f}s with {} workers; {} distinct tasks -> {}'.format(
+        len(results), total, elapsed, workers, merged, merged_path))
+    return results
+
+
+def _pop_option(args, flag):
+    if flag not in args:
+        return None
+    i = args.index(flag)
+    value = args[i + 1]
+    del args[i:i + 2]
+    return value
 
 
 def main():
-    if len(sys.argv) != 3:
+    args = sys.argv[1:]
+    if args and args[0] == '--batch':
+        # xer_trade_map.py --batch <dir|glob|file ...> --out-dir DIR [--merged PATH] [--workers N]
+        args = args[1:]
+        out_dir = _pop_option(args, '--out-dir')
+        merged = _pop_option(args, '--merged')
+        workers = _pop_option(args, '--workers')
+        if not args or not out_dir:
+            print('Usage: xer_trade_map.py --batch <dir|glob|file ...> --out-dir DIR [--merged PATH] [--workers N]')
+            sys.exit(1)
+        results = map_xer_batch(args, out_dir, merged, int(workers) if workers else None)
+        sys.exit(1 if any(r.error for r in results) else 0)
+
+    if len(args) != 2:
         print('Usage: xer_trade_map.py <input.xer> <output.csv>')
+        print('       xer_trade_map.py --batch <dir|glob|file ...> --out-dir DIR [--merged PATH] [--workers N]')
         sys.exit(1)
-    inp = Path(sys.argv[1])
-    outp = Path(sys.argv[2])
+    inp = Path(args[0])
+    outp = Path(args[1])
     map_tasks_to_trades(inp, outp)
     print(str(outp))
 
 
 if __name__ == '__main__':
     main()
-
-